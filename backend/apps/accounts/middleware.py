@@ -1,68 +1,107 @@
 """Middleware for Supabase JWT authentication."""
 import logging
 from typing import Optional
+from asgiref.sync import iscoroutinefunction
 from django.http import JsonResponse
 from django.utils.decorators import sync_and_async_middleware
 
-from apps.core.supabase_client import supabase_client
 from apps.core.exceptions import AuthenticationError, InvalidTokenError
+from .token_verifier import token_verifier
 
 logger = logging.getLogger(__name__)
 
+# Skip auth for certain paths
+EXEMPT_PATHS = [
+    '/admin/',
+    '/health/',
+    '/api/auth/login',
+    '/api/auth/register',
+    '/api/webhooks/',  # Authenticated by their own shared secret
+]
+
+
+def _is_exempt(request) -> bool:
+    return any(request.path.startswith(path) for path in EXEMPT_PATHS)
+
+
+def extract_token(request) -> Optional[str]:
+    """Extract bearer token from Authorization header."""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header[7:] or None  # Remove 'Bearer ' prefix
+    return None
+
+
+def _attach_user(request, user_data: Optional[dict]) -> None:
+    request.user = user_data
+    # DRF replaces request.user in views; this keeps the verified payload
+    request.supabase_user = user_data
+    request.user_id = user_data.get('id') if user_data else None
+
+
+def _error_response(e: Exception) -> JsonResponse:
+    if isinstance(e, (AuthenticationError, InvalidTokenError)):
+        logger.warning(f"Authentication failed: {e}")
+        return JsonResponse(
+            {'error': 'Invalid or expired token', 'detail': str(e)},
+            status=401
+        )
+
+    logger.error(f"Unexpected error in auth middleware: {e}", exc_info=True)
+    return JsonResponse(
+        {'error': 'Authentication error'},
+        status=500
+    )
+
 
 @sync_and_async_middleware
 def supabase_auth_middleware(get_response):
     """
     Middleware to validate Supabase JWT tokens and attach user to request.
-    
-    Extracts token from Authorization header and validates it with Supabase.
-    Adds 'user' and 'user_id' attributes to request object.
+
+    Extracts token from Authorization header and validates it against the
+    cached Supabase signing keys (falling back to Supabase Auth for unknown keys).
+    Adds 'user', 'supabase_user' and 'user_id' attributes to request object.
+
+    Under ASGI the middleware runs as a native coroutine, so token
+    verification doesn't cost a thread per request.
     """
-    
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if _is_exempt(request):
+                return await get_response(request)
+
+            token = extract_token(request)
+            if not token:
+                # Allow requests without token (will be handled by view permissions)
+                _attach_user(request, None)
+                return await get_response(request)
+
+            try:
+                _attach_user(request, await token_verifier.averify(token))
+            except Exception as e:
+                return _error_response(e)
+
+            return await get_response(request)
+
+        return middleware
+
     def middleware(request):
-        # Skip auth for certain paths
-        exempt_paths = [
-            '/admin/',
-            '/health/',
-            '/api/auth/login',
-            '/api/auth/register',
-        ]
-        
-        if any(request.path.startswith(path) for path in exempt_paths):
+        if _is_exempt(request):
             return get_response(request)
-        
-        # Extract token from Authorization header
-        auth_header = request.headers.get('Authorization', '')
-        token = None
-        
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
+
+        token = extract_token(request)
         if not token:
             # Allow requests without token (will be handled by view permissions)
-            request.user = None
-            request.user_id = None
+            _attach_user(request, None)
             return get_response(request)
-        
+
         try:
-            # Verify token with Supabase
-            user_data = supabase_client.verify_token(token)
-            request.user = user_data
-            request.user_id = user_data.get('id')
-            
-        except (AuthenticationError, InvalidTokenError) as e:
-            logger.warning(f"Authentication failed: {e}")
-            return JsonResponse(
-                {'error': 'Invalid or expired token', 'detail': str(e)},
-                status=401
-            )
+            _attach_user(request, token_verifier.verify(token))
         except Exception as e:
-            logger.error(f"Unexpected error in auth middleware: {e}", exc_info=True)
-            return JsonResponse(
-                {'error': 'Authentication error'},
-                status=500
-            )
-        
+            return _error_response(e)
+
         return get_response(request)
-    
+
     return middleware
@@ -0,0 +1,115 @@
+"""
+Cached access to user subscription rows.
+
+Subscription limits change a few times a month, but they are read on every
+upload and every dashboard load. Rows are cached in a small per-process LRU
+in front of a shared Redis cache, so most reads never reach Supabase.
+Anything that writes to ``user_subscriptions`` must call
+``invalidate_subscription`` afterwards.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Optional
+
+import redis
+from django.conf import settings
+
+from apps.core.cache import TTLCache
+from apps.core.redis_client import get_redis, mark_redis_down
+from apps.core.supabase_client import supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Defaults applied when a user has no subscription row yet
+DEFAULT_SUBSCRIPTION = {
+    "tier": "free",
+    "monthly_upload_limit": 5,
+    "monthly_minutes_limit": 30,
+    "max_file_size_mb": 100,
+    "uploads_this_month": 0,
+    "minutes_used_this_month": 0,
+}
+
+REDIS_KEY_PREFIX = "subscription:"
+
+_local_cache = TTLCache(
+    maxsize=getattr(settings, "SUBSCRIPTION_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "SUBSCRIPTION_LOCAL_CACHE_TTL", 30),
+)
+
+
+def get_subscription(user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a user's subscription row.
+
+    Args:
+        user_id: User UUID
+
+    Returns:
+        Subscription row, or None if the user has no subscription
+
+    Raises:
+        DatabaseError: If the row isn't cached and Supabase can't be queried
+    """
+    key = str(user_id)
+
+    # Users without a row are cached as {} so they don't miss every time
+    row = _local_cache.get(key)
+    if row is not None:
+        return row or None
+
+    row = _redis_get(key)
+    if row is None:
+        # The whole row, as /api/auth/subscription returns it unchanged
+        result = supabase_client.query("user_subscriptions", eq={"user_id": key})
+        row = result[0] if result else {}
+        _redis_set(key, row)
+
+    _local_cache.set(key, row)
+    return row or None
+
+
+def invalidate_subscription(user_id: str) -> None:
+    """
+    Drop a user's cached subscription after it changed.
+
+    Other processes may keep serving their local copy for up to
+    SUBSCRIPTION_LOCAL_CACHE_TTL seconds.
+    """
+    key = str(user_id)
+    _local_cache.delete(key)
+
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(REDIS_KEY_PREFIX + key)
+    except redis.RedisError as e:
+        mark_redis_down(e)
+
+
+def _redis_get(key: str) -> Optional[Dict[str, Any]]:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        value = client.get(REDIS_KEY_PREFIX + key)
+    except redis.RedisError as e:
+        mark_redis_down(e)
+        return None
+    return json.loads(value) if value is not None else None
+
+
+def _redis_set(key: str, row: Dict[str, Any]) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(
+            REDIS_KEY_PREFIX + key,
+            json.dumps(row, default=str),
+            ex=getattr(settings, "SUBSCRIPTION_CACHE_TTL", 300),
+        )
+    except redis.RedisError as e:
+        mark_redis_down(e)
@@ -0,0 +1,233 @@
+import json
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+from asgiref.sync import async_to_sync
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+
+from apps.accounts import subscriptions
+from apps.accounts.middleware import supabase_auth_middleware
+from apps.accounts.token_verifier import TokenVerifier
+from apps.core.exceptions import InvalidTokenError
+
+
+def make_signing_key(kid="key-1"):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key()))
+    public_jwk.update({"kid": kid, "alg": "ES256", "use": "sig"})
+    return private_key, public_jwk
+
+
+def make_token(private_key, kid="key-1", **claims):
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": "student@example.com",
+        "exp": int(time.time()) + 3600,
+        **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm="ES256", headers={"kid": kid})
+
+
+@override_settings(
+    SUPABASE_AUTH_VERIFICATION="local",
+    SUPABASE_JWKS_URL="https://example.supabase.co/auth/v1/.well-known/jwks.json",
+)
+class TokenVerifierTest(TestCase):
+    def setUp(self):
+        self.private_key, self.public_jwk = make_signing_key()
+        self.verifier = TokenVerifier()
+
+        jwks_response = MagicMock()
+        jwks_response.json.return_value = {"keys": [self.public_jwk]}
+        patcher = patch("apps.accounts.token_verifier.get_http_client")
+        self.mock_get = patcher.start().return_value.get
+        self.mock_get.return_value = jwks_response
+        self.addCleanup(patcher.stop)
+
+    @patch("apps.accounts.token_verifier.supabase_client.verify_token")
+    def test_verifies_locally_with_cached_keys(self, mock_remote):
+        token = make_token(self.private_key, app_metadata={"subscription_tier": "pro"})
+
+        user = self.verifier.verify(token)
+        self.verifier.verify(make_token(self.private_key))
+
+        self.assertEqual(user["aud"], "authenticated")
+        self.assertEqual(user["app_metadata"], {"subscription_tier": "pro"})
+        self.assertEqual(self.mock_get.call_count, 1)
+        mock_remote.assert_not_called()
+
+    @patch("apps.accounts.token_verifier.supabase_client.verify_token")
+    def test_rejects_expired_token(self, mock_remote):
+        token = make_token(self.private_key, exp=int(time.time()) - 10)
+
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(token)
+        mock_remote.assert_not_called()
+
+    @patch("apps.accounts.token_verifier.supabase_client.verify_token")
+    def test_rejects_wrong_audience(self, mock_remote):
+        token = make_token(self.private_key, aud="anon")
+
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(token)
+
+    @patch("apps.accounts.token_verifier.supabase_client.verify_token")
+    def test_unknown_kid_falls_back_to_remote(self, mock_remote):
+        other_key, _ = make_signing_key(kid="rotated")
+        mock_remote.return_value = {"id": "remote-user"}
+        token = make_token(other_key, kid="rotated")
+
+        self.assertEqual(self.verifier.verify(token), {"id": "remote-user"})
+        # Second call is served from the verified-token cache
+        self.verifier.verify(token)
+        mock_remote.assert_called_once_with(token)
+
+
+class AsyncAuthMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+
+        async def view(request):
+            return HttpResponse(str(request.user_id))
+
+        self.middleware = supabase_auth_middleware(view)
+
+    @patch("apps.accounts.middleware.token_verifier.verify")
+    @patch("apps.accounts.middleware.token_verifier.averify", new_callable=AsyncMock)
+    def test_uses_async_verification(self, mock_averify, mock_verify):
+        mock_averify.return_value = {"id": "user-1"}
+        request = self.factory.get("/api/content", headers={"Authorization": "Bearer abc"})
+
+        response = async_to_sync(self.middleware)(request)
+
+        self.assertEqual(response.content, b"user-1")
+        mock_averify.assert_awaited_once_with("abc")
+        mock_verify.assert_not_called()
+
+    @patch("apps.accounts.middleware.token_verifier.averify", new_callable=AsyncMock)
+    def test_invalid_token_returns_401(self, mock_averify):
+        mock_averify.side_effect = InvalidTokenError("Token has expired")
+        request = self.factory.get("/api/content", headers={"Authorization": "Bearer abc"})
+
+        response = async_to_sync(self.middleware)(request)
+
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(SUPABASE_AUTH_VERIFICATION="local")
+@patch("apps.accounts.token_verifier.supabase_client.verify_token")
+class UserProfileTest(TestCase):
+    LOCAL_USER = {"id": "user-1", "email": "student@example.com"}
+
+    def setUp(self):
+        from apps.accounts.token_verifier import token_verifier
+
+        token_verifier.clear_cache()
+        self.addCleanup(token_verifier.clear_cache)
+        self.token = make_token(make_signing_key()[0])
+
+    def get_profile(self):
+        from rest_framework.test import APIRequestFactory
+        from apps.accounts.views import get_user_profile
+
+        request = APIRequestFactory().get(
+            "/api/auth/me", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        request.user = request.supabase_user = self.LOCAL_USER
+        request.user_id = "user-1"
+        return get_user_profile(request)
+
+    def test_profile_returns_full_supabase_user(self, mock_remote):
+        full_user = {
+            **self.LOCAL_USER,
+            "created_at": "2026-01-01T00:00:00Z",
+            "email_confirmed_at": "2026-01-01T00:05:00Z",
+            "identities": [{"provider": "email"}],
+        }
+        mock_remote.return_value = full_user
+
+        response = self.get_profile()
+        self.get_profile()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"], full_user)
+        # Fetched once, then cached like the verification itself
+        mock_remote.assert_called_once_with(self.token)
+
+    def test_profile_served_from_token_when_supabase_fails(self, mock_remote):
+        from apps.core.exceptions import AuthenticationError
+
+        mock_remote.side_effect = AuthenticationError("Token verification failed: timeout")
+
+        response = self.get_profile()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"], self.LOCAL_USER)
+
+
+@patch("apps.accounts.subscriptions.get_redis", return_value=None)
+class SubscriptionCacheTest(TestCase):
+    def setUp(self):
+        subscriptions._local_cache.clear()
+        self.user_id = str(uuid.uuid4())
+        self.row = {"id": "sub-1", "user_id": self.user_id, "tier": "pro"}
+
+    @patch("apps.accounts.subscriptions.supabase_client.query")
+    def test_second_read_is_cached(self, mock_query, _mock_redis):
+        mock_query.return_value = [self.row]
+
+        self.assertEqual(subscriptions.get_subscription(self.user_id), self.row)
+        self.assertEqual(subscriptions.get_subscription(self.user_id), self.row)
+        mock_query.assert_called_once()
+
+    @patch("apps.accounts.subscriptions.supabase_client.query")
+    def test_missing_row_is_cached_and_invalidation_refetches(self, mock_query, _mock_redis):
+        mock_query.return_value = []
+
+        self.assertIsNone(subscriptions.get_subscription(self.user_id))
+        self.assertIsNone(subscriptions.get_subscription(self.user_id))
+        self.assertEqual(mock_query.call_count, 1)
+
+        subscriptions.invalidate_subscription(self.user_id)
+        mock_query.return_value = [self.row]
+        self.assertEqual(subscriptions.get_subscription(self.user_id), self.row)
+        self.assertEqual(mock_query.call_count, 2)
+
+    @patch("apps.accounts.subscriptions.supabase_client.query")
+    def test_reads_through_redis(self, mock_query, mock_get_redis):
+        redis_client = MagicMock()
+        redis_client.get.return_value = json.dumps(self.row)
+        mock_get_redis.return_value = redis_client
+
+        self.assertEqual(subscriptions.get_subscription(self.user_id), self.row)
+        mock_query.assert_not_called()
+
+    @patch("apps.accounts.subscriptions.supabase_client.query")
+    def test_status_endpoint_returns_whole_row(self, mock_query, _mock_redis):
+        from rest_framework.test import APIRequestFactory
+        from apps.accounts.views import get_subscription_status
+
+        row = {
+            **self.row,
+            "monthly_upload_limit": 50,
+            "monthly_minutes_limit": 600,
+            "uploads_this_month": 3,
+            "minutes_used_this_month": 45.0,
+            "stripe_customer_id": "cus_1",
+            "created_at": "2026-01-01T00:00:00Z",
+        }
+        mock_query.return_value = [row]
+        request = APIRequestFactory().get("/api/auth/subscription")
+        request.user = {"id": self.user_id}
+        request.user_id = self.user_id
+
+        response = get_subscription_status(request)
+
+        self.assertEqual(response.data, {**row, "uploads_remaining": 47, "minutes_remaining": 555.0})
+        self.assertNotIn("columns", mock_query.call_args.kwargs)
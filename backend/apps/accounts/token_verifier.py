@@ -0,0 +1,294 @@
+"""
+Local verification of Supabase access tokens.
+
+Supabase signs access tokens with keys published at the project's JWKS
+endpoint (or, for legacy projects, with a shared HS256 secret). Verifying the
+signature, expiry and audience in-process avoids an HTTP round trip to
+Supabase Auth on every request. The remote ``verify_token`` call is only used
+when a token is signed with a key we don't know, or when local verification
+is disabled.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from apps.core.cache import TTLCache
+from apps.core.exceptions import AuthenticationError, InvalidTokenError
+from apps.core.http_client import get_http_client
+from apps.core.supabase_client import supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Don't hit the JWKS endpoint more often than this when chasing unknown key IDs
+MIN_JWKS_REFRESH_INTERVAL = 30
+JWKS_FETCH_TIMEOUT = 5
+
+
+def _claims_to_user(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shape verified JWT claims like the user payload returned by Supabase Auth.
+
+    Only the fields a token carries are filled; created_at, identities,
+    email_confirmed_at and the like need the full user from Supabase Auth
+    (see TokenVerifier.full_user).
+    """
+    return {
+        "id": claims.get("sub"),
+        "aud": claims.get("aud"),
+        "role": claims.get("role"),
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+        "is_anonymous": claims.get("is_anonymous", False),
+    }
+
+
+class TokenVerifier:
+    """Verifies Supabase JWTs against a cached signing key set."""
+
+    def __init__(self):
+        """Initialize verifier (keys are fetched lazily on first use)."""
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._keys_fetched_at = 0.0
+        self._last_fetch_attempt: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._token_cache = TTLCache(
+            maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000),
+            ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+        )
+        self._full_user_cache = TTLCache(
+            maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000),
+            ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+        )
+
+    @property
+    def local_verification_enabled(self) -> bool:
+        return getattr(settings, "SUPABASE_AUTH_VERIFICATION", "local") == "local"
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify an access token and return the user it belongs to.
+
+        Args:
+            token: JWT access token
+
+        Returns:
+            User data dictionary (same shape as Supabase Auth's user payload)
+
+        Raises:
+            InvalidTokenError: If the token is malformed, expired or badly signed
+            AuthenticationError: If the remote fallback rejects the token
+        """
+        cache_key = self._cache_key(token)
+        cached = self._token_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        user_data = None
+        if self.local_verification_enabled:
+            user_data = self.verify_locally(token)
+
+        if user_data is None:
+            user_data = supabase_client.verify_token(token)
+
+        self._token_cache.set(cache_key, user_data, ttl=self._cache_ttl(token))
+        return user_data
+
+    async def averify(self, token: str) -> Dict[str, Any]:
+        """
+        Async variant of verify() for ASGI request handling.
+
+        Cached tokens and tokens signed with an already-known key are verified
+        on the event loop without blocking; only a key set refresh is pushed
+        to a worker thread, and the remote fallback uses the async Supabase client.
+        """
+        cache_key = self._cache_key(token)
+        cached = self._token_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        user_data = None
+        if self.local_verification_enabled:
+            header = self._parse_header(token)
+            if self._needs_refresh(header):
+                await sync_to_async(self.refresh_keys, thread_sensitive=False)()
+            user_data = self._decode(token, header)
+
+        if user_data is None:
+            user_data = await supabase_client.averify_token(token)
+
+        self._token_cache.set(cache_key, user_data, ttl=self._cache_ttl(token))
+        return user_data
+
+    def full_user(self, token: str, verified_user: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Supabase Auth's complete user payload for an already verified token.
+
+        A locally verified user only has what the token's claims carry, so
+        the full user is fetched (and cached like verification results).
+
+        Args:
+            token: JWT access token, already verified
+            verified_user: What verify() returned for it
+
+        Returns:
+            The full user, or verified_user if Supabase Auth can't be reached
+        """
+        if not self.local_verification_enabled:
+            return verified_user  # Came from Supabase Auth already
+
+        cache_key = self._cache_key(token)
+        cached = self._full_user_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            user_data = supabase_client.verify_token(token)
+        except AuthenticationError as e:
+            # The token is valid (verified locally); serve what it proved
+            logger.warning(f"Could not fetch full user from Supabase Auth: {e}")
+            return verified_user
+
+        self._full_user_cache.set(cache_key, user_data, ttl=self._cache_ttl(token))
+        return user_data
+
+    def verify_locally(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a token without calling Supabase Auth.
+
+        Args:
+            token: JWT access token
+
+        Returns:
+            User data, or None if the signing key is unknown and the caller
+            should fall back to remote verification
+
+        Raises:
+            InvalidTokenError: If the token is malformed, expired or badly signed
+        """
+        header = self._parse_header(token)
+        if self._needs_refresh(header):
+            self.refresh_keys()
+        return self._decode(token, header)
+
+    def _parse_header(self, token: str) -> Dict[str, Any]:
+        try:
+            return jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f"Malformed token: {e}")
+
+    def _needs_refresh(self, header: Dict[str, Any]) -> bool:
+        """Whether the key set should be re-fetched before verifying this token."""
+        if header.get("alg") == "HS256":
+            return False
+
+        refresh_interval = getattr(settings, "SUPABASE_JWKS_REFRESH_SECONDS", 600)
+        now = time.monotonic()
+        stale = now - self._keys_fetched_at > refresh_interval
+
+        # An unknown kid may be a freshly rotated key. Re-fetching is
+        # rate-limited so garbage kids can't turn into a request flood.
+        return (stale or header.get("kid") not in self._keys) and (
+            self._last_fetch_attempt is None
+            or now - self._last_fetch_attempt > MIN_JWKS_REFRESH_INTERVAL
+        )
+
+    def _decode(self, token: str, header: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Check signature and claims with the cached keys (no network access)."""
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            key = getattr(settings, "SUPABASE_JWT_SECRET", None)
+            if not key:
+                return None
+        else:
+            jwk = self._keys.get(header.get("kid"))
+            if jwk is None:
+                return None
+            # Only accept the algorithm the key was published for
+            if jwk.algorithm_name != algorithm:
+                raise InvalidTokenError("Token algorithm does not match signing key")
+            key = jwk.key
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=getattr(settings, "SUPABASE_JWT_AUDIENCE", "authenticated"),
+                leeway=getattr(settings, "SUPABASE_JWT_LEEWAY", 0),
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.ExpiredSignatureError:
+            raise InvalidTokenError("Token has expired")
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(f"Token verification failed: {e}")
+
+        return _claims_to_user(claims)
+
+    def refresh_keys(self) -> None:
+        """Fetch the JWKS and atomically replace the cached key set."""
+        jwks_url = getattr(settings, "SUPABASE_JWKS_URL", None)
+        if not jwks_url:
+            return
+
+        if not self._refresh_lock.acquire(blocking=False):
+            # Another thread is already refreshing; use whatever keys we have
+            return
+
+        try:
+            self._last_fetch_attempt = time.monotonic()
+            response = get_http_client(
+                "supabase-jwks", read_timeout=JWKS_FETCH_TIMEOUT
+            ).get(jwks_url)
+            response.raise_for_status()
+
+            keys = {}
+            for key_data in response.json().get("keys", []):
+                try:
+                    jwk = jwt.PyJWK(key_data)
+                except jwt.PyJWTError as e:
+                    logger.warning(f"Skipping unusable JWKS key {key_data.get('kid')}: {e}")
+                    continue
+                keys[key_data.get("kid")] = jwk
+
+            self._keys = keys
+            self._keys_fetched_at = time.monotonic()
+            logger.info(f"Loaded {len(keys)} Supabase signing key(s)")
+        except Exception as e:
+            # Keep serving with the previous key set
+            logger.warning(f"Failed to refresh Supabase JWKS: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def clear_cache(self) -> None:
+        """Drop cached verification results and signing keys."""
+        self._token_cache.clear()
+        self._full_user_cache.clear()
+        self._keys = {}
+        self._keys_fetched_at = 0.0
+        self._last_fetch_attempt = None
+
+    def _cache_key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _cache_ttl(self, token: str) -> float:
+        """Cache TTL for a verified token, never outliving the token itself."""
+        ttl = getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60)
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            return 0
+        if exp is None:
+            return ttl
+        return min(ttl, exp - time.time())
+
+
+# Global instance
+token_verifier = TokenVerifier()
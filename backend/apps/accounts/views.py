@@ -10,8 +10,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 
-from apps.core.supabase_client import supabase_client
+from .middleware import extract_token
 from .permissions import IsAuthenticated
+from .subscriptions import DEFAULT_SUBSCRIPTION, get_subscription
+from .token_verifier import token_verifier
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +27,8 @@ def get_user_profile(request):
     Returns:
         User data from Supabase auth
     """
-    return Response({"user": request.user, "user_id": request.user_id})
+    user = token_verifier.full_user(extract_token(request), request.supabase_user)
+    return Response({"user": user, "user_id": request.user_id})
 
 
 @api_view(["GET"])
@@ -37,26 +40,12 @@ def get_subscription_status(request):
     Returns:
         Subscription details including tier, limits, and current usage
     """
-    result = supabase_client.query(
-        "user_subscriptions", eq={"user_id": request.user_id}
-    )
+    subscription = get_subscription(request.user_id)
 
-    if not result:
+    if not subscription:
         # Return free tier defaults if no subscription found
-        return Response(
-            {
-                "tier": "free",
-                "monthly_upload_limit": 5,
-                "monthly_minutes_limit": 30,
-                "max_file_size_mb": 100,
-                "uploads_this_month": 0,
-                "minutes_used_this_month": 0,
-                "uploads_remaining": 5,
-                "minutes_remaining": 30,
-            }
-        )
+        subscription = DEFAULT_SUBSCRIPTION
 
-    subscription = result[0]
     return Response(
         {
             **subscription,
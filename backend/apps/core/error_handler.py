@@ -1,4 +1,5 @@
 """Error handling utilities and retry logic."""
+import asyncio
 import logging
 import time
 from typing import Callable, Any, Optional
@@ -112,7 +113,7 @@ def retry_with_backoff(
                     if attempt >= max_attempts:
                         logger.error(
                             f"{func.__name__} failed after {max_attempts} attempts: {e}",
-                            extra={'exception': e, 'args': args, 'kwargs': kwargs}
+                            extra={'exception': e, 'func_args': args, 'func_kwargs': kwargs}
                         )
                         raise
                     
@@ -136,6 +137,52 @@ def retry_with_backoff(
     return decorator
 
 
+def async_retry_with_backoff(
+    max_attempts: int = 3,
+    base_delay: float = 1.0,
+    exceptions: tuple = (Exception,),
+):
+    """
+    Decorator to retry a coroutine function with exponential backoff.
+
+    Same semantics as retry_with_backoff, but waits with asyncio.sleep so
+    the event loop keeps serving other requests between attempts.
+
+    Usage:
+        @async_retry_with_backoff(max_attempts=3)
+        async def fetch_user(token):
+            pass
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            attempt = 0
+
+            while True:
+                try:
+                    return await func(*args, **kwargs)
+                except exceptions as e:
+                    if not is_retryable_error(e):
+                        logger.error(f"{func.__name__} failed with non-retryable error: {e}")
+                        raise
+
+                    attempt += 1
+                    if attempt >= max_attempts:
+                        logger.error(f"{func.__name__} failed after {max_attempts} attempts: {e}")
+                        raise
+
+                    delay = exponential_backoff(attempt - 1, base_delay)
+                    logger.warning(
+                        f"{func.__name__} attempt {attempt} failed: {e}. "
+                        f"Retrying in {delay:.2f}s...",
+                        extra={'attempt': attempt, 'delay': delay}
+                    )
+                    await asyncio.sleep(delay)
+
+        return wrapper
+    return decorator
+
+
 class ErrorContext:
     """Context manager for capturing and enriching errors with additional context."""
     
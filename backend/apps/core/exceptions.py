@@ -109,6 +109,13 @@ class DownloadError(StorageError):
     retryable = True
 
 
+# Media Processing Errors
+class MediaProcessingError(NoteablyException):
+    """Failed to transcode or analyze media locally (e.g. ffmpeg errors)."""
+
+    retryable = False
+
+
 # Database Errors
 class DatabaseError(NoteablyException):
     """Base class for database errors."""
@@ -0,0 +1,242 @@
+"""
+Shared HTTP clients for third-party providers.
+
+Each provider (AssemblyAI, Supabase JWKS, ...) gets one pooled keep-alive
+client per process, so calls reuse TLS connections instead of opening a new
+one each time, and every call is bounded by connect/read timeouts so a hung
+provider can't block a worker forever. Every call's latency, status and
+payload sizes are recorded per provider (see http_metrics()).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderStats:
+    """Call metrics for one provider, accumulated since process start."""
+
+    calls: int = 0
+    errors: int = 0  # transport errors (timeouts, refused connections, ...)
+    statuses: Counter = field(default_factory=Counter)
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        if not self.calls:
+            return 0.0
+        return self.total_seconds / self.calls
+
+
+_metrics: Dict[str, ProviderStats] = {}
+_metrics_lock = threading.Lock()
+
+
+def _body_size(message) -> int:
+    """Size of a request/response body, or 0 if it is streamed and unread."""
+    try:
+        return len(message.content)
+    except (httpx.RequestNotRead, httpx.ResponseNotRead):
+        return 0
+
+
+def _record(provider: str, method: str, url, seconds: float, request, response=None, error=None):
+    sent = _body_size(request)
+    received = _body_size(response) if response is not None else 0
+    status = response.status_code if response is not None else None
+
+    with _metrics_lock:
+        stats = _metrics.setdefault(provider, ProviderStats())
+        stats.calls += 1
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.bytes_sent += sent
+        stats.bytes_received += received
+        if error is not None:
+            stats.errors += 1
+        else:
+            stats.statuses[status] += 1
+
+    logger.debug(
+        f"{provider} {method} {url} -> {status or type(error).__name__} "
+        f"in {seconds * 1000:.0f}ms ({sent}B sent, {received}B received)",
+        extra={
+            "provider": provider,
+            "status": status,
+            "seconds": seconds,
+            "bytes_sent": sent,
+            "bytes_received": received,
+        },
+    )
+
+
+def http_metrics() -> Dict[str, ProviderStats]:
+    """Snapshot of per-provider call metrics in this process."""
+    with _metrics_lock:
+        return {
+            provider: ProviderStats(
+                calls=stats.calls,
+                errors=stats.errors,
+                statuses=Counter(stats.statuses),
+                bytes_sent=stats.bytes_sent,
+                bytes_received=stats.bytes_received,
+                total_seconds=stats.total_seconds,
+                max_seconds=stats.max_seconds,
+            )
+            for provider, stats in _metrics.items()
+        }
+
+
+def reset_http_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _client_options(read_timeout: Optional[float], http2: Optional[bool]) -> dict:
+    if http2 is None:
+        http2 = settings.HTTP_CLIENT_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401  (optional dependency of httpx[http2])
+        except ImportError:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return {
+        "timeout": httpx.Timeout(
+            read_timeout or settings.HTTP_CLIENT_READ_TIMEOUT,
+            connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        "http2": http2,
+    }
+
+
+class ProviderClient:
+    """Pooled client for one provider, recording metrics for every call."""
+
+    def __init__(self, provider: str, read_timeout: Optional[float] = None, http2: Optional[bool] = None):
+        self.provider = provider
+        self._client = httpx.Client(**_client_options(read_timeout, http2))
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request (same arguments as httpx.Client.request).
+
+        Raises:
+            httpx.HTTPError: On transport errors; HTTP error statuses are
+                returned, call raise_for_status() to turn them into errors
+        """
+        started = time.monotonic()
+        request = self._client.build_request(method, url, **kwargs)
+        try:
+            response = self._client.send(request)
+        except httpx.HTTPError as e:
+            _record(self.provider, method, url, time.monotonic() - started, request, error=e)
+            raise
+        _record(self.provider, method, url, time.monotonic() - started, request, response=response)
+        return response
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self._client.close()
+
+
+class AsyncProviderClient:
+    """Async counterpart of ProviderClient, bound to one event loop."""
+
+    def __init__(self, provider: str, read_timeout: Optional[float] = None, http2: Optional[bool] = None):
+        self.provider = provider
+        self._client = httpx.AsyncClient(**_client_options(read_timeout, http2))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.monotonic()
+        request = self._client.build_request(method, url, **kwargs)
+        try:
+            response = await self._client.send(request)
+        except httpx.HTTPError as e:
+            _record(self.provider, method, url, time.monotonic() - started, request, error=e)
+            raise
+        _record(self.provider, method, url, time.monotonic() - started, request, response=response)
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_clients: Dict[str, ProviderClient] = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+# Async clients can't be shared across event loops; keep one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_client(provider: str, read_timeout: Optional[float] = None, http2: Optional[bool] = None) -> ProviderClient:
+    """
+    Get the shared client for a provider, creating it on first use.
+
+    The first caller's options win. Clients are rebuilt in forked children
+    (e.g. Celery prefork workers) so processes never share a connection pool.
+    """
+    global _clients_pid
+
+    client = _clients.get(provider)
+    if client is None or _clients_pid != os.getpid():
+        with _clients_lock:
+            if _clients_pid != os.getpid():
+                _clients.clear()
+                _clients_pid = os.getpid()
+            client = _clients.get(provider)
+            if client is None:
+                client = ProviderClient(provider, read_timeout=read_timeout, http2=http2)
+                _clients[provider] = client
+                logger.info(f"HTTP client for {provider} initialized")
+    return client
+
+
+def get_async_http_client(
+    provider: str, read_timeout: Optional[float] = None, http2: Optional[bool] = None
+) -> AsyncProviderClient:
+    """Get the async client for a provider on the running event loop."""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if provider not in clients:
+        clients[provider] = AsyncProviderClient(provider, read_timeout=read_timeout, http2=http2)
+    return clients[provider]
+
+
+def reset_http_clients():
+    """Close and drop the shared sync clients (used by tests)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
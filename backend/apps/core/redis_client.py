@@ -0,0 +1,52 @@
+"""Shared Redis connection used for caching and counters."""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# After a connection failure, skip Redis for this long instead of paying a
+# connect timeout on every call
+REDIS_RETRY_INTERVAL = 30
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+_down_until = 0.0
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Get the process-wide Redis client (created on first use).
+
+    Returns:
+        Redis client, or None if Redis isn't configured or recently failed
+    """
+    global _client
+
+    if not getattr(settings, "REDIS_URL", None):
+        return None
+    if time.monotonic() < _down_until:
+        return None
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=getattr(settings, "REDIS_SOCKET_TIMEOUT", 0.5),
+                    socket_timeout=getattr(settings, "REDIS_SOCKET_TIMEOUT", 0.5),
+                    decode_responses=True,
+                )
+    return _client
+
+
+def mark_redis_down(error: Exception) -> None:
+    """Record a Redis failure so callers fall back to their slow path for a while."""
+    global _down_until
+    _down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+    logger.warning(f"Redis unavailable, bypassing for {REDIS_RETRY_INTERVAL}s: {error}")
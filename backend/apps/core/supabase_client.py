@@ -3,10 +3,10 @@
 import os
 import logging
 from typing import Optional, Dict, Any
-from supabase import create_client, Client
+from supabase import AsyncClient, Client, acreate_client, create_client
 
 from apps.core.exceptions import DatabaseError, AuthenticationError
-from apps.core.error_handler import retry_with_backoff
+from apps.core.error_handler import async_retry_with_backoff, retry_with_backoff
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +16,7 @@ class SupabaseClient:
 
     _instance: Optional["SupabaseClient"] = None
     _client: Optional[Client] = None
+    _async_client: Optional[AsyncClient] = None
 
     def __new__(cls):
         """Singleton pattern to reuse client."""
@@ -28,24 +29,35 @@ class SupabaseClient:
         # Client will be initialized on first use
         pass
 
+    @staticmethod
+    def _credentials() -> tuple:
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError(
+                "SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment. "
+                "Copy .env.example to .env and fill in your Supabase credentials."
+            )
+        return supabase_url, supabase_key
+
     @property
     def client(self) -> Client:
         """Get Supabase client instance (initializes on first access)."""
         if self._client is None:
-            supabase_url = os.getenv("SUPABASE_URL")
-            supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-            if not supabase_url or not supabase_key:
-                raise ValueError(
-                    "SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment. "
-                    "Copy .env.example to .env and fill in your Supabase credentials."
-                )
-
-            self._client = create_client(supabase_url, supabase_key)
+            self._client = create_client(*self._credentials())
             logger.info("Supabase client initialized")
 
         return self._client
 
+    async def get_async_client(self) -> AsyncClient:
+        """Get async Supabase client instance (initializes on first access)."""
+        if self._async_client is None:
+            self._async_client = await acreate_client(*self._credentials())
+            logger.info("Async Supabase client initialized")
+
+        return self._async_client
+
     @retry_with_backoff(max_attempts=3)
     def get_user_by_id(self, user_id: str) -> Dict[str, Any]:
         """
@@ -92,20 +104,45 @@ class SupabaseClient:
             logger.error(f"Token verification failed: {e}")
             raise AuthenticationError(f"Token verification failed: {str(e)}")
 
+    @async_retry_with_backoff(max_attempts=3)
+    async def averify_token(self, token: str) -> Dict[str, Any]:
+        """
+        Verify JWT token without blocking the event loop.
+
+        Args:
+            token: JWT access token
+
+        Returns:
+            User data from token
+
+        Raises:
+            AuthenticationError: If token is invalid
+        """
+        try:
+            client = await self.get_async_client()
+            response = await client.auth.get_user(token)
+            if not response.user:
+                raise AuthenticationError("Invalid or expired token")
+            return response.user.model_dump()
+        except Exception as e:
+            logger.error(f"Token verification failed: {e}")
+            raise AuthenticationError(f"Token verification failed: {str(e)}")
+
     @retry_with_backoff(max_attempts=3)
-    def query(self, table: str, **filters) -> list:
+    def query(self, table: str, columns: str = "*", **filters) -> list:
         """
         Query Supabase table with filters.
 
         Args:
             table: Table name
+            columns: Comma-separated columns to select (defaults to all)
             **filters: Query filters (e.g., eq={'user_id': 'uuid'})
 
         Returns:
             List of records
         """
         try:
-            query = self.client.table(table).select("*")
+            query = self.client.table(table).select(columns)
 
             # Apply filters
             for filter_type, filter_value in filters.items():
@@ -0,0 +1,252 @@
+"""
+Provider-side caching of transcripts reused across generation requests.
+
+Every material type, and every regeneration, sends the same transcript.
+With GENERATION_CONTEXT_CACHE set, a transcript of at least
+GENERATION_CACHE_MIN_TOKENS (the provider's minimum) is uploaded once as
+cached content and requests reference it by name instead, so it is neither
+resent nor prefilled again. The handle is kept on the Transcription.
+
+Its lifetime follows the job's: the cache is created (or extended) for
+GENERATION_CACHE_TTL seconds when generation starts, then kept for
+GENERATION_CACHE_RETAIN seconds once generation is over so regenerations
+can reuse it, or deleted right away if that is 0. The provider drops it
+when it expires.
+
+GENERATION_CONTEXT_CACHE selects the provider: "gemini", "local" (an
+in-process fake for tests and development) or the dotted path of a
+ContextCacheProvider subclass. Empty disables caching.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.exceptions import ThirdPartyServiceError
+from .prompts import BASE_INSTRUCTION, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_ALIASES = {
+    "gemini": "apps.generation.context_cache.GeminiContextCache",
+    "local": "apps.generation.context_cache.LocalContextCache",
+}
+# A cache this close to expiring isn't worth referencing
+MIN_REMAINING = timedelta(seconds=60)
+
+
+@dataclass
+class CachedContext:
+    name: str
+    expires_at: datetime
+
+
+class ContextCacheProvider(ABC):
+    """Cached content on the model provider's side."""
+
+    @abstractmethod
+    def create(self, text: str, ttl: int) -> CachedContext:
+        """Upload a transcript as cached content living ttl seconds."""
+
+    @abstractmethod
+    def extend(self, name: str, ttl: int) -> CachedContext:
+        """Make cached content expire ttl seconds from now."""
+
+    @abstractmethod
+    def delete(self, name: str):
+        """Delete cached content."""
+
+    @abstractmethod
+    def generate(self, name: str, prompt: str, generation_config: Dict) -> str:
+        """Run a prompt against cached content, returning the response text."""
+
+
+class GeminiContextCache(ContextCacheProvider):
+    """Gemini cached content (explicitly versioned models only, see GEMINI_CACHE_MODEL)."""
+
+    def _caching(self):
+        import google.generativeai as genai
+        from google.generativeai import caching
+
+        if not settings.GEMINI_API_KEY:
+            raise ThirdPartyServiceError("Gemini API key not configured")
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        return caching
+
+    def create(self, text: str, ttl: int) -> CachedContext:
+        cached = self._caching().CachedContent.create(
+            model=settings.GEMINI_CACHE_MODEL,
+            display_name="noteably-transcript",
+            system_instruction=BASE_INSTRUCTION,
+            contents=[text],
+            ttl=timedelta(seconds=ttl),
+        )
+        return CachedContext(cached.name, cached.expire_time)
+
+    def extend(self, name: str, ttl: int) -> CachedContext:
+        cached = self._caching().CachedContent.get(name)
+        cached.update(ttl=timedelta(seconds=ttl))
+        return CachedContext(cached.name, cached.expire_time)
+
+    def delete(self, name: str):
+        self._caching().CachedContent.get(name).delete()
+
+    def generate(self, name: str, prompt: str, generation_config: Dict) -> str:
+        import google.generativeai as genai
+
+        self._caching()
+        model = genai.GenerativeModel.from_cached_content(cached_content=name)
+        return model.generate_content(prompt, generation_config=generation_config).text
+
+
+class LocalContextCache(ContextCacheProvider):
+    """
+    In-process stand-in for a provider cache, for tests and development.
+
+    Responses come from responder(text, prompt), which returns "{}" unless
+    replaced. Prompts sent are recorded in requests.
+    """
+
+    def __init__(self):
+        self._contexts: Dict[str, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+        self.requests: List[Tuple[str, str]] = []  # (name, prompt)
+        self.responder: Callable[[str, str], str] = lambda text, prompt: json.dumps({})
+
+    def create(self, text: str, ttl: int) -> CachedContext:
+        context = CachedContext(
+            f"cachedContents/local-{uuid.uuid4().hex}", timezone.now() + timedelta(seconds=ttl)
+        )
+        with self._lock:
+            self._contexts[context.name] = (text, context.expires_at)
+        return context
+
+    def extend(self, name: str, ttl: int) -> CachedContext:
+        with self._lock:
+            text = self._get(name)
+            context = CachedContext(name, timezone.now() + timedelta(seconds=ttl))
+            self._contexts[name] = (text, context.expires_at)
+        return context
+
+    def delete(self, name: str):
+        with self._lock:
+            self._contexts.pop(name, None)
+
+    def generate(self, name: str, prompt: str, generation_config: Dict) -> str:
+        with self._lock:
+            text = self._get(name)
+            self.requests.append((name, prompt))
+        return self.responder(text, prompt)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._contexts and self._contexts[name][1] > timezone.now()
+
+    def _get(self, name: str) -> str:
+        if name not in self._contexts or self._contexts[name][1] <= timezone.now():
+            raise LookupError(f"Cached content {name} not found")
+        return self._contexts[name][0]
+
+
+_provider = None
+_provider_name = None
+_provider_lock = threading.Lock()
+
+
+def get_context_cache() -> Optional[ContextCacheProvider]:
+    """
+    The configured context cache provider, or None if caching is off.
+
+    Shared process-wide (the local provider relies on this) and rebuilt if
+    GENERATION_CONTEXT_CACHE changes.
+    """
+    global _provider, _provider_name
+
+    name = settings.GENERATION_CONTEXT_CACHE
+    if not name:
+        return None
+    if _provider is None or _provider_name != name:
+        with _provider_lock:
+            if _provider is None or _provider_name != name:
+                _provider = import_string(PROVIDER_ALIASES.get(name, name))()
+                _provider_name = name
+    return _provider
+
+
+def reset_context_cache():
+    """Drop the shared provider instance (used by tests)."""
+    global _provider, _provider_name
+    _provider = None
+    _provider_name = None
+
+
+def ensure_context(transcription, text: str) -> Optional[str]:
+    """
+    Name of a live cached context holding a transcript, for GENERATION_CACHE_TTL.
+
+    Reuses (extending if needed) the transcript's existing cache, or creates
+    one. Returns None when caching is off, the transcript is too short to
+    cache, or the provider fails; requests then send the transcript.
+    """
+    provider = get_context_cache()
+    if provider is None or estimate_tokens(text) < settings.GENERATION_CACHE_MIN_TOKENS:
+        return None
+
+    ttl = settings.GENERATION_CACHE_TTL
+    now = timezone.now()
+    name, expires_at = transcription.context_cache_name, transcription.context_cache_expires_at
+    context = None
+    try:
+        if name and expires_at and expires_at - now > MIN_REMAINING:
+            if expires_at - now >= timedelta(seconds=ttl):
+                return name
+            try:
+                context = provider.extend(name, ttl)
+            except Exception as e:
+                logger.info(f"Cached context {name} is gone, creating another: {e}")
+        if context is None:
+            context = provider.create(text, ttl)
+            logger.info(
+                f"Cached transcript {transcription.pk} as {context.name} "
+                f"(~{estimate_tokens(text)} tokens)"
+            )
+    except Exception as e:
+        logger.warning(f"Could not cache transcript {transcription.pk}, sending it instead: {e}")
+        return None
+
+    _store(transcription, context.name, context.expires_at)
+    return context.name
+
+
+def retain_context(transcription):
+    """Once generation is over, keep the cache for GENERATION_CACHE_RETAIN seconds or delete it."""
+    provider = get_context_cache()
+    name = transcription.context_cache_name
+    if provider is None or not name:
+        return
+
+    try:
+        if settings.GENERATION_CACHE_RETAIN > 0:
+            context = provider.extend(name, settings.GENERATION_CACHE_RETAIN)
+            _store(transcription, context.name, context.expires_at)
+            return
+        provider.delete(name)
+    except Exception as e:
+        # It expires on its own
+        logger.warning(f"Could not update cached context {name}: {e}")
+    _store(transcription, "", None)
+
+
+def _store(transcription, name: str, expires_at: Optional[datetime]):
+    transcription.context_cache_name = name
+    transcription.context_cache_expires_at = expires_at
+    transcription.save(update_fields=["context_cache_name", "context_cache_expires_at"])
@@ -0,0 +1,201 @@
+"""
+Map-reduce generation for transcripts too long for one prompt.
+
+The transcript is split into parts of at most GENERATION_CHUNK_TOKENS,
+along AssemblyAI auto_chapters boundaries when the transcript has them
+(consecutive chapters are packed together) and at sentence ends otherwise.
+Every requested material type is generated for every part in parallel (the
+map), then the parts of each type are combined (the reduce):
+
+- flashcards and quizzes are concatenated in lecture order, with repeated
+  cards/questions dropped and the total capped, sampling evenly across parts
+- summaries and notes are merged by another Gemini request, falling back to
+  joining the parts when that request fails
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .prompts import CHARS_PER_TOKEN, estimate_tokens
+from .service import GeminiService
+
+logger = logging.getLogger(__name__)
+
+# material type -> (list key, item field compared for duplicates, most items kept)
+LIST_MATERIALS = {
+    "flashcards": ("flashcards", "front", 50),
+    "quiz": ("questions", "question", 25),
+}
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_transcript(
+    text: str, timings=None, chapters: Optional[List[Dict]] = None, max_tokens: Optional[int] = None
+) -> List[str]:
+    """
+    Split a transcript into parts of at most max_tokens (GENERATION_CHUNK_TOKENS).
+
+    Args:
+        text: Transcript text
+        timings: WordTimings of the transcript, needed to split on chapters
+        chapters: AssemblyAI auto_chapters ({"start": ms, ...})
+        max_tokens: Largest part
+    """
+    max_tokens = max_tokens or settings.GENERATION_CHUNK_TOKENS
+    if not chapters or timings is None or not len(timings):
+        return _split_text(text, max_tokens)
+
+    # A chapter runs until the next one starts, so no word falls between
+    starts = sorted(chapter["start"] for chapter in chapters)
+    starts[0] = 0
+    sections = [
+        " ".join(word["text"] for word in timings.words(start, end))
+        for start, end in zip(starts, starts[1:] + [None])
+    ]
+
+    parts, current = [], []
+    for section in filter(None, sections):
+        if current and estimate_tokens(" ".join(current + [section])) > max_tokens:
+            parts.append(" ".join(current))
+            current = []
+        if estimate_tokens(section) > max_tokens:
+            parts.extend(_split_text(section, max_tokens))
+        else:
+            current.append(section)
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def _split_text(text: str, max_tokens: int) -> List[str]:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    parts, current, length = [], [], 0
+    for sentence in SENTENCE_END.split(text.strip()):
+        # A run-on "sentence" (no punctuation) is cut between words
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces = [sentence[:cut], sentence[cut:].lstrip()]
+            if current:
+                parts.append(" ".join(current))
+                current, length = [], 0
+            parts.append(pieces[0])
+            sentence = pieces[1]
+        if current and length + len(sentence) + 1 > max_chars:
+            parts.append(" ".join(current))
+            current, length = [], 0
+        if sentence:
+            current.append(sentence)
+            length += len(sentence) + 1
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def iter_map_reduce(
+    text: str, types: List[str], timings=None, chapters: Optional[List[Dict]] = None
+) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+    """
+    Generate material types for a long transcript part by part.
+
+    Yields (material type, content, None), or (material type, None, error)
+    for a type whose every part failed, as each type is ready. Parts that
+    fail are logged and left out of the reduce.
+    """
+    parts = split_transcript(text, timings, chapters)
+    count = len(parts)
+    logger.info(f"Generating {', '.join(types)} in {count} part(s)")
+
+    partials = {material_type: [None] * count for material_type in types}
+    outstanding = {material_type: count for material_type in types}
+    workers = min(settings.GENERATION_CONCURRENCY, count * len(types))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        maps = {
+            pool.submit(GeminiService.generate_content, part, material_type, (i + 1, count)): (
+                material_type,
+                i,
+            )
+            for material_type in types
+            for i, part in enumerate(parts)
+        }
+        reduces = {}
+        for future in as_completed(maps):
+            material_type, i = maps[future]
+            try:
+                partials[material_type][i] = future.result()
+            except Exception as e:
+                logger.warning(f"Part {i + 1} of {count} failed for {material_type}: {e}")
+            outstanding[material_type] -= 1
+            if outstanding[material_type]:
+                continue
+
+            done = [partial for partial in partials[material_type] if partial is not None]
+            if not done:
+                yield material_type, None, RuntimeError(f"All {count} parts failed")
+            elif material_type in LIST_MATERIALS:
+                yield material_type, merge_items(material_type, done), None
+            else:
+                reduces[pool.submit(reduce_partials, material_type, done)] = material_type
+
+        for future in as_completed(reduces):
+            yield reduces[future], future.result(), None
+
+
+def merge_items(material_type: str, partials: List[Dict]) -> Dict:
+    """
+    Concatenate per-part flashcards or quiz questions without repeats.
+
+    Past the cap for the type, items are taken round-robin across parts so
+    the whole lecture stays covered, then put back in lecture order.
+    """
+    key, field, limit = LIST_MATERIALS[material_type]
+    seen, per_part = set(), []
+    for partial in partials:
+        kept = []
+        for item in partial.get(key) or []:
+            normalized = _normalize(str(item.get(field, ""))) if isinstance(item, dict) else ""
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                kept.append(item)
+        per_part.append(kept)
+
+    picked = [(p, i) for p, items in enumerate(per_part) for i in range(len(items))]
+    if len(picked) > limit:
+        rounds = max(len(items) for items in per_part)
+        picked = sorted(
+            [(p, i) for i in range(rounds) for p in range(len(per_part)) if i < len(per_part[p])][
+                :limit
+            ]
+        )
+    return {key: [per_part[p][i] for p, i in picked]}
+
+
+def reduce_partials(material_type: str, partials: List[Dict]) -> Dict:
+    """Merge per-part summaries or notes with Gemini, or by joining them if that fails."""
+    if len(partials) == 1:
+        return partials[0]
+    try:
+        return GeminiService.reduce_content(material_type, partials)
+    except Exception as e:
+        logger.warning(f"Reducing {material_type} failed, joining parts instead: {e}")
+
+    if material_type == "summary":
+        key_points = []
+        for partial in partials:
+            for point in partial.get("key_points") or []:
+                if point not in key_points:
+                    key_points.append(point)
+        return {
+            "title": partials[0].get("title", ""),
+            "summary": "\n\n".join(p.get("summary", "") for p in partials if p.get("summary")),
+            "key_points": key_points,
+        }
+    return {"content": "\n\n".join(p.get("content", "") for p in partials if p.get("content"))}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
@@ -0,0 +1,164 @@
+"""
+Generation of a job's study materials.
+
+Three modes, chosen per job by choose_mode() (GENERATION_MODE can force
+one of the first two):
+
+- "per_type": every material type is a separate Gemini request, sent side
+  by side from a bounded thread pool (GENERATION_CONCURRENCY), so a job
+  waits for its slowest type rather than for all of them in turn.
+- "combined": one request asks for every type at once, so a long
+  transcript is sent (and prefilled) once instead of once per type. Types
+  missing from the combined response are generated per type afterwards.
+- "map_reduce": transcripts over GENERATION_MAX_INPUT_TOKENS are generated
+  part by part and the parts merged (see map_reduce).
+
+Outside map-reduce, long transcripts are sent once as provider-side cached
+content that every request references (see context_cache).
+
+Results are saved from the calling thread as they arrive, keeping database
+access off the worker threads, and a type that fails is logged without
+affecting the rest.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from django.conf import settings
+
+from apps.transcription.models import Transcription
+from .context_cache import ensure_context, retain_context
+from .map_reduce import iter_map_reduce
+from .models import GeneratedContent
+from .prompts import estimate_tokens
+from .service import GeminiService
+
+logger = logging.getLogger(__name__)
+
+# Rough response size of each material type, in tokens
+EXPECTED_OUTPUT_TOKENS = {
+    "summary": 600,
+    "notes": 2500,
+    "flashcards": 1000,
+    "quiz": 900,
+}
+
+
+@dataclass
+class GenerationResult:
+    mode: str = "per_type"
+    generated: List[str] = field(default_factory=list)  # material types saved
+    failed: Dict[str, str] = field(default_factory=dict)  # material type -> error
+
+
+def choose_mode(text: str, types: List[str]) -> str:
+    """
+    "map_reduce", "combined" or "per_type" generation for a transcript.
+
+    Transcripts over GENERATION_MAX_INPUT_TOKENS don't fit one prompt and
+    always go through map-reduce. Otherwise combining pays off once the
+    transcript is long enough (GENERATION_COMBINED_MIN_TOKENS) that sending
+    it once per type costs more than the parallelism gains, as long as
+    every type's output fits in one response (GENERATION_MAX_OUTPUT_TOKENS).
+    """
+    if estimate_tokens(text) > settings.GENERATION_MAX_INPUT_TOKENS:
+        return "map_reduce"
+    if settings.GENERATION_MODE in ("combined", "per_type"):
+        return settings.GENERATION_MODE if len(types) > 1 else "per_type"
+
+    output_tokens = sum(EXPECTED_OUTPUT_TOKENS.get(t, 1000) for t in types)
+    if (
+        len(types) > 1
+        and output_tokens <= settings.GENERATION_MAX_OUTPUT_TOKENS
+        and estimate_tokens(text) >= settings.GENERATION_COMBINED_MIN_TOKENS
+    ):
+        return "combined"
+    return "per_type"
+
+
+def generate_materials(job, transcript_text: str) -> GenerationResult:
+    """
+    Generate and store every material type a job asked for.
+
+    Types already stored (e.g. before a redelivered task) are skipped. The
+    job's progress moves from 50 to 100 as types finish.
+
+    Returns:
+        GenerationResult
+    """
+    done = set(
+        GeneratedContent.objects.filter(job=job).values_list("type", flat=True)
+    )
+    pending = [t for t in dict.fromkeys(job.material_types) if t not in done]
+    result = GenerationResult(mode=choose_mode(transcript_text, pending))
+    if not pending:
+        return result
+
+    def finished(material_type, content=None, error=None):
+        if error is None:
+            try:
+                GeneratedContent.objects.create(job=job, type=material_type, content=content)
+                result.generated.append(material_type)
+            except Exception as e:
+                error = e
+        if error is not None:
+            logger.error(f"Failed to generate {material_type} for job {job.id}: {error}")
+            # The other types are unaffected
+            result.failed[material_type] = str(error)
+
+        job.progress = 50 + 50 * (len(result.generated) + len(result.failed)) // len(pending)
+        job.save(update_fields=["progress"])
+
+    transcription = Transcription.objects.filter(job=job).first()
+    if result.mode == "map_reduce":
+        # Split along the transcript's chapters when it has them
+        chapters = transcription.raw_response.get("chapters") if transcription else None
+        timings = transcription.word_timings if chapters else None
+        for material_type, content, error in iter_map_reduce(
+            transcript_text, pending, timings, chapters
+        ):
+            finished(material_type, content, error)
+        return result
+
+    context = ensure_context(transcription, transcript_text) if transcription else None
+    # Only passed when set, as a cached context is the exception
+    cached = {"context": context} if context else {}
+
+    remaining = pending
+    if result.mode == "combined":
+        logger.info(f"Generating {', '.join(pending)} for job {job.id} in one request")
+        try:
+            contents = GeminiService.generate_combined(transcript_text, pending, **cached)
+        except Exception as e:
+            logger.warning(f"Combined generation failed for job {job.id}: {e}")
+            contents = {}
+        for material_type, content in contents.items():
+            finished(material_type, content)
+        remaining = [t for t in pending if t not in contents]
+        if remaining:
+            logger.info(f"Generating {', '.join(remaining)} for job {job.id} separately")
+
+    if remaining:
+        workers = min(settings.GENERATION_CONCURRENCY, len(remaining))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    GeminiService.generate_content, transcript_text, material_type, **cached
+                ): material_type
+                for material_type in remaining
+            }
+            if result.mode == "per_type":
+                logger.info(f"Generating {', '.join(remaining)} for job {job.id}")
+            for future in as_completed(futures):
+                try:
+                    content = future.result()
+                except Exception as e:
+                    finished(futures[future], error=e)
+                else:
+                    finished(futures[future], content)
+
+    if context:
+        retain_context(transcription)
+    return result
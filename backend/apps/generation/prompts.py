@@ -1,76 +1,140 @@
-def get_prompt_for_type(type: str, text: str) -> str:
-    base_instruction = (
-        "You are an expert tutor creating study materials from a lecture transcript."
-    )
+import json
+from typing import Dict, List, Optional, Tuple
 
-    if type == "summary":
-        return f"""{base_instruction}
-Create a concise summary of the following text.
-Focus on the main concepts and key takeaways.
-Structure it with bullet points.
+CHARS_PER_TOKEN = 4  # English text, close enough for budgeting
 
-Return your response in JSON format:
-{{
+BASE_INSTRUCTION = (
+    "You are an expert tutor creating study materials from a lecture transcript."
+)
+# Stands in for the text when it was sent ahead as cached content
+CACHED_TEXT = "The lecture transcript you were given."
+
+# material type -> (instructions, JSON response schema)
+MATERIAL_PROMPTS = {
+    "summary": (
+        """Create a concise summary of the following text.
+Focus on the main concepts and key takeaways.
+Structure it with bullet points.""",
+        """{
     "title": "Suggested Title",
     "summary": "The summary text...",
     "key_points": ["point 1", "point 2"]
-}}
+}""",
+    ),
+    "notes": (
+        """Create detailed study notes from the following text.
+Use a hierarchical structure with headings and subheadings.
+Include definitions for key terms.""",
+        """{
+    "content": "Markdown formatted study notes..."
+}""",
+    ),
+    "flashcards": (
+        """Create 10-15 flashcards from the key concepts in the text.
+Each flashcard should have a 'front' (question/concept) and 'back' (answer/definition).""",
+        """{
+    "flashcards": [
+        {"front": "concept", "back": "definition"}
+    ]
+}""",
+    ),
+    "quiz": (
+        """Create a 5-question multiple choice quiz based on the text.
+Include the correct answer index (0-3).""",
+        """{
+    "questions": [
+        {
+            "question": "The question?",
+            "options": ["A", "B", "C", "D"],
+            "correct_option": 0,
+            "explanation": "Why it is correct"
+        }
+    ]
+}""",
+    ),
+}
 
-Text:
-{text}
-"""
 
-    elif type == "notes":
-        return f"""{base_instruction}
-Create detailed study notes from the following text.
-Use a hierarchical structure with headings and subheadings.
-Include definitions for key terms.
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
 
-Return your response in JSON format:
-{{
-    "content": "Markdown formatted study notes..."
-}}
 
-Text:
-{text}
-"""
+def get_prompt_for_type(type: str, text: Optional[str], part: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Prompt for one material type.
 
-    elif type == "flashcards":
-        return f"""{base_instruction}
-Create 10-15 flashcards from the key concepts in the text.
-Each flashcard should have a 'front' (question/concept) and 'back' (answer/definition).
+    Args:
+        type: Material type
+        text: Transcript text, or None if it is in a cached context
+        part: (part number, parts) when the text is one part of a longer
+            transcript (see map_reduce)
+    """
+    if type not in MATERIAL_PROMPTS:
+        raise ValueError(f"Unknown material type: {type}")
+    instructions, schema = MATERIAL_PROMPTS[type]
+    if part:
+        instructions = (
+            f"The text is part {part[0]} of {part[1]} of a longer lecture; "
+            f"cover only what this part contains.\n{instructions}"
+        )
+
+    return f"""{BASE_INSTRUCTION}
+{instructions}
 
 Return your response in JSON format:
-{{
-    "flashcards": [
-        {{"front": "concept", "back": "definition"}}
-    ]
-}}
+{schema}
 
 Text:
-{text}
+{CACHED_TEXT if text is None else text}
 """
 
-    elif type == "quiz":
-        return f"""{base_instruction}
-Create a 5-question multiple choice quiz based on the text.
-Include the correct answer index (0-3).
 
-Return your response in JSON format:
-{{
-    "questions": [
-        {{
-            "question": "The question?",
-            "options": ["A", "B", "C", "D"],
-            "correct_option": 0,
-            "explanation": "Why it is correct"
-        }}
-    ]
-}}
+def get_combined_prompt(types: List[str], text: Optional[str]) -> str:
+    """
+    One prompt asking for several material types, so the text is sent once.
+
+    The response is a JSON object with one key per material type, each
+    holding what get_prompt_for_type() would have returned for that type
+    (see service.parse_combined_response).
+    """
+    unknown = [t for t in types if t not in MATERIAL_PROMPTS]
+    if unknown:
+        raise ValueError(f"Unknown material type: {unknown[0]}")
+
+    sections = "\n\n".join(
+        f'"{t}": {MATERIAL_PROMPTS[t][0]}' for t in types
+    )
+    schema = "{\n" + ",\n".join(
+        f'    "{t}": ' + MATERIAL_PROMPTS[t][1].replace("\n", "\n    ") for t in types
+    ) + "\n}"
+
+    return f"""{BASE_INSTRUCTION}
+Create each of the following study materials from the same text.
+
+{sections}
+
+Return your response in JSON format, with exactly these keys: {json.dumps(types)}
+{schema}
 
 Text:
-{text}
+{CACHED_TEXT if text is None else text}
 """
 
-    else:
+
+def get_reduce_prompt(type: str, partials: List[Dict]) -> str:
+    """Prompt merging one material type generated per part into one for the whole text."""
+    if type not in MATERIAL_PROMPTS:
         raise ValueError(f"Unknown material type: {type}")
+    schema = MATERIAL_PROMPTS[type][1]
+
+    return f"""{BASE_INSTRUCTION}
+The following {type} were written separately for {len(partials)} consecutive parts of one lecture, in order.
+Merge them into a single {type} for the whole lecture.
+Remove repetition, keep every distinct concept and follow the order of the lecture.
+
+Return your response in JSON format:
+{schema}
+
+Parts:
+{json.dumps(partials, indent=1, ensure_ascii=False)}
+"""
@@ -1,9 +1,11 @@
 import google.generativeai as genai
 import json
 import logging
+from typing import Dict, List, Optional, Tuple
 from django.conf import settings
 from apps.core.exceptions import ThirdPartyServiceError
-from .prompts import get_prompt_for_type
+from .context_cache import get_context_cache
+from .prompts import get_combined_prompt, get_prompt_for_type, get_reduce_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -16,36 +18,119 @@ class GeminiService:
         genai.configure(api_key=settings.GEMINI_API_KEY)
 
     @classmethod
-    def generate_content(cls, text: str, type: str) -> dict:
+    def generate_content(
+        cls,
+        text: str,
+        type: str,
+        part: Optional[Tuple[int, int]] = None,
+        context: Optional[str] = None,
+    ) -> dict:
         """
         Generates content using Gemini based on the type (summary, notes, etc).
         Returns a dictionary of the generated content.
+
+        part is (part number, parts) when text is one part of a longer
+        transcript (see map_reduce). context names cached content holding
+        the text (see context_cache), which is then not sent.
         """
         cls._configure()
 
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            prompt = get_prompt_for_type(type, text)
+            return cls._generate_json_for_text(
+                lambda prompt_text: get_prompt_for_type(type, prompt_text, part), text, context
+            )
+        except Exception as e:
+            logger.error(f"Gemini generation failed: {e}")
+            raise ThirdPartyServiceError(f"Generation failed: {str(e)}")
 
-            # Request JSON response
-            response = model.generate_content(
-                prompt, generation_config={"response_mime_type": "application/json"}
+    @classmethod
+    def generate_combined(
+        cls, text: str, types: List[str], context: Optional[str] = None
+    ) -> Dict[str, dict]:
+        """
+        Generates several material types in one request, sending the text once.
+
+        Returns:
+            Content by material type, for the types the response contained
+            in a usable form (missing ones can be generated on their own)
+        """
+        cls._configure()
+
+        try:
+            content = cls._generate_json_for_text(
+                lambda prompt_text: get_combined_prompt(types, prompt_text),
+                text,
+                context,
+                max_output_tokens=settings.GENERATION_MAX_OUTPUT_TOKENS,
             )
+            return parse_combined_response(content, types)
+        except Exception as e:
+            logger.error(f"Gemini combined generation failed: {e}")
+            raise ThirdPartyServiceError(f"Generation failed: {str(e)}")
 
-            # Parse JSON
-            try:
-                content = json.loads(response.text)
-                return content
-            except json.JSONDecodeError:
-                # Fallback: sometimes model returns markdown code block
-                text_content = response.text
-                if "```json" in text_content:
-                    text_content = text_content.split("```json")[1].split("```")[0]
-                elif "```" in text_content:
-                    text_content = text_content.split("```")[1].split("```")[0]
-
-                return json.loads(text_content)
+    @classmethod
+    def reduce_content(cls, type: str, partials: List[dict]) -> dict:
+        """Merges content of one type generated per transcript part into one."""
+        cls._configure()
 
+        try:
+            return cls._generate_json(
+                get_reduce_prompt(type, partials),
+                max_output_tokens=settings.GENERATION_MAX_OUTPUT_TOKENS,
+            )
         except Exception as e:
-            logger.error(f"Gemini generation failed: {e}")
+            logger.error(f"Gemini reduce failed: {e}")
             raise ThirdPartyServiceError(f"Generation failed: {str(e)}")
+
+    @classmethod
+    def _generate_json_for_text(cls, build_prompt, text: str, context: Optional[str], **generation_config):
+        """
+        Runs build_prompt(None) against cached content holding the text, or
+        build_prompt(text) without one (or if the cache has become unusable).
+        """
+        if context:
+            try:
+                return cls._generate_json(build_prompt(None), context, **generation_config)
+            except Exception as e:
+                logger.warning(f"Cached context {context} unusable, sending the text: {e}")
+        return cls._generate_json(build_prompt(text), **generation_config)
+
+    @classmethod
+    def _generate_json(cls, prompt: str, context: Optional[str] = None, **generation_config):
+        # Request JSON response
+        generation_config = {"response_mime_type": "application/json", **generation_config}
+        if context:
+            return cls._parse_json(get_context_cache().generate(context, prompt, generation_config))
+
+        model = genai.GenerativeModel("gemini-1.5-flash")
+        response = model.generate_content(prompt, generation_config=generation_config)
+        return cls._parse_json(response.text)
+
+    @staticmethod
+    def _parse_json(response_text: str):
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            # Fallback: sometimes model returns markdown code block
+            text_content = response_text
+            if "```json" in text_content:
+                text_content = text_content.split("```json")[1].split("```")[0]
+            elif "```" in text_content:
+                text_content = text_content.split("```")[1].split("```")[0]
+
+            return json.loads(text_content)
+
+
+def parse_combined_response(content, types: List[str]) -> Dict[str, dict]:
+    """
+    Split a combined response into content per material type.
+
+    Only requested types holding a non-empty JSON object are kept.
+    """
+    if not isinstance(content, dict):
+        raise ValueError("Combined response is not a JSON object")
+    return {
+        material_type: content[material_type]
+        for material_type in types
+        if isinstance(content.get(material_type), dict) and content[material_type]
+    }
@@ -1,8 +1,13 @@
-from django.test import TestCase
-from unittest.mock import patch
+import json
+import threading
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import MagicMock, patch
 from celery.exceptions import Retry
 from apps.ingestion.models import Job
 from apps.generation.models import GeneratedContent
+from apps.generation.pipeline import generate_materials
 from apps.ingestion.tasks import process_upload_task
 import uuid
 
@@ -33,10 +38,12 @@ class GenerationPipelineTest(TestCase):
         }
 
         # Mock Gemini Service
-        mock_generate.side_effect = [
-            {"summary": "Python is great."},  # First call (summary)
-            {"questions": []},  # Second call (quiz)
-        ]
+        # Types are generated concurrently, so answer by type rather than call order
+        generated = {
+            "summary": {"summary": "Python is great."},
+            "quiz": {"questions": []},
+        }
+        mock_generate.side_effect = lambda text, material_type: generated[material_type]
 
         # 1. First run: Submits to AssemblyAI (raises Retry)
         try:
@@ -67,3 +74,346 @@ class GenerationPipelineTest(TestCase):
 
         summary = content.get(type="summary")
         self.assertEqual(summary.content, {"summary": "Python is great."})
+
+
+class ConcurrentGenerationTest(TestCase):
+    def setUp(self):
+        self.job = Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename="test.mp3",
+            file_size_bytes=1000,
+            file_type="audio/mpeg",
+            storage_url="https://example.com/file.mp3",
+            material_types=["summary", "notes", "flashcards", "quiz"],
+            status="generating",
+            progress=50,
+        )
+
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_types_generated_at_once(self, mock_generate):
+        # Every call waits for all four to be in flight
+        barrier = threading.Barrier(4, timeout=5)
+
+        def generate(text, material_type):
+            barrier.wait()
+            return {"type": material_type}
+
+        mock_generate.side_effect = generate
+
+        result = generate_materials(self.job, "transcript")
+
+        self.assertEqual(sorted(result.generated), ["flashcards", "notes", "quiz", "summary"])
+        self.assertEqual(GeneratedContent.objects.get(job=self.job, type="quiz").content, {"type": "quiz"})
+        self.assertEqual(self.job.progress, 100)
+
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_failed_type_does_not_stop_others(self, mock_generate):
+        def generate(text, material_type):
+            if material_type == "notes":
+                raise ValueError("bad JSON")
+            return {"type": material_type}
+
+        mock_generate.side_effect = generate
+
+        result = generate_materials(self.job, "transcript")
+
+        self.assertEqual(result.failed, {"notes": "bad JSON"})
+        self.assertEqual(
+            set(GeneratedContent.objects.filter(job=self.job).values_list("type", flat=True)),
+            {"summary", "flashcards", "quiz"},
+        )
+
+        # A retry only generates what is missing
+        mock_generate.reset_mock()
+        mock_generate.side_effect = lambda text, material_type: {"type": material_type}
+        generate_materials(self.job, "transcript")
+        mock_generate.assert_called_once_with("transcript", "notes")
+
+
+class CombinedGenerationTest(TestCase):
+    def setUp(self):
+        self.job = Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename="test.mp3",
+            file_size_bytes=1000,
+            file_type="audio/mpeg",
+            storage_url="https://example.com/file.mp3",
+            material_types=["summary", "flashcards", "quiz"],
+            status="generating",
+            progress=50,
+        )
+
+    def test_combined_prompt_holds_text_once(self):
+        from apps.generation.prompts import get_combined_prompt
+
+        prompt = get_combined_prompt(["summary", "quiz"], "LECTURE TEXT")
+
+        self.assertEqual(prompt.count("LECTURE TEXT"), 1)
+        self.assertIn('"quiz": {', prompt)
+        with self.assertRaises(ValueError):
+            get_combined_prompt(["summary", "essay"], "LECTURE TEXT")
+
+    def test_parser_keeps_requested_usable_types(self):
+        from apps.generation.service import parse_combined_response
+
+        content = {
+            "summary": {"summary": "s"},
+            "quiz": [],  # wrong shape
+            "notes": {"content": "not requested"},
+        }
+
+        self.assertEqual(
+            parse_combined_response(content, ["summary", "quiz"]), {"summary": {"summary": "s"}}
+        )
+        with self.assertRaises(ValueError):
+            parse_combined_response(["summary"], ["summary"])
+
+    @override_settings(
+        GENERATION_MODE="auto", GENERATION_COMBINED_MIN_TOKENS=4000, GENERATION_MAX_OUTPUT_TOKENS=8192
+    )
+    def test_mode_follows_length_and_output_budget(self):
+        from apps.generation.pipeline import choose_mode
+
+        long_text = "word " * 10000
+        self.assertEqual(choose_mode(long_text, ["summary", "quiz"]), "combined")
+        self.assertEqual(choose_mode("short lecture", ["summary", "quiz"]), "per_type")
+        self.assertEqual(choose_mode(long_text, ["summary"]), "per_type")
+        with self.settings(GENERATION_MAX_OUTPUT_TOKENS=2000):
+            self.assertEqual(
+                choose_mode(long_text, ["summary", "notes", "quiz"]), "per_type"
+            )
+
+    @override_settings(GENERATION_MODE="combined")
+    @patch("apps.generation.service.GeminiService.generate_content")
+    @patch("apps.generation.service.GeminiService.generate_combined")
+    def test_combined_call_with_fallback_for_missing_types(self, mock_combined, mock_generate):
+        mock_combined.return_value = {"summary": {"summary": "s"}, "quiz": {"questions": []}}
+        mock_generate.return_value = {"flashcards": []}
+
+        result = generate_materials(self.job, "transcript")
+
+        self.assertEqual(result.mode, "combined")
+        mock_combined.assert_called_once_with("transcript", ["summary", "flashcards", "quiz"])
+        mock_generate.assert_called_once_with("transcript", "flashcards")
+        self.assertEqual(
+            GeneratedContent.objects.get(job=self.job, type="quiz").content, {"questions": []}
+        )
+        self.assertEqual(GeneratedContent.objects.filter(job=self.job).count(), 3)
+        self.assertEqual(self.job.progress, 100)
+
+
+@override_settings(GENERATION_MAX_INPUT_TOKENS=100, GENERATION_CHUNK_TOKENS=40)
+class MapReduceGenerationTest(TestCase):
+    def setUp(self):
+        self.job = Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename="test.mp3",
+            file_size_bytes=1000,
+            file_type="audio/mpeg",
+            storage_url="https://example.com/file.mp3",
+            material_types=["summary", "flashcards"],
+            status="generating",
+            progress=50,
+        )
+
+    def test_splits_text_at_sentence_ends(self):
+        from apps.generation.map_reduce import split_transcript
+
+        text = " ".join(f"Sentence number {i} is here." for i in range(40))
+
+        parts = split_transcript(text, max_tokens=40)
+
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(len(part) <= 160 for part in parts))
+        self.assertTrue(all(part.endswith(".") for part in parts))
+        self.assertEqual(" ".join(parts), text)
+
+    def test_splits_on_chapters(self):
+        from apps.generation.map_reduce import split_transcript
+        from apps.transcription.word_timings import pack_words, unpack_words
+
+        words = [
+            {"text": f"w{i}", "start": i * 1000, "end": i * 1000 + 500, "confidence": 1.0}
+            for i in range(30)
+        ]
+        timings = unpack_words(pack_words(words))
+        chapters = [{"start": 0}, {"start": 12000}, {"start": 14000}, {"start": 16000}]
+
+        parts = split_transcript("", timings, chapters, max_tokens=10)
+
+        self.assertEqual(parts[0].split(), [f"w{i}" for i in range(12)])
+        # Two short chapters share a part; a long one is split by length
+        self.assertEqual(parts[1], "w12 w13 w14 w15")
+        self.assertEqual(" ".join(parts[2:]).split(), [f"w{i}" for i in range(16, 30)])
+
+    def test_merges_lists_without_repeats(self):
+        from apps.generation.map_reduce import merge_items
+
+        partials = [
+            {"flashcards": [{"front": "Entropy", "back": "a"}, {"front": "Heat", "back": "b"}]},
+            {"flashcards": [{"front": "entropy!", "back": "c"}, {"front": "Work", "back": "d"}]},
+        ]
+
+        merged = merge_items("flashcards", partials)
+
+        self.assertEqual([c["front"] for c in merged["flashcards"]], ["Entropy", "Heat", "Work"])
+
+    def test_capped_lists_cover_every_part(self):
+        from apps.generation import map_reduce
+
+        partials = [
+            {"questions": [{"question": f"p{p} q{i}"} for i in range(20)]} for p in range(3)
+        ]
+
+        merged = map_reduce.merge_items("quiz", partials)["questions"]
+
+        self.assertEqual(len(merged), map_reduce.LIST_MATERIALS["quiz"][2])
+        self.assertEqual({q["question"][:2] for q in merged}, {"p0", "p1", "p2"})
+        self.assertEqual(merged[0]["question"], "p0 q0")
+        self.assertEqual(merged[-1]["question"][:2], "p2")
+
+    @patch("apps.generation.service.GeminiService.reduce_content")
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_long_transcript_generated_by_parts(self, mock_generate, mock_reduce):
+        text = " ".join(f"Sentence number {i} is here." for i in range(40))
+
+        def generate(part_text, material_type, part):
+            if material_type == "summary":
+                return {"summary": f"part {part[0]}"}
+            return {"flashcards": [{"front": "Same card", "back": "x"}, {"front": part_text[:20], "back": "y"}]}
+
+        mock_generate.side_effect = generate
+        mock_reduce.side_effect = lambda material_type, partials: {
+            "summary": " + ".join(p["summary"] for p in partials)
+        }
+
+        result = generate_materials(self.job, text)
+
+        self.assertEqual(result.mode, "map_reduce")
+        parts = mock_generate.call_count // 2
+        self.assertGreater(parts, 1)
+        summary = GeneratedContent.objects.get(job=self.job, type="summary").content
+        self.assertEqual(summary["summary"], " + ".join(f"part {i + 1}" for i in range(parts)))
+        cards = GeneratedContent.objects.get(job=self.job, type="flashcards").content["flashcards"]
+        self.assertEqual([c["front"] for c in cards].count("Same card"), 1)
+        self.assertEqual(self.job.progress, 100)
+
+    @patch("apps.generation.service.GeminiService.reduce_content", side_effect=ValueError)
+    def test_failed_reduce_joins_parts(self, mock_reduce):
+        from apps.generation.map_reduce import reduce_partials
+
+        merged = reduce_partials(
+            "summary",
+            [
+                {"title": "T", "summary": "one", "key_points": ["a", "b"]},
+                {"title": "U", "summary": "two", "key_points": ["b", "c"]},
+            ],
+        )
+
+        self.assertEqual(merged, {"title": "T", "summary": "one\n\ntwo", "key_points": ["a", "b", "c"]})
+
+
+@override_settings(
+    GEMINI_API_KEY="key",
+    GENERATION_CONTEXT_CACHE="local",
+    GENERATION_CACHE_MIN_TOKENS=10,
+    GENERATION_CACHE_TTL=900,
+    GENERATION_CACHE_RETAIN=3600,
+    GENERATION_MODE="per_type",
+)
+class ContextCacheTest(TestCase):
+    TRANSCRIPT = "This lecture covers thermodynamics and the laws of entropy in depth."
+
+    def setUp(self):
+        from apps.generation.context_cache import get_context_cache, reset_context_cache
+        from apps.transcription.models import Transcription
+
+        reset_context_cache()
+        self.addCleanup(reset_context_cache)
+        self.provider = get_context_cache()
+        self.provider.responder = lambda text, prompt: json.dumps({"prompt_words": len(prompt.split())})
+        self.job = Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename="test.mp3",
+            file_size_bytes=1000,
+            file_type="audio/mpeg",
+            storage_url="https://example.com/file.mp3",
+            material_types=["summary", "quiz"],
+            status="generating",
+            progress=50,
+        )
+        self.transcription = Transcription.objects.create(
+            job=self.job, external_id="tx_1", text=self.TRANSCRIPT
+        )
+
+    def test_requests_reference_cached_transcript(self):
+        result = generate_materials(self.job, self.TRANSCRIPT)
+
+        self.assertEqual(sorted(result.generated), ["quiz", "summary"])
+        self.assertEqual(len(self.provider.requests), 2)
+        self.assertEqual(len({name for name, _ in self.provider.requests}), 1)
+        self.assertTrue(all(self.TRANSCRIPT not in prompt for _, prompt in self.provider.requests))
+
+        # Kept past generation for regenerations
+        self.transcription.refresh_from_db()
+        self.assertIn(self.transcription.context_cache_name, self.provider)
+        self.assertGreater(
+            self.transcription.context_cache_expires_at, timezone.now() + timedelta(minutes=50)
+        )
+
+    def test_regeneration_reuses_cache(self):
+        from apps.generation.context_cache import ensure_context
+
+        first = ensure_context(self.transcription, self.TRANSCRIPT)
+        with patch.object(self.provider, "create", wraps=self.provider.create) as create:
+            self.transcription.refresh_from_db()
+            second = ensure_context(self.transcription, self.TRANSCRIPT)
+
+        self.assertEqual(first, second)
+        create.assert_not_called()
+
+    def test_expired_cache_recreated(self):
+        from apps.generation.context_cache import ensure_context
+
+        first = ensure_context(self.transcription, self.TRANSCRIPT)
+        self.provider.delete(first)
+        self.transcription.context_cache_expires_at = timezone.now() + timedelta(minutes=5)
+
+        second = ensure_context(self.transcription, self.TRANSCRIPT)
+
+        self.assertNotEqual(first, second)
+        self.assertIn(second, self.provider)
+
+    @override_settings(GENERATION_CACHE_RETAIN=0)
+    def test_cache_deleted_after_generation_without_retention(self):
+        generate_materials(self.job, self.TRANSCRIPT)
+
+        name = self.provider.requests[0][0]
+        self.transcription.refresh_from_db()
+        self.assertNotIn(name, self.provider)
+        self.assertEqual(self.transcription.context_cache_name, "")
+        self.assertIsNone(self.transcription.context_cache_expires_at)
+
+    @override_settings(GENERATION_CACHE_MIN_TOKENS=100000)
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_short_transcripts_not_cached(self, mock_generate):
+        mock_generate.return_value = {"ok": True}
+
+        generate_materials(self.job, self.TRANSCRIPT)
+
+        mock_generate.assert_any_call(self.TRANSCRIPT, "quiz")
+        self.assertEqual(self.provider.requests, [])
+
+    @patch("apps.generation.service.genai.GenerativeModel")
+    def test_unusable_cache_falls_back_to_full_prompt(self, mock_model):
+        from apps.generation.service import GeminiService
+
+        mock_model.return_value.generate_content.return_value = MagicMock(text='{"sent": true}')
+
+        content = GeminiService.generate_content(
+            self.TRANSCRIPT, "summary", context="cachedContents/gone"
+        )
+
+        self.assertEqual(content, {"sent": True})
+        prompt = mock_model.return_value.generate_content.call_args.args[0]
+        self.assertIn(self.TRANSCRIPT, prompt)
@@ -0,0 +1,195 @@
+"""
+Audio preparation before transcription.
+
+Only the audio track matters for transcription, so video uploads are
+transcoded with a local ffmpeg to low-bitrate mono audio (Opus or MP3),
+stored next to the original and submitted to AssemblyAI instead. A lecture
+video shrinks by an order of magnitude, and so does the provider's download.
+With SILENCE_TRIMMING_ENABLED, long silences are also cut out (see
+silence), for audio uploads too. Any failure falls back to submitting the
+original upload.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional
+
+from django.conf import settings
+
+from apps.core.exceptions import MediaProcessingError
+from apps.storage import get_storage
+from .models import Job
+from .silence import Span, find_speech, offset_map, select_filter
+from .validators import ALLOWED_VIDEO_TYPES
+
+logger = logging.getLogger(__name__)
+
+# codec setting -> (ffmpeg encoder, extension, content type)
+AUDIO_CODECS = {
+    "opus": ("libopus", ".ogg", "audio/ogg"),
+    "mp3": ("libmp3lame", ".mp3", "audio/mpeg"),
+}
+# Speech recognition doesn't need more
+SAMPLE_RATE = 16000
+
+# Transcodes run as one ffmpeg subprocess per call rather than on a process
+# pool: ffmpeg is already its own process, so a pool would only add Python
+# workers that sit waiting on it. This bounds how many run at once per worker
+# process (AUDIO_EXTRACTION_WORKERS) so transcodes don't starve the CPU
+_transcode_slots = None
+_slots_lock = threading.Lock()
+
+
+def _slots() -> threading.BoundedSemaphore:
+    global _transcode_slots
+    if _transcode_slots is None:
+        with _slots_lock:
+            if _transcode_slots is None:
+                _transcode_slots = threading.BoundedSemaphore(settings.AUDIO_EXTRACTION_WORKERS)
+    return _transcode_slots
+
+
+def needs_extraction(job: Job) -> bool:
+    """Whether a job's media is a video whose audio should be extracted."""
+    ext = os.path.splitext(job.filename)[1].lower().lstrip(".")
+    return settings.AUDIO_EXTRACTION_ENABLED and ext in ALLOWED_VIDEO_TYPES
+
+
+def needs_preprocessing(job: Job) -> bool:
+    """Whether a job's audio should be prepared before submission."""
+    return needs_extraction(job) or settings.SILENCE_TRIMMING_ENABLED
+
+
+def audio_key(job: Job, ext: str, trimmed: bool = False) -> str:
+    """Object key of a job's audio derivative, shared by identical uploads."""
+    name = job.content_hash or str(job.id)
+    suffix = ".trimmed" if trimmed else ""
+    if job.content_hash:
+        return f"audio/{name[:2]}/{name}{suffix}{ext}"
+    return f"audio/{name}{suffix}{ext}"
+
+
+def transcode_audio(
+    source_path: str,
+    dest_path: str,
+    codec: Optional[str] = None,
+    spans: Optional[List[Span]] = None,
+    clip: Optional[Span] = None,
+):
+    """
+    Drop every stream but audio and transcode it to mono speech-quality audio.
+
+    Args:
+        source_path: Input media file
+        dest_path: Output audio file
+        codec: Key of AUDIO_CODECS (defaults to AUDIO_EXTRACTION_CODEC)
+        spans: Only keep these (start, end) seconds, joined back to back
+        clip: Only transcode this (start, end) in seconds (seeks, so cheap)
+
+    Raises:
+        MediaProcessingError: If ffmpeg is missing, fails or times out
+    """
+    encoder = AUDIO_CODECS[codec or settings.AUDIO_EXTRACTION_CODEC][0]
+    filters = []
+    if spans:
+        # Long span lists can outgrow a command-line argument
+        script_path = dest_path + ".filter"
+        with open(script_path, "w") as script:
+            script.write(select_filter(spans))
+        filters = ["-filter_script:a", script_path]
+    seek = []
+    if clip:
+        seek = ["-ss", f"{clip[0]:.3f}", "-to", f"{clip[1]:.3f}"]
+    command = [
+        settings.FFMPEG_BINARY,
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-y",
+        *seek,
+        "-i", source_path,
+        "-map", "0:a:0",
+        "-vn", "-sn", "-dn",
+        *filters,
+        "-ac", "1",
+        "-ar", str(SAMPLE_RATE),
+        "-c:a", encoder,
+        "-b:a", settings.AUDIO_EXTRACTION_BITRATE,
+        dest_path,
+    ]
+    try:
+        with _slots():
+            subprocess.run(
+                command,
+                check=True,
+                capture_output=True,
+                timeout=settings.AUDIO_EXTRACTION_TIMEOUT,
+            )
+    except FileNotFoundError:
+        raise MediaProcessingError(f"ffmpeg not found at {settings.FFMPEG_BINARY}")
+    except subprocess.TimeoutExpired:
+        raise MediaProcessingError(
+            f"ffmpeg timed out after {settings.AUDIO_EXTRACTION_TIMEOUT}s"
+        )
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode(errors="replace").strip()[-500:]
+        raise MediaProcessingError(f"ffmpeg failed ({e.returncode}): {stderr}")
+
+
+def prepare_audio(job: Job):
+    """
+    Store the audio to submit for a job, setting job.audio_url and time_offsets.
+
+    Both stay empty (submit the original) when there is nothing to gain or
+    preparing the audio fails. Identical media reuses another job's result.
+    """
+    if job.content_hash:
+        shared = (
+            Job.objects.filter(content_hash=job.content_hash)
+            .exclude(pk=job.pk)
+            .exclude(audio_url="")
+            .only("audio_url", "time_offsets")
+            .first()
+        )
+        if shared is not None:
+            logger.info(f"Reusing prepared audio {shared.audio_url} for job {job.id}")
+            job.audio_url, job.time_offsets = shared.audio_url, shared.time_offsets
+            return
+
+    codec = settings.AUDIO_EXTRACTION_CODEC
+    _, ext, content_type = AUDIO_CODECS[codec]
+    storage = get_storage()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="noteably-audio-") as workdir:
+            source_path = os.path.join(workdir, "source" + os.path.splitext(job.filename)[1])
+            dest_path = os.path.join(workdir, "audio" + ext)
+
+            source = storage.open(storage.key_from_url(job.storage_url), job.file_size_bytes)
+            with open(source_path, "wb") as out:
+                shutil.copyfileobj(source, out, length=1024 * 1024)
+
+            spans = find_speech(source_path) if settings.SILENCE_TRIMMING_ENABLED else None
+            if spans is None and not needs_extraction(job):
+                return
+
+            transcode_audio(source_path, dest_path, codec, spans)
+
+            size = os.path.getsize(dest_path)
+            key = audio_key(job, ext, trimmed=spans is not None)
+            with open(dest_path, "rb") as audio:
+                url = storage.save(audio, key, content_type, size)
+    except Exception as e:
+        logger.warning(f"Audio preparation failed for job {job.id}, submitting original: {e}")
+        return
+
+    job.audio_url = url
+    job.time_offsets = offset_map(spans) if spans else None
+    logger.info(
+        f"Prepared audio for job {job.id}: {job.file_size_bytes / 1024 / 1024:.1f}MB -> "
+        f"{size / 1024 / 1024:.1f}MB {codec}" + (f", {len(spans)} span(s) kept" if spans else "")
+    )
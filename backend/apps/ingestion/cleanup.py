@@ -0,0 +1,187 @@
+"""
+Retention and orphan cleanup for stored media and job rows.
+
+Jobs are walked in primary-key order in fixed-size batches, so memory stays
+flat however many rows match, and each batch's media is removed with one
+batch delete. Media can be shared between jobs (see dedup), so an
+object is only deleted once no remaining job references it.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.storage import get_storage
+from apps.storage.base import DELETE_BATCH_SIZE
+from .models import Job
+from .quota import release_expired_reservations, release_reservation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CleanupStats:
+    jobs_deleted: int = 0
+    media_expired: int = 0
+    objects_deleted: int = 0
+    uploads_aborted: int = 0
+    reservations_released: int = 0
+
+
+def cleanup_storage(
+    batch_size: int = DELETE_BATCH_SIZE, sweep_orphans: bool = True, prefix: str = ""
+) -> CleanupStats:
+    """
+    Run every cleanup pass.
+
+    Args:
+        batch_size: Jobs (and so object keys) handled per batch
+        sweep_orphans: Also list the bucket for objects no job references
+        prefix: Restrict the orphan sweep to keys under this prefix
+
+    Returns:
+        CleanupStats
+    """
+    stats = CleanupStats()
+    now = timezone.now()
+
+    stats.reservations_released += release_expired_reservations(now)
+    if settings.FAILED_JOB_RETENTION_DAYS:
+        purge_failed_jobs(
+            now - timedelta(days=settings.FAILED_JOB_RETENTION_DAYS), batch_size, stats
+        )
+    if settings.MEDIA_RETENTION_DAYS:
+        expire_media(now - timedelta(days=settings.MEDIA_RETENTION_DAYS), batch_size, stats)
+    if sweep_orphans:
+        grace_cutoff = now - timedelta(hours=settings.ORPHAN_GRACE_HOURS)
+        sweep_orphaned_objects(grace_cutoff, stats, prefix)
+        abort_stale_uploads(grace_cutoff, stats, prefix)
+
+    logger.info(f"Storage cleanup finished: {stats}")
+    return stats
+
+
+def purge_failed_jobs(older_than, batch_size: int, stats: CleanupStats):
+    """Delete failed jobs created before older_than, along with their media."""
+    jobs = Job.objects.filter(status="failed", created_at__lt=older_than)
+    for batch in _iter_batches(jobs, batch_size):
+        done = _delete_media(batch, stats)
+        Job.objects.filter(pk__in=done).delete()
+        stats.jobs_deleted += len(done)
+
+
+def expire_media(older_than, batch_size: int, stats: CleanupStats):
+    """
+    Delete media of jobs completed before older_than.
+
+    The jobs and their generated materials are kept; only the source file
+    and its extracted audio go.
+    """
+    jobs = Job.objects.filter(status="completed", completed_at__lt=older_than).filter(
+        ~Q(storage_url="") | ~Q(audio_url="")
+    )
+    for batch in _iter_batches(jobs, batch_size):
+        done = _delete_media(batch, stats)
+        stats.media_expired += Job.objects.filter(pk__in=done).update(
+            storage_url="", audio_url=""
+        )
+
+
+def sweep_orphaned_objects(older_than, stats: CleanupStats, prefix: str = ""):
+    """
+    Delete objects last modified before older_than that no job references.
+
+    The grace period covers uploads whose job row doesn't exist yet
+    (presigned uploads awaiting finalize, streams mid-request).
+    """
+    storage = get_storage()
+    if not storage.addressable:
+        # Can't map keys back to storage URLs, so nothing is provably orphaned
+        logger.warning("Storage URLs are not configured, skipping orphan sweep")
+        return
+
+    for page in storage.iter_object_pages(prefix):
+        candidates = {
+            storage.url(obj["Key"]): obj["Key"]
+            for obj in page
+            if obj["LastModified"] < older_than
+        }
+        if not candidates:
+            continue
+
+        referenced = _referenced_urls(candidates)
+        orphans = [key for url, key in candidates.items() if url not in referenced]
+        if orphans:
+            failed = storage.delete_many(orphans)
+            stats.objects_deleted += len(orphans) - len(failed)
+
+
+def abort_stale_uploads(older_than, stats: CleanupStats, prefix: str = ""):
+    """
+    Abort multipart uploads started before older_than and never completed.
+
+    The quota reserved for them, if still held, goes back to the user.
+    """
+    storage = get_storage()
+    for upload in storage.iter_multipart_uploads(prefix):
+        if upload["Initiated"] < older_than:
+            storage.abort_multipart(upload["Key"], upload["UploadId"])
+            stats.uploads_aborted += 1
+            stats.reservations_released += release_reservation(upload["Key"])
+
+
+def _iter_batches(queryset, batch_size: int):
+    """
+    Yield lists of jobs (id and media URLs only) in primary-key order.
+
+    Keyset pagination rather than a server-side cursor: callers delete and
+    update rows between batches, and a job left behind (its media failed to
+    delete) is simply skipped until the next run.
+    """
+    queryset = queryset.only("id", "storage_url", "audio_url").order_by("pk")
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def _delete_media(jobs: list, stats: CleanupStats) -> list:
+    """
+    Delete the media of a batch of jobs, keeping objects other jobs still use.
+
+    Returns:
+        IDs of the jobs whose media is gone
+    """
+    storage = get_storage()
+    urls = {url for job in jobs for url in _media_urls(job)}
+    still_used = _referenced_urls(urls, exclude=[job.pk for job in jobs])
+
+    keys = [storage.key_from_url(url) for url in urls - still_used]
+    failed = set(storage.delete_many(keys)) if keys else set()
+    stats.objects_deleted += len(keys) - len(failed)
+
+    return [
+        job.pk
+        for job in jobs
+        if not any(storage.key_from_url(url) in failed for url in _media_urls(job))
+    ]
+
+
+def _media_urls(job) -> list:
+    return [url for url in (job.storage_url, job.audio_url) if url]
+
+
+def _referenced_urls(urls, exclude=()) -> set:
+    """Those of urls that some job (other than the excluded ones) stores."""
+    jobs = Job.objects.exclude(pk__in=exclude)
+    return set(
+        jobs.filter(storage_url__in=urls).values_list("storage_url", flat=True)
+    ) | set(jobs.filter(audio_url__in=urls).values_list("audio_url", flat=True))
@@ -0,0 +1,160 @@
+"""
+Content-addressed deduplication of uploads and transcripts.
+
+Media is stored under a key derived from its SHA-256, so identical uploads
+(the same lecture recording shared across a course) are stored once, and
+a job whose media was already transcribed reuses that transcript instead
+of sending the file to AssemblyAI again.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Optional
+
+from apps.storage import get_storage
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file) -> str:
+    """
+    SHA-256 of an uploaded file's contents.
+
+    Args:
+        file: Django File / UploadedFile
+
+    Returns:
+        Hex digest
+    """
+    hasher = hashlib.sha256()
+    for chunk in file.chunks(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def hash_stored_media(job: Job) -> Optional[str]:
+    """
+    Fill in the content hash of media uploaded straight to storage.
+
+    Presigned uploads never pass through the API, so their bytes are hashed
+    here by streaming the stored object. Failure only costs deduplication.
+
+    Returns:
+        Hex digest, or None if the object couldn't be read
+    """
+    storage = get_storage()
+    try:
+        key = storage.key_from_url(job.storage_url)
+        head = storage.head(key)
+        if head is None:
+            return None
+        hasher = hashlib.sha256()
+        for chunk in storage.iter_chunks(key, head["size"], HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    except Exception as e:
+        logger.warning(f"Could not hash media for job {job.id}: {e}")
+        return None
+
+    job.content_hash = hasher.hexdigest()
+    job.save(update_fields=["content_hash"])
+    return job.content_hash
+
+
+def content_key(sha256: str, filename: str) -> str:
+    """Storage key for media with the given content hash."""
+    ext = os.path.splitext(filename)[1].lower()
+    return f"media/{sha256[:2]}/{sha256}{ext}"
+
+
+def store_media(file, sha256: str, content_type: Optional[str] = None) -> str:
+    """
+    Upload media under its content key, skipping the upload if it's already stored.
+
+    Args:
+        file: Django File / UploadedFile
+        sha256: Hex digest of the file's contents
+        content_type: MIME type
+
+    Returns:
+        Public URL of the stored media
+    """
+    storage = get_storage()
+    key = content_key(sha256, file.name)
+    if storage.head(key) is not None:
+        logger.info(f"Media {sha256} already stored, skipping upload")
+        return storage.url(key)
+    return storage.save(file, key, content_type)
+
+
+def promote_streamed_upload(file) -> str:
+    """
+    Move a streamed upload from its temporary key to its content key.
+
+    The bytes have already been sent by the time the hash is known, so a
+    duplicate just drops its temporary copy. If the copy fails the upload
+    stays where it is; it's still usable, only not deduplicated.
+
+    Args:
+        file: StreamedUploadedFile
+
+    Returns:
+        Public URL of the stored media
+    """
+    storage = get_storage()
+    key = content_key(file.sha256, file.name)
+    try:
+        if storage.head(key) is None:
+            storage.copy(file.key, key)
+        else:
+            logger.info(f"Media {file.sha256} already stored, dropping streamed copy")
+    except Exception as e:
+        logger.warning(f"Could not deduplicate {file.key}: {e}")
+        return file.storage_url
+
+    try:
+        storage.delete(file.key)
+    except Exception as e:
+        logger.warning(f"Failed to delete temporary upload {file.key}: {e}")
+    return storage.url(key)
+
+
+def find_reusable_transcription(job: Job):
+    """
+    Find a finished transcription of identical media from another job.
+
+    Returns:
+        Transcription, or None
+    """
+    from apps.transcription.models import Transcription
+
+    if not job.content_hash:
+        return None
+    return (
+        Transcription.objects.filter(job__content_hash=job.content_hash)
+        .exclude(job=job)
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def find_inflight_transcription_id(job: Job) -> Optional[str]:
+    """
+    Find an AssemblyAI transcript already being produced for identical media.
+
+    Returns:
+        External transcript ID to poll instead of submitting again, or None
+    """
+    if not job.content_hash:
+        return None
+    return (
+        Job.objects.filter(content_hash=job.content_hash, status="transcribing")
+        .exclude(id=job.id)
+        .exclude(transcription_id__isnull=True)
+        .values_list("transcription_id", flat=True)
+        .first()
+    )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from apps.ingestion.cleanup import cleanup_storage
+from apps.storage.base import DELETE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Delete expired media, old failed jobs and orphaned stored objects"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DELETE_BATCH_SIZE,
+            help="Jobs handled per batch (at most 1000 keys per delete request)",
+        )
+        parser.add_argument(
+            "--skip-orphans",
+            action="store_true",
+            help="Don't list the bucket for unreferenced objects",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="",
+            help="Only sweep keys under this prefix for orphans",
+        )
+
+    def handle(self, *args, **options):
+        stats = cleanup_storage(
+            batch_size=min(options["batch_size"], DELETE_BATCH_SIZE),
+            sweep_orphans=not options["skip_orphans"],
+            prefix=options["prefix"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {stats.jobs_deleted} failed job(s), expired media of "
+                f"{stats.media_expired} job(s), removed {stats.objects_deleted} "
+                f"object(s) and aborted {stats.uploads_aborted} stale upload(s)"
+            )
+        )
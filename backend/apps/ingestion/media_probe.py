@@ -0,0 +1,374 @@
+"""
+Media duration probing from container headers.
+
+Reads only the few header structures needed to compute a duration (seeking
+past media payloads), so probing a 100 MB upload touches kilobytes rather
+than the whole body. Supports WAV, AVI, FLAC, MP3 (Xing/Info/VBRI or CBR),
+ADTS AAC, MP4/MOV/M4A and Matroska/WebM.
+"""
+
+import logging
+import struct
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on bytes read while probing one file
+MAX_PROBE_BYTES = 2 * 1024 * 1024
+
+
+class ProbeError(Exception):
+    """Headers are missing, truncated or not understood."""
+
+    pass
+
+
+class _Reader:
+    """Seekable reader that enforces a total read budget."""
+
+    def __init__(self, fileobj: BinaryIO, size: int, budget: int = MAX_PROBE_BYTES):
+        self.fileobj = fileobj
+        self.size = size
+        self.budget = budget
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        if offset < 0 or offset >= self.size:
+            raise ProbeError(f"Offset {offset} outside file")
+        length = min(length, self.size - offset)
+        if length > self.budget:
+            raise ProbeError("Probe read budget exhausted")
+        self.budget -= length
+
+        self.fileobj.seek(offset)
+        data = self.fileobj.read(length)
+        if len(data) < length:
+            raise ProbeError("Unexpected end of file")
+        return data
+
+
+def probe_duration(fileobj: BinaryIO, size: Optional[int] = None) -> Optional[float]:
+    """
+    Determine media duration from container headers.
+
+    The file position is restored afterwards.
+
+    Args:
+        fileobj: Seekable binary file object
+        size: Total size in bytes (determined by seeking if omitted)
+
+    Returns:
+        Duration in seconds, or None if the headers don't tell us
+    """
+    position = fileobj.tell()
+    try:
+        if size is None:
+            size = fileobj.seek(0, 2)
+        if size < 12:
+            return None
+
+        reader = _Reader(fileobj, size)
+        head = reader.read_at(0, 12)
+
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            duration = _probe_wav(reader)
+        elif head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+            duration = _probe_avi(reader)
+        elif head[:4] == b"fLaC":
+            duration = _probe_flac(reader)
+        elif head[:4] == b"\x1a\x45\xdf\xa3":
+            duration = _probe_matroska(reader)
+        elif head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+            duration = _probe_mp4(reader)
+        elif head[:3] == b"ID3" or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            duration = _probe_mpeg_audio(reader)
+        else:
+            return None
+    except (ProbeError, struct.error, ZeroDivisionError) as e:
+        logger.debug(f"Duration probe failed: {e}")
+        return None
+    finally:
+        fileobj.seek(position)
+
+    if duration is None or duration <= 0:
+        return None
+    return duration
+
+
+# RIFF (WAV / AVI)
+
+
+def _riff_chunks(reader: _Reader, start: int, end: int):
+    offset = start
+    while offset + 8 <= end:
+        chunk_id, chunk_size = struct.unpack("<4sI", reader.read_at(offset, 8))
+        yield chunk_id, offset + 8, chunk_size
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+
+def _probe_wav(reader: _Reader) -> Optional[float]:
+    byte_rate = None
+    for chunk_id, data_offset, chunk_size in _riff_chunks(reader, 12, reader.size):
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", reader.read_at(data_offset + 8, 4))[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                raise ProbeError("WAV data chunk before fmt chunk")
+            # Streaming writers leave the size at 0/0xFFFFFFFF; use what's there
+            if chunk_size in (0, 0xFFFFFFFF):
+                chunk_size = reader.size - data_offset
+            return min(chunk_size, reader.size - data_offset) / byte_rate
+    return None
+
+
+def _probe_avi(reader: _Reader) -> Optional[float]:
+    for chunk_id, data_offset, chunk_size in _riff_chunks(reader, 12, reader.size):
+        if chunk_id == b"LIST" and reader.read_at(data_offset, 4) == b"hdrl":
+            header_id, _ = struct.unpack("<4sI", reader.read_at(data_offset + 4, 8))
+            if header_id != b"avih":
+                return None
+            avih = reader.read_at(data_offset + 12, 20)
+            microseconds_per_frame = struct.unpack_from("<I", avih, 0)[0]
+            total_frames = struct.unpack_from("<I", avih, 16)[0]
+            return microseconds_per_frame * total_frames / 1_000_000
+    return None
+
+
+# FLAC
+
+
+def _probe_flac(reader: _Reader) -> Optional[float]:
+    block_header = reader.read_at(4, 4)
+    if block_header[0] & 0x7F != 0:  # STREAMINFO must come first
+        return None
+
+    streaminfo = reader.read_at(8, 34)
+    packed = int.from_bytes(streaminfo[10:18], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+# MPEG audio (MP3) and ADTS (AAC)
+
+_MPEG_BITRATES = {
+    # (version_is_mpeg1, layer): kbps by index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MPEG_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+_ADTS_SAMPLE_RATES = [
+    96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350
+]
+
+
+def _skip_id3(reader: _Reader) -> int:
+    header = reader.read_at(0, 10)
+    if header[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _probe_mpeg_audio(reader: _Reader) -> Optional[float]:
+    audio_start = _skip_id3(reader)
+    window = reader.read_at(audio_start, 4096)
+
+    # Find the first frame sync after any tag padding
+    for i in range(len(window) - 4):
+        if window[i] == 0xFF and window[i + 1] & 0xE0 == 0xE0:
+            if window[i + 1] & 0x06 == 0:  # layer bits 00 -> ADTS AAC
+                return _probe_adts(reader, audio_start + i)
+            header = struct.unpack(">I", window[i:i + 4])[0]
+            duration = _probe_mpeg_frame(reader, audio_start + i, header)
+            if duration is not None:
+                return duration
+    return None
+
+
+def _probe_mpeg_frame(reader: _Reader, offset: int, header: int) -> Optional[float]:
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 0x3
+    channel_mode = (header >> 6) & 0x3
+
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    sample_rate = _MPEG_SAMPLE_RATES[version_bits][sample_rate_index]
+    bitrate = _MPEG_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 2 or mpeg1:
+        samples_per_frame = 1152
+    else:
+        samples_per_frame = 576
+
+    # VBR files carry a frame count in a Xing/Info or VBRI header in frame one
+    mono = channel_mode == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    frame = reader.read_at(offset, min(4 + side_info + 16, reader.size - offset))
+    tag = frame[4 + side_info:8 + side_info]
+    if tag in (b"Xing", b"Info") and len(frame) >= 16 + side_info:
+        flags = struct.unpack(">I", frame[8 + side_info:12 + side_info])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", frame[12 + side_info:16 + side_info])[0]
+            return frames * samples_per_frame / sample_rate
+
+    vbri = reader.read_at(offset + 36, 18) if offset + 54 <= reader.size else b""
+    if vbri[:4] == b"VBRI":
+        frames = struct.unpack(">I", vbri[14:18])[0]
+        return frames * samples_per_frame / sample_rate
+
+    # Constant bitrate: duration follows from the payload size
+    return (reader.size - offset) * 8 / bitrate
+
+
+def _probe_adts(reader: _Reader, offset: int, max_frames: int = 64) -> Optional[float]:
+    """ADTS has no duration field; extrapolate from the average of the first frames."""
+    start = offset
+    frames = 0
+    sample_rate = None
+    while frames < max_frames and offset + 7 <= reader.size:
+        header = reader.read_at(offset, 7)
+        if header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+            break
+        sample_rate_index = (header[2] >> 2) & 0xF
+        if sample_rate_index >= len(_ADTS_SAMPLE_RATES):
+            return None
+        sample_rate = _ADTS_SAMPLE_RATES[sample_rate_index]
+        frame_length = ((header[3] & 0x3) << 11) | (header[4] << 3) | (header[5] >> 5)
+        if frame_length < 7:
+            break
+        offset += frame_length
+        frames += 1
+
+    if not frames or not sample_rate:
+        return None
+    average_frame_length = (offset - start) / frames
+    total_frames = (reader.size - start) / average_frame_length
+    return total_frames * 1024 / sample_rate
+
+
+# ISO base media (MP4 / MOV / M4A)
+
+
+def _mp4_boxes(reader: _Reader, start: int, end: int):
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", reader.read_at(offset, 8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", reader.read_at(offset + 8, 8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            raise ProbeError(f"Invalid MP4 box size for {box_type!r}")
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def _probe_mp4(reader: _Reader) -> Optional[float]:
+    # moov may sit after mdat; box headers let us jump straight past the media
+    for box_type, data_start, box_end in _mp4_boxes(reader, 0, reader.size):
+        if box_type != b"moov":
+            continue
+        for child_type, child_start, _ in _mp4_boxes(reader, data_start, box_end):
+            if child_type != b"mvhd":
+                continue
+            version = reader.read_at(child_start, 1)[0]
+            if version == 1:
+                timescale, duration = struct.unpack(">IQ", reader.read_at(child_start + 20, 12))
+            else:
+                timescale, duration = struct.unpack(">II", reader.read_at(child_start + 12, 8))
+            if not timescale or duration in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                return None
+            return duration / timescale
+        return None
+    return None
+
+
+# Matroska / WebM (EBML)
+
+_EBML_HEADER = 0x1A45DFA3
+_MKV_SEGMENT = 0x18538067
+_MKV_INFO = 0x1549A966
+_MKV_CLUSTER = 0x1F43B675
+_MKV_TIMECODE_SCALE = 0x2AD7B1
+_MKV_DURATION = 0x4489
+
+
+def _read_vint(reader: _Reader, offset: int, strip_marker: bool):
+    first = reader.read_at(offset, 1)[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ProbeError("Invalid EBML variable-length integer")
+
+    data = reader.read_at(offset, length)
+    value = int.from_bytes(data, "big")
+    if strip_marker:
+        value &= (1 << (7 * length)) - 1
+        if value == (1 << (7 * length)) - 1:
+            value = None  # Unknown size
+    return value, length
+
+
+def _ebml_elements(reader: _Reader, start: int, end: int):
+    offset = start
+    while offset < end:
+        element_id, id_length = _read_vint(reader, offset, strip_marker=False)
+        size, size_length = _read_vint(reader, offset + id_length, strip_marker=True)
+        data_start = offset + id_length + size_length
+        yield element_id, data_start, size
+        if size is None:
+            return
+        offset = data_start + size
+
+
+def _probe_matroska(reader: _Reader) -> Optional[float]:
+    for element_id, data_start, size in _ebml_elements(reader, 0, reader.size):
+        if element_id == _EBML_HEADER:
+            continue
+        if element_id != _MKV_SEGMENT:
+            return None
+
+        segment_end = reader.size if size is None else min(data_start + size, reader.size)
+        for child_id, child_start, child_size in _ebml_elements(reader, data_start, segment_end):
+            if child_id == _MKV_CLUSTER or child_size is None:
+                return None
+            if child_id == _MKV_INFO:
+                return _parse_matroska_info(reader, child_start, child_start + child_size)
+        return None
+    return None
+
+
+def _parse_matroska_info(reader: _Reader, start: int, end: int) -> Optional[float]:
+    timecode_scale = 1_000_000  # nanoseconds per tick (Matroska default)
+    duration = None
+    for element_id, data_start, size in _ebml_elements(reader, start, end):
+        if element_id == _MKV_TIMECODE_SCALE:
+            timecode_scale = int.from_bytes(reader.read_at(data_start, size), "big")
+        elif element_id == _MKV_DURATION:
+            fmt = ">f" if size == 4 else ">d"
+            duration = struct.unpack(fmt, reader.read_at(data_start, size))[0]
+
+    if duration is None:
+        return None
+    return duration * timecode_scale / 1_000_000_000
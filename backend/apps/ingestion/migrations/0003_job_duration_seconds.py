@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0002_alter_job_transcription_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='duration_seconds',
+            field=models.FloatField(blank=True, help_text='Media duration counted against quota', null=True),
+        ),
+    ]
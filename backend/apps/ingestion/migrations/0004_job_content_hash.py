@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0003_job_duration_seconds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the media, used to reuse storage and transcripts', max_length=64),
+        ),
+    ]
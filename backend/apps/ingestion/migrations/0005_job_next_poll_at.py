@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0004_job_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='next_poll_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When the transcription poller next checks this job', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0005_job_next_poll_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='audio_url',
+            field=models.TextField(blank=True, help_text='Audio-only derivative of a video, submitted for transcription'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0006_job_audio_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='time_offsets',
+            field=models.JSONField(blank=True, help_text='[[trimmed_ms, original_ms], ...] when silence was cut from audio_url', null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0007_job_time_offsets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=1024, unique=True)),
+                ('user_id', models.UUIDField()),
+                ('minutes', models.FloatField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'upload_reservations',
+            },
+        ),
+    ]
@@ -25,7 +25,24 @@ class Job(models.Model):
     filename = models.CharField(max_length=255)
     file_size_bytes = models.BigIntegerField()
     file_type = models.CharField(max_length=50)
-    storage_url = models.TextField()  # Cloudflare R2 URL
+    storage_url = models.TextField()  # URL from the storage backend (R2 in production)
+    audio_url = models.TextField(
+        blank=True, help_text="Audio-only derivative of a video, submitted for transcription"
+    )
+    time_offsets = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="[[trimmed_ms, original_ms], ...] when silence was cut from audio_url",
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 of the media, used to reuse storage and transcripts",
+    )
+    duration_seconds = models.FloatField(
+        null=True, blank=True, help_text="Media duration counted against quota"
+    )
 
     # Material selection (what user requested)
     material_types = models.JSONField(
@@ -55,6 +72,12 @@ class Job(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     started_at = models.DateTimeField(null=True, blank=True)
+    next_poll_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When the transcription poller next checks this job",
+    )
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
@@ -70,13 +93,39 @@ class Job(models.Model):
 
     def estimate_processing_time(self) -> int:
         """
-        Estimate processing time in seconds based on file size.
+        Estimate processing time in seconds based on media duration.
 
         Returns:
             Estimated seconds
         """
         # Rough estimate: 1 minute of audio = 30 seconds processing
         # You can refine this based on actual metrics
+        if self.duration_seconds:
+            return int(self.duration_seconds / 2)
+
+        # No probed duration: guess it from file size
         size_mb = self.file_size_bytes / (1024 * 1024)
         estimated_duration_minutes = size_mb / 10  # Rough estimate
         return int(estimated_duration_minutes * 30)
+
+
+class UploadReservation(models.Model):
+    """
+    Quota reserved by create_upload for a direct upload not finalized yet.
+
+    The row is removed exactly once (see quota.claim_reservation): by the
+    finalize that consumes it, or by cleanup when the upload token expires
+    or its multipart upload is aborted, which give the quota back.
+    """
+
+    key = models.CharField(max_length=1024, unique=True)
+    user_id = models.UUIDField()
+    minutes = models.FloatField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "upload_reservations"
+
+    def __str__(self):
+        return f"Reservation {self.key} ({self.minutes:.1f} min)"
@@ -0,0 +1,143 @@
+"""
+Duration-aware polling schedule for in-flight transcripts.
+
+AssemblyAI's turnaround scales with media length, so a job's first check
+is placed where its transcript is likely to be ready (media duration times
+the median turnaround ratio seen on recent jobs) and later checks back off
+as the job overruns that estimate. Jitter spreads out jobs submitted
+together. Every job also gets a hard deadline, derived from the slow end of
+the observed ratios, after which it is failed.
+"""
+
+import random
+import statistics
+from datetime import timedelta
+from typing import Tuple
+
+from django.conf import settings
+
+from apps.core.cache import TTLCache
+
+MIN_POLL_DELAY = 3.0  # seconds
+JITTER = 0.2  # +/- fraction applied to every delay
+OVERRUN_BACKOFF = 0.25  # extra delay per second past the expected turnaround
+HISTORY_SIZE = 200  # recent transcripts used to estimate turnaround ratios
+# Outliers (e.g. jobs stuck behind an outage) shouldn't skew the estimate
+MAX_PLAUSIBLE_RATIO = 10.0
+
+_ratio_cache = TTLCache(maxsize=1, ttl=600)
+
+
+def turnaround_ratios() -> Tuple[float, float]:
+    """
+    Median and 90th percentile of transcription time / media duration.
+
+    Measured from submission (Job.started_at) to the stored transcript over
+    recent jobs; falls back to TRANSCRIPTION_TURNAROUND_RATIO with too
+    little history.
+    """
+    cached = _ratio_cache.get("ratios")
+    if cached is not None:
+        return cached
+
+    from apps.transcription.models import Transcription
+
+    rows = (
+        Transcription.objects.filter(
+            job__started_at__isnull=False, job__duration_seconds__gt=0
+        )
+        .order_by("-created_at")
+        .values_list("created_at", "job__started_at", "job__duration_seconds")[
+            :HISTORY_SIZE
+        ]
+    )
+    ratios = sorted(
+        ratio
+        for ratio in (
+            (created - started).total_seconds() / duration
+            for created, started, duration in rows
+        )
+        if 0 < ratio <= MAX_PLAUSIBLE_RATIO
+    )
+
+    prior = settings.TRANSCRIPTION_TURNAROUND_RATIO
+    if len(ratios) < 10:
+        result = (prior, prior * 2)
+    else:
+        result = (
+            statistics.median(ratios),
+            ratios[min(int(len(ratios) * 0.9), len(ratios) - 1)],
+        )
+    _ratio_cache.set("ratios", result)
+    return result
+
+
+def media_seconds(job) -> float:
+    """
+    Probed media duration, or a guess from the file size.
+
+    Chunked transcripts (see transcription.chunking) are ready when their
+    longest chunk is, so only a chunk's length counts for them.
+    """
+    from apps.transcription.chunking import is_chunked
+
+    if job.duration_seconds:
+        seconds = job.duration_seconds
+    else:
+        # Same ~1 MB per minute rule as validators.estimate_duration_minutes
+        seconds = job.file_size_bytes / (1024 * 1024) * 60
+    if is_chunked(job.transcription_id):
+        seconds = min(
+            seconds, settings.TRANSCRIPTION_CHUNK_SECONDS + settings.TRANSCRIPTION_CHUNK_OVERLAP
+        )
+    return seconds
+
+
+def expected_turnaround(job) -> float:
+    """Seconds after submission the transcript is most likely ready."""
+    median_ratio, _ = turnaround_ratios()
+    return max(MIN_POLL_DELAY, media_seconds(job) * median_ratio)
+
+
+def transcription_deadline(job):
+    """Time after which a still-unfinished transcript is given up on (None if unknown)."""
+    if job.started_at is None:
+        return None
+    _, slow_ratio = turnaround_ratios()
+    allowed = max(
+        settings.TRANSCRIPTION_MIN_DEADLINE,
+        media_seconds(job) * slow_ratio * settings.TRANSCRIPTION_DEADLINE_FACTOR,
+    )
+    return job.started_at + timedelta(seconds=allowed)
+
+
+def first_poll_at(job):
+    """
+    When to check a just-submitted job for the first time.
+
+    With webhooks on, polling is only a fallback for lost callbacks, so the
+    first check waits well past the expected turnaround.
+    """
+    from apps.transcription.service import TranscriptionService
+
+    delay = expected_turnaround(job)
+    if TranscriptionService.webhooks_enabled():
+        delay = max(settings.TRANSCRIPTION_RECONCILE_AFTER, delay * 2)
+    return job.started_at + timedelta(seconds=_jitter(delay))
+
+
+def next_poll_at(job, now):
+    """When to check a job again after finding its transcript still pending."""
+    elapsed = (now - (job.started_at or now)).total_seconds()
+    overrun = elapsed - expected_turnaround(job)
+    if overrun < 0:
+        # Checked early (e.g. a redelivered task): wait for the estimate
+        delay = -overrun
+    else:
+        delay = MIN_POLL_DELAY + overrun * OVERRUN_BACKOFF
+    delay = min(max(delay, MIN_POLL_DELAY), settings.TRANSCRIPTION_MAX_POLL_INTERVAL)
+    return now + timedelta(seconds=_jitter(delay))
+
+
+def _jitter(delay: float) -> float:
+    return delay * random.uniform(1 - JITTER, 1 + JITTER)
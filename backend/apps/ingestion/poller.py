@@ -0,0 +1,152 @@
+"""
+Batched polling of in-flight AssemblyAI transcripts.
+
+One periodic sweep checks every transcribing job concurrently, instead of
+each job holding a Celery task that re-queues itself until its transcript
+is ready. Jobs sharing a transcript (see dedup) cost a single request.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import redis
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.redis_client import get_redis, mark_redis_down
+from apps.transcription.chunking import get_result
+from .models import Job
+from .poll_schedule import next_poll_at, transcription_deadline
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK_KEY = "transcription:poll-lock"
+# Deletes the lock only if it still holds this sweep's token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+FINISHED_STATUSES = ("completed", "error")
+
+
+@dataclass
+class PollResult:
+    finished: List[str] = field(default_factory=list)  # completed or errored
+    timed_out: List[str] = field(default_factory=list)  # past their deadline
+
+
+def due_jobs(now=None):
+    """Transcribing jobs whose next scheduled check (see poll_schedule) has come."""
+    now = now or timezone.now()
+    return (
+        Job.objects.filter(status="transcribing")
+        .exclude(transcription_id__isnull=True)
+        .filter(Q(next_poll_at__lte=now) | Q(next_poll_at__isnull=True))
+    )
+
+
+def check_transcriptions(jobs, concurrency: Optional[int] = None, now=None) -> PollResult:
+    """
+    Check the transcripts of the given jobs concurrently.
+
+    Jobs still pending are rescheduled, or reported as timed out once past
+    their deadline. Finished jobs are rescheduled too, so they are only
+    dispatched again if their completion task never claims them.
+
+    Args:
+        jobs: Job queryset
+        concurrency: Requests in flight (defaults to TRANSCRIPTION_POLL_CONCURRENCY)
+        now: Time of the sweep
+
+    Returns:
+        PollResult
+    """
+    now = now or timezone.now()
+    jobs_by_transcript = defaultdict(list)
+    for job in jobs.only(
+        "id", "transcription_id", "started_at", "duration_seconds", "file_size_bytes", "progress"
+    ):
+        jobs_by_transcript[job.transcription_id].append(job)
+    if not jobs_by_transcript:
+        return PollResult()
+
+    workers = min(
+        concurrency or settings.TRANSCRIPTION_POLL_CONCURRENCY, len(jobs_by_transcript)
+    )
+    result, pending, dispatched = PollResult(), [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            # Chunked transcripts report their chunks' combined status
+            pool.submit(get_result, transcript_id, stitch=False): transcript_id
+            for transcript_id in jobs_by_transcript
+        }
+        for future in as_completed(futures):
+            transcript_id = futures[future]
+            try:
+                status = future.result().get("status")
+            except Exception as e:
+                logger.warning(f"Could not check transcript {transcript_id}: {e}")
+                status = None
+
+            if status in FINISHED_STATUSES:
+                result.finished.extend(str(job.id) for job in jobs_by_transcript[transcript_id])
+                dispatched.extend(jobs_by_transcript[transcript_id])
+            else:
+                pending.extend(jobs_by_transcript[transcript_id])
+
+    rescheduled = []
+    for job in pending:
+        deadline = transcription_deadline(job)
+        if deadline is not None and now >= deadline:
+            result.timed_out.append(str(job.id))
+            continue
+        job.next_poll_at = next_poll_at(job, now)
+        job.progress = max(job.progress, 25)
+        rescheduled.append(job)
+    for job in dispatched:
+        job.next_poll_at = next_poll_at(job, now)
+    # One query for the whole batch rather than a save per job
+    Job.objects.bulk_update(rescheduled + dispatched, ["next_poll_at", "progress"])
+
+    logger.info(
+        f"Checked {len(futures)} transcript(s): {len(result.finished)} job(s) finished, "
+        f"{len(rescheduled)} still transcribing, {len(result.timed_out)} timed out"
+    )
+    return result
+
+
+def acquire_sweep_lock(ttl: int) -> Optional[str]:
+    """
+    Keep overlapping sweeps (a slow sweep outliving its interval) from running.
+
+    Returns:
+        None if another sweep holds the lock; otherwise a token to pass to
+        release_sweep_lock, including when Redis is unavailable
+    """
+    token = uuid.uuid4().hex
+    client = get_redis()
+    if client is None:
+        return token
+    try:
+        return token if client.set(SWEEP_LOCK_KEY, token, nx=True, ex=ttl) else None
+    except redis.RedisError as e:
+        mark_redis_down(e)
+        return token
+
+
+def release_sweep_lock(token: str):
+    """Release the lock, unless it expired and another sweep has taken it since."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.eval(_RELEASE_LOCK_SCRIPT, 1, SWEEP_LOCK_KEY, token)
+    except redis.RedisError as e:
+        mark_redis_down(e)
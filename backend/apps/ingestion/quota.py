@@ -1,9 +1,128 @@
+"""
+Monthly upload quota accounting.
+
+Usage is reserved atomically in Redis: a Lua script checks the upload and
+minute limits and increments both counters in one call, so concurrent
+uploads can't overshoot a limit. Counters are seeded from the user's
+``user_subscriptions`` row, keyed by its billing period, and what changed
+since is added back onto the row in batches by ``flush_usage``. When Redis
+is unavailable, reservations fall back to a (non-atomic) check and
+read-modify-write against Supabase, which the next flush builds on rather
+than overwrites.
+"""
+
 import logging
+from datetime import timedelta
+from typing import Optional
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from apps.accounts.subscriptions import (
+    DEFAULT_SUBSCRIPTION,
+    get_subscription,
+    invalidate_subscription,
+)
+from apps.core.redis_client import get_redis, mark_redis_down
 from apps.core.supabase_client import supabase_client
 from apps.core.exceptions import QuotaExceededError
+from .models import UploadReservation
 
 logger = logging.getLogger(__name__)
 
+USAGE_KEY_PREFIX = "quota:usage:"
+DIRTY_USAGE_KEY = "quota:dirty"
+
+# KEYS[1] = usage hash, KEYS[2] = dirty set
+# ARGV = uploads, minutes, upload_limit, minutes_limit, seed_uploads,
+#        seed_minutes, subscription_id, ttl, dirty_member
+# A negative delta is a release: limits aren't checked and counters floor at 0.
+# synced_* hold the counters' value when they last matched the Supabase row.
+_ADJUST_USAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'uploads', ARGV[5], 'minutes', ARGV[6],
+               'subscription_id', ARGV[7],
+               'synced_uploads', ARGV[5], 'synced_minutes', ARGV[6])
+end
+
+local uploads = tonumber(redis.call('HGET', KEYS[1], 'uploads'))
+local minutes = tonumber(redis.call('HGET', KEYS[1], 'minutes'))
+local add_uploads = tonumber(ARGV[1])
+local add_minutes = tonumber(ARGV[2])
+
+if add_uploads > 0 and uploads + add_uploads > tonumber(ARGV[3]) then
+    return {0, 'uploads'}
+end
+if add_minutes > 0 and minutes + add_minutes > tonumber(ARGV[4]) then
+    return {0, 'minutes'}
+end
+
+redis.call('HSET', KEYS[1], 'uploads', math.max(uploads + add_uploads, 0))
+redis.call('HSET', KEYS[1], 'minutes', tostring(math.max(minutes + add_minutes, 0)))
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+redis.call('SADD', KEYS[2], ARGV[9])
+return {1, 'ok'}
+"""
+
+# KEYS[1] = usage hash
+# ARGV = uploads, minutes (as read by the flush), flushed uploads, flushed minutes
+# Moves the counters onto the row's new totals, keeping usage reserved
+# since the flush read them.
+_REBASE_USAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'uploads', tonumber(ARGV[3]) - tonumber(ARGV[1]))
+redis.call('HINCRBYFLOAT', KEYS[1], 'minutes', tonumber(ARGV[4]) - tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'synced_uploads', ARGV[3], 'synced_minutes', ARGV[4])
+return 1
+"""
+
+
+def _check_limits(subscription: dict, file_duration_minutes: float, file_size_mb: float):
+    if subscription["uploads_this_month"] >= subscription["monthly_upload_limit"]:
+        raise QuotaExceededError(
+            f"Monthly limit: {subscription['monthly_upload_limit']} uploads"
+        )
+
+    new_total = subscription["minutes_used_this_month"] + file_duration_minutes
+    if new_total > subscription["monthly_minutes_limit"]:
+        raise QuotaExceededError(
+            f"Monthly limit: {subscription['monthly_minutes_limit']} minutes"
+        )
+
+    _check_file_size(subscription, file_size_mb)
+
+
+def _check_file_size(subscription: dict, file_size_mb: float):
+    if file_size_mb > subscription["max_file_size_mb"]:
+        raise QuotaExceededError(
+            f"File too large. Maximum size: {subscription['max_file_size_mb']}MB",
+            details={"max_size": subscription["max_file_size_mb"]},
+        )
+
+
+def _load_subscription(user_id: str) -> Optional[dict]:
+    """Subscription for quota purposes, or None if quotas can't be enforced."""
+    try:
+        subscription = get_subscription(user_id)
+    except Exception as e:
+        # If table doesn't exist yet, allow unlimited uploads (for testing)
+        logger.warning(f"Could not check quota (table may not exist): {e}")
+        logger.info(
+            "Allowing upload without quota check - create user_subscriptions table in Supabase"
+        )
+        return None
+
+    return subscription or DEFAULT_SUBSCRIPTION
+
+
+def max_file_size_mb(user_id: str) -> float:
+    """Largest file, in MB, the user's subscription accepts."""
+    subscription = _load_subscription(user_id) or DEFAULT_SUBSCRIPTION
+    return subscription.get("max_file_size_mb") or DEFAULT_SUBSCRIPTION["max_file_size_mb"]
+
 
 def check_user_quota(user_id: str, file_duration_minutes: float, file_size_mb: float):
     """
@@ -17,53 +136,305 @@ def check_user_quota(user_id: str, file_duration_minutes: float, file_size_mb: f
     Raises:
         QuotaExceededError: If user exceeded monthly limits
     """
+    subscription = _load_subscription(user_id)
+    if subscription is None:
+        return
+
+    _check_limits(subscription, file_duration_minutes, file_size_mb)
+
+
+def reserve_quota(
+    user_id: str, duration_minutes: float, file_size_mb: float, uploads: int = 1
+):
+    """
+    Atomically check the user's limits and count this upload against them.
+
+    Call release_quota with the same amounts if the upload is later abandoned
+    or its job fails.
+
+    Args:
+        user_id: User UUID
+        duration_minutes: Duration of the file in minutes
+        file_size_mb: File size in MB
+        uploads: Number of uploads to count (0 to reserve extra minutes only)
+
+    Raises:
+        QuotaExceededError: If the reservation would exceed a monthly limit
+    """
+    subscription = _load_subscription(user_id)
+    if subscription is None:
+        return
+
+    _check_file_size(subscription, file_size_mb)
+
+    if not _adjust_redis_usage(user_id, subscription, uploads, duration_minutes):
+        # Redis unavailable: best-effort check and write straight to Supabase
+        if uploads:
+            _check_limits(subscription, duration_minutes, file_size_mb)
+        elif (
+            subscription["minutes_used_this_month"] + duration_minutes
+            > subscription["monthly_minutes_limit"]
+        ):
+            _raise_limit(subscription, "minutes")
+        increment_usage(user_id, duration_minutes, uploads)
+
+
+def release_quota(user_id: str, duration_minutes: float, uploads: int = 1):
+    """
+    Give back usage reserved by reserve_quota.
+
+    Args:
+        user_id: User UUID
+        duration_minutes: Minutes to release
+        uploads: Number of uploads to release
+    """
     try:
-        result = supabase_client.query("user_subscriptions", eq={"user_id": user_id})
+        subscription = get_subscription(user_id) or DEFAULT_SUBSCRIPTION
     except Exception as e:
-        # If table doesn't exist yet, allow unlimited uploads (for testing)
-        logger.warning(f"Could not check quota (table may not exist): {e}")
-        logger.info(
-            "Allowing upload without quota check - create user_subscriptions table in Supabase"
-        )
+        logger.warning(f"Could not release quota for {user_id}: {e}")
         return
 
-    if not result:
-        subscription = {
-            "monthly_upload_limit": 5,
-            "monthly_minutes_limit": 30,
-            "max_file_size_mb": 100,
-            "uploads_this_month": 0,
-            "minutes_used_this_month": 0,
-        }
-    else:
-        subscription = result[0]
+    if not _adjust_redis_usage(user_id, subscription, -uploads, -duration_minutes):
+        increment_usage(user_id, -duration_minutes, -uploads)
 
-    if subscription["uploads_this_month"] >= subscription["monthly_upload_limit"]:
-        raise QuotaExceededError(
-            f"Monthly limit: {subscription['monthly_upload_limit']} uploads"
-        )
 
-    new_total = subscription["minutes_used_this_month"] + file_duration_minutes
-    if new_total > subscription["monthly_minutes_limit"]:
-        raise QuotaExceededError(
-            f"Monthly limit: {subscription['monthly_minutes_limit']} minutes"
+def record_reservation(user_id: str, key: str, duration_minutes: float, ttl: int):
+    """
+    Remember usage reserved for a direct upload until it is finalized.
+
+    Args:
+        user_id: User UUID
+        key: Object key of the upload
+        duration_minutes: Minutes reserved (one upload is always reserved too)
+        ttl: Seconds the upload token stays valid
+    """
+    UploadReservation.objects.create(
+        key=key,
+        user_id=user_id,
+        minutes=duration_minutes,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+
+
+def claim_reservation(key: str) -> Optional[UploadReservation]:
+    """
+    Remove an upload's pending reservation.
+
+    Returns:
+        The reservation to the one caller that removed it; None to everyone
+        else (already finalized, released or never recorded)
+    """
+    reservation = UploadReservation.objects.filter(key=key).first()
+    if reservation is None:
+        return None
+    deleted, _ = UploadReservation.objects.filter(pk=reservation.pk).delete()
+    return reservation if deleted else None
+
+
+def release_reservation(key: str) -> bool:
+    """Give back the usage of an upload that will never be finalized, at most once."""
+    reservation = claim_reservation(key)
+    if reservation is None:
+        return False
+    release_quota(str(reservation.user_id), reservation.minutes)
+    return True
+
+
+def release_expired_reservations(now=None) -> int:
+    """
+    Release the reservations of uploads whose token has expired unused.
+
+    Returns:
+        Number of reservations released
+    """
+    now = now or timezone.now()
+    keys = UploadReservation.objects.filter(expires_at__lt=now).values_list("key", flat=True)
+    return sum(release_reservation(key) for key in list(keys))
+
+
+def _usage_key(user_id: str, subscription: dict) -> str:
+    # Keyed by billing period so a monthly reset of the row starts fresh counters
+    return f"{user_id}:{_period(subscription)}"
+
+
+def _period(subscription: dict) -> str:
+    return str(subscription.get("usage_reset_date") or "current")
+
+
+def _adjust_redis_usage(
+    user_id: str, subscription: dict, uploads: int, minutes: float
+) -> bool:
+    """
+    Apply a usage delta in Redis.
+
+    Returns:
+        True if Redis handled the delta, False if the caller must fall back
+
+    Raises:
+        QuotaExceededError: If a positive delta would exceed a limit
+    """
+    client = get_redis()
+    if client is None:
+        return False
+
+    member = _usage_key(user_id, subscription)
+    try:
+        allowed, limit = client.eval(
+            _ADJUST_USAGE_SCRIPT,
+            2,
+            USAGE_KEY_PREFIX + member,
+            DIRTY_USAGE_KEY,
+            uploads,
+            minutes,
+            subscription["monthly_upload_limit"],
+            subscription["monthly_minutes_limit"],
+            subscription["uploads_this_month"],
+            subscription["minutes_used_this_month"],
+            subscription.get("id") or "",
+            getattr(settings, "QUOTA_COUNTER_TTL", 6 * 60 * 60),
+            member,
         )
+    except redis.RedisError as e:
+        mark_redis_down(e)
+        return False
 
-    if file_size_mb > subscription["max_file_size_mb"]:
+    if not int(allowed):
+        _raise_limit(subscription, limit)
+    return True
+
+
+def _raise_limit(subscription: dict, limit: str):
+    if limit == "uploads":
         raise QuotaExceededError(
-            f"File too large. Maximum size: {subscription['max_file_size_mb']}MB",
-            details={"max_size": subscription["max_file_size_mb"]},
+            f"Monthly limit: {subscription['monthly_upload_limit']} uploads"
         )
+    raise QuotaExceededError(
+        f"Monthly limit: {subscription['monthly_minutes_limit']} minutes"
+    )
 
 
-def increment_usage(user_id: str, duration_minutes: float):
+def flush_usage(batch_size: int = 500) -> int:
     """
-    Increment user's monthly usage after successful upload.
+    Add usage counted in Redis since the last flush to user_subscriptions.
+
+    Each user with changed usage gets a single update, however many uploads
+    happened since the last flush. The change is added to the row as it is
+    now, so usage written straight to Supabase while Redis was unavailable
+    isn't overwritten; counters of a billing period the row has since been
+    reset out of are dropped.
+
+    Args:
+        batch_size: Maximum number of users to pop from the dirty set per round
+
+    Returns:
+        Number of subscription rows updated
+    """
+    client = get_redis()
+    if client is None:
+        return 0
+
+    flushed = 0
+    while True:
+        try:
+            members = client.spop(DIRTY_USAGE_KEY, batch_size)
+        except redis.RedisError as e:
+            mark_redis_down(e)
+            return flushed
+        if not members:
+            return flushed
+
+        pipe = client.pipeline(transaction=False)
+        for member in members:
+            pipe.hmget(
+                USAGE_KEY_PREFIX + member,
+                "uploads",
+                "minutes",
+                "subscription_id",
+                "synced_uploads",
+                "synced_minutes",
+            )
+        counters = pipe.execute()
+
+        failed = []
+        for member, (uploads, minutes, subscription_id, synced_uploads, synced_minutes) in zip(
+            members, counters
+        ):
+            if not subscription_id or uploads is None:
+                # No subscription row to write to (free tier defaults) or expired
+                continue
+
+            user_id, period = member.split(":", 1)
+            try:
+                rows = supabase_client.query(
+                    "user_subscriptions",
+                    columns="id,usage_reset_date,uploads_this_month,minutes_used_this_month",
+                    eq={"id": subscription_id},
+                )
+                if not rows:
+                    continue
+                row = rows[0]
+                if _period(row) != period:
+                    logger.info(f"Dropping usage of {user_id} from ended period {period}")
+                    client.delete(USAGE_KEY_PREFIX + member)
+                    continue
+
+                # Counters seeded before synced_* existed hold absolute totals
+                if synced_uploads is None:
+                    synced_uploads = row["uploads_this_month"]
+                    synced_minutes = row["minutes_used_this_month"]
+                total_uploads = max(
+                    row["uploads_this_month"] + int(uploads) - int(synced_uploads), 0
+                )
+                total_minutes = max(
+                    row["minutes_used_this_month"] + float(minutes) - float(synced_minutes), 0
+                )
+                supabase_client.update(
+                    "user_subscriptions",
+                    subscription_id,
+                    {
+                        "uploads_this_month": total_uploads,
+                        "minutes_used_this_month": total_minutes,
+                    },
+                )
+                client.eval(
+                    _REBASE_USAGE_SCRIPT,
+                    1,
+                    USAGE_KEY_PREFIX + member,
+                    uploads,
+                    minutes,
+                    total_uploads,
+                    total_minutes,
+                )
+                invalidate_subscription(user_id)
+                flushed += 1
+            except redis.RedisError as e:
+                mark_redis_down(e)
+                return flushed
+            except Exception as e:
+                logger.error(f"Failed to flush usage for {user_id}: {e}")
+                failed.append(member)
+
+        if failed:
+            # Retry on the next flush rather than spinning on a broken row now
+            client.sadd(DIRTY_USAGE_KEY, *failed)
+            return flushed
+
+        if len(members) < batch_size:
+            return flushed
+
+
+def increment_usage(user_id: str, duration_minutes: float, uploads: int = 1):
+    """
+    Increment user's monthly usage directly in Supabase.
+
+    Used when Redis is unavailable; negative values release usage.
 
     Args:
         user_id: User UUID
         duration_minutes: Duration of uploaded file
+        uploads: Number of uploads to add
     """
+    # Read straight from Supabase: a cached row could be stale and lose increments
     result = supabase_client.query("user_subscriptions", eq={"user_id": user_id})
 
     if result:
@@ -72,8 +443,12 @@ def increment_usage(user_id: str, duration_minutes: float):
             "user_subscriptions",
             subscription["id"],
             {
-                "uploads_this_month": subscription["uploads_this_month"] + 1,
-                "minutes_used_this_month": subscription["minutes_used_this_month"]
-                + duration_minutes,
+                "uploads_this_month": max(
+                    subscription["uploads_this_month"] + uploads, 0
+                ),
+                "minutes_used_this_month": max(
+                    subscription["minutes_used_this_month"] + duration_minutes, 0
+                ),
             },
         )
+        invalidate_subscription(user_id)
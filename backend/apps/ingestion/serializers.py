@@ -51,3 +51,32 @@ class ProcessUploadSerializer(serializers.Serializer):
         if not value:
             raise serializers.ValidationError("Must select at least one material type")
         return value
+
+
+class CreateUploadSerializer(serializers.Serializer):
+    """Serializer for requesting a presigned direct upload."""
+
+    filename = serializers.CharField(max_length=255)
+    file_size_bytes = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=50)
+    duration_seconds = serializers.FloatField(required=False, min_value=0)
+    material_types = serializers.JSONField()
+    options = serializers.JSONField(required=False, default=dict)
+
+    def validate_material_types(self, value):
+        """Ensure at least one material type selected."""
+        if not value:
+            raise serializers.ValidationError("Must select at least one material type")
+        return value
+
+
+class UploadPartSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField(min_value=1, max_value=10000)
+    etag = serializers.CharField()
+
+
+class FinalizeUploadSerializer(serializers.Serializer):
+    """Serializer for finalizing a presigned direct upload."""
+
+    upload_token = serializers.CharField()
+    parts = UploadPartSerializer(many=True, required=False, default=list)
@@ -0,0 +1,215 @@
+"""
+Silence detection and timestamp remapping.
+
+Long silent stretches (breaks, setup, dead air) cost transcription time and
+money without adding words. Before submission the audio can be decoded to
+16 kHz mono PCM, split into short frames and measured with a vectorized RMS
+in NumPy; stretches quieter than SILENCE_THRESHOLD_DB for at least
+SILENCE_MIN_SECONDS are cut out. The kept spans become an offset map
+([[trimmed_ms, original_ms], ...], one pair per span) so timestamps in the
+transcript of the trimmed audio can be mapped back to the original.
+
+NumPy is optional: without it trimming is skipped.
+"""
+
+import logging
+import subprocess
+import threading
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from apps.core.exceptions import MediaProcessingError
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+# Frames decoded and measured per read, to keep memory flat for long recordings
+FRAMES_PER_READ = 2000
+
+Span = Tuple[float, float]  # seconds
+
+
+def frame_energies(source_path: str):
+    """
+    RMS level (dBFS) of every FRAME_MS frame of a file's audio.
+
+    Returns:
+        numpy array of per-frame levels
+
+    Raises:
+        MediaProcessingError: If ffmpeg can't decode the file or takes longer
+            than AUDIO_EXTRACTION_TIMEOUT
+    """
+    import numpy as np
+
+    # Imported here as audio imports this module
+    from .audio import _slots
+
+    command = [
+        settings.FFMPEG_BINARY,
+        "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", source_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "s16le", "-",
+    ]
+    levels = []
+    read_size = FRAME_SAMPLES * FRAMES_PER_READ * 2
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    with _slots():
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise MediaProcessingError(f"ffmpeg not found at {settings.FFMPEG_BINARY}")
+
+        # Reads block, so the deadline is enforced from another thread
+        watchdog = threading.Timer(settings.AUDIO_EXTRACTION_TIMEOUT, kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            with process:
+                while True:
+                    data = process.stdout.read(read_size)
+                    if not data:
+                        break
+                    samples = np.frombuffer(data[: len(data) // 2 * 2], dtype="<i2").astype(np.float32)
+                    samples /= 32768.0
+                    whole = len(samples) // FRAME_SAMPLES * FRAME_SAMPLES
+                    frames = samples[:whole].reshape(-1, FRAME_SAMPLES)
+                    if whole < len(samples):
+                        # Last partial frame, zero-padded
+                        tail = np.zeros((1, FRAME_SAMPLES), dtype=np.float32)
+                        tail[0, : len(samples) - whole] = samples[whole:]
+                        frames = np.vstack([frames, tail])
+                    rms = np.sqrt(np.mean(frames * frames, axis=1))
+                    levels.append(20 * np.log10(np.maximum(rms, 1e-10)))
+                stderr = process.stderr.read()
+        finally:
+            watchdog.cancel()
+
+    if timed_out.is_set():
+        raise MediaProcessingError(f"ffmpeg timed out after {settings.AUDIO_EXTRACTION_TIMEOUT}s")
+    if process.returncode != 0:
+        message = stderr.decode(errors="replace").strip()[-500:]
+        raise MediaProcessingError(f"ffmpeg failed ({process.returncode}): {message}")
+    return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+
+def speech_spans(levels) -> Tuple[List[Span], float]:
+    """
+    Spans to keep, given per-frame levels.
+
+    Silent runs shorter than SILENCE_MIN_SECONDS are kept, and
+    SILENCE_PADDING_SECONDS of each cut silence is kept on either side so
+    words aren't clipped.
+
+    Returns:
+        (kept spans in seconds, total duration in seconds)
+    """
+    import numpy as np
+
+    frame_seconds = FRAME_MS / 1000
+    total = len(levels) * frame_seconds
+    silent = levels < settings.SILENCE_THRESHOLD_DB
+    if not silent.any():
+        return [(0.0, total)], total
+
+    # Start/end frame indexes of silent runs
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+
+    min_frames = settings.SILENCE_MIN_SECONDS / frame_seconds
+    padding = settings.SILENCE_PADDING_SECONDS
+    kept, position = [], 0.0
+    for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+        if end - start < min_frames:
+            continue
+        cut_start = start * frame_seconds + (padding if start > 0 else 0)
+        cut_end = end * frame_seconds - (padding if end < len(levels) else 0)
+        if cut_end - cut_start <= 0:
+            continue
+        if cut_start > position:
+            kept.append((position, cut_start))
+        position = cut_end
+    if position < total:
+        kept.append((position, total))
+    return kept, total
+
+
+def find_speech(source_path: str) -> Optional[List[Span]]:
+    """
+    Spans of a file worth transcribing, if trimming saves enough.
+
+    Returns:
+        Kept spans in seconds, or None when trimming is unavailable or would
+        cut less than SILENCE_MIN_SAVING of the recording
+    """
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        logger.warning("NumPy is not installed, skipping silence trimming")
+        return None
+
+    kept, total = speech_spans(frame_energies(source_path))
+    removed = total - sum(end - start for start, end in kept)
+    if not total or not kept or removed / total < settings.SILENCE_MIN_SAVING:
+        return None
+
+    logger.info(f"Trimming {removed:.0f}s of silence from {total:.0f}s in {len(kept)} span(s)")
+    return kept
+
+
+def offset_map(spans: List[Span]) -> List[List[int]]:
+    """[[trimmed_ms, original_ms], ...] for the start of every kept span."""
+    offsets, trimmed = [], 0.0
+    for start, end in spans:
+        offsets.append([round(trimmed * 1000), round(start * 1000)])
+        trimmed += end - start
+    return offsets
+
+
+def select_filter(spans: List[Span]) -> str:
+    """ffmpeg audio filter keeping only the given spans, back to back."""
+    keep = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in spans)
+    return f"aselect='{keep}',asetpts=N/SR/TB"
+
+
+def remap_ms(ms: int, offsets: List[List[int]]) -> int:
+    """Map a time in the trimmed audio back to the original recording."""
+    i = bisect_right(offsets, [ms, float("inf")]) - 1
+    if i < 0:
+        return ms
+    trimmed_start, original_start = offsets[i]
+    return original_start + (ms - trimmed_start)
+
+
+def remap_timestamps(result, offsets: List[List[int]]):
+    """
+    Copy of an AssemblyAI response with every start/end mapped to the original.
+
+    Words, utterances, chapters, entities and highlights all carry ms
+    "start"/"end" keys, so any dict with both is remapped.
+    """
+    if isinstance(result, list):
+        return [remap_timestamps(item, offsets) for item in result]
+    if not isinstance(result, dict):
+        return result
+
+    remapped = {key: remap_timestamps(value, offsets) for key, value in result.items()}
+    if isinstance(result.get("start"), int) and isinstance(result.get("end"), int):
+        remapped["start"] = remap_ms(result["start"], offsets)
+        # An end time is the end of what came before, so it belongs to the
+        # span it falls in when approached from the left
+        remapped["end"] = remap_ms(max(result["end"] - 1, result["start"]), offsets) + (
+            1 if result["end"] > result["start"] else 0
+        )
+    return remapped
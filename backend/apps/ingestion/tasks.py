@@ -1,18 +1,117 @@
 from celery import shared_task
-from celery.exceptions import Retry
+from django.conf import settings
 from django.utils.timezone import now as from_datetime
+from apps.core.exceptions import ThirdPartyServiceError, TranscriptionTimeoutError
+from apps.ingestion.audio import needs_preprocessing, prepare_audio
+from apps.ingestion.cleanup import cleanup_storage
+from apps.ingestion.dedup import (
+    find_inflight_transcription_id,
+    find_reusable_transcription,
+    hash_stored_media,
+)
 from apps.ingestion.models import Job
-from apps.transcription.models import Transcription
+from apps.ingestion.poll_schedule import first_poll_at, next_poll_at
+from apps.ingestion.poller import (
+    acquire_sweep_lock,
+    check_transcriptions,
+    due_jobs,
+    release_sweep_lock,
+)
+from apps.ingestion.quota import flush_usage, release_quota
+from apps.ingestion.silence import remap_timestamps
+from apps.transcription.chunking import (
+    discard_chunk_audio,
+    get_result,
+    is_chunked,
+    should_chunk,
+    submit_chunked,
+)
+from apps.transcription.word_timings import copy_transcript, store_transcript
 from apps.transcription.service import TranscriptionService
-from apps.generation.models import GeneratedContent
-from apps.generation.service import GeminiService
+from apps.generation.pipeline import generate_materials
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=100)
-def process_upload_task(self, job_id):
+def _fail_job(job, error_message):
+    """Mark a job failed and give its reserved quota back to the user."""
+    # The webhook and the poller can both fail the same job; only the one
+    # that moves it to failed gives the quota back
+    claimed = (
+        Job.objects.filter(id=job.id)
+        .exclude(status="failed")
+        .update(status="failed", error_message=error_message)
+    )
+    job.status = "failed"
+    job.error_message = error_message
+
+    if claimed:
+        release_quota(str(job.user_id), (job.duration_seconds or 0) / 60)
+
+
+def _complete_transcription(job, result):
+    """Store a finished transcript and generate the job's materials from it."""
+    # Check if transcription record already exists to avoid duplicates on retry
+    if not hasattr(job, "transcription"):
+        if job.time_offsets:
+            # Transcribed with silence cut out: back to the original timeline
+            result = remap_timestamps(result, job.time_offsets)
+        store_transcript(job, result)
+
+        if is_chunked(job.transcription_id):
+            try:
+                discard_chunk_audio(job)
+            except Exception as e:
+                # The orphan sweep gets them eventually
+                logger.warning(f"Could not delete chunk audio of job {job.id}: {e}")
+
+    # Start Generation Phase
+    job.status = "generating"
+    job.progress = 50
+    job.save()
+
+    # Generate formatted text from transcript, all material types at once;
+    # a type that fails doesn't stop the others
+    generate_materials(job, result.get("text", ""))
+
+    job.status = "completed"
+    job.progress = 100
+    job.completed_at = from_datetime()
+    job.save()
+
+
+def _apply_transcription_result(job, result) -> bool:
+    """
+    Advance a transcribing job from an AssemblyAI transcript result.
+
+    Returns:
+        False while the transcript is still queued or processing
+    """
+    status = result.get("status")
+
+    if status == "completed":
+        # Webhook, reconciliation and polling can all see the same result;
+        # only the first to claim the job generates its materials
+        claimed = Job.objects.filter(id=job.id, status="transcribing").update(
+            status="generating"
+        )
+        if claimed:
+            logger.info(f"Transcription completed for job {job.id}")
+            _complete_transcription(job, result)
+        return True
+
+    if status == "error":
+        error_msg = result.get("error")
+        logger.error(f"Transcription failed for job {job.id}: {error_msg}")
+        _fail_job(job, str(error_msg))
+        return True
+
+    return False
+
+
+@shared_task
+def process_upload_task(job_id):
     try:
         job = Job.objects.get(id=job_id)
     except Job.DoesNotExist:
@@ -24,88 +123,151 @@ def process_upload_task(self, job_id):
 
     try:
         if not job.transcription_id:
-            logger.info(f"Submitting job {job_id} to AssemblyAI")
-            # Submit to AssemblyAI
-            tx_id = TranscriptionService.submit_transcription(job.storage_url)
+            if not job.content_hash and job.storage_url:
+                hash_stored_media(job)
+
+            # Identical media already transcribed: skip AssemblyAI entirely
+            source = find_reusable_transcription(job)
+            if source is not None:
+                logger.info(
+                    f"Reusing transcript {source.external_id} for job {job_id}"
+                )
+                job.transcription_id = source.external_id
+                job.save()
+                copy_transcript(source, job)
+                _complete_transcription(
+                    job,
+                    {
+                        **source.raw_response,
+                        "id": source.external_id,
+                        "text": source.text,
+                    },
+                )
+                return
+
+            # Identical media being transcribed right now: share that transcript
+            tx_id = find_inflight_transcription_id(job)
+            if tx_id:
+                logger.info(f"Job {job_id} sharing in-flight transcript {tx_id}")
+                # Its timestamps need the same mapping as the submitting job's
+                shared = (
+                    Job.objects.filter(transcription_id=tx_id)
+                    .exclude(pk=job.pk)
+                    .only("audio_url", "time_offsets")
+                    .first()
+                )
+                if shared is not None:
+                    job.audio_url, job.time_offsets = shared.audio_url, shared.time_offsets
+            else:
+                if needs_preprocessing(job) and not job.audio_url:
+                    job.current_step = "preparing_audio"
+                    job.save(update_fields=["current_step"])
+                    prepare_audio(job)
+                    job.current_step = ""
+                    job.save(update_fields=["audio_url", "time_offsets", "current_step"])
+
+                # Long recordings go in chunks transcribed side by side
+                tx_id = submit_chunked(job) if should_chunk(job) else None
+                if not tx_id:
+                    logger.info(f"Submitting job {job_id} to AssemblyAI")
+                    # Submit to AssemblyAI
+                    tx_id = TranscriptionService.submit_transcription(
+                        job.audio_url or job.storage_url,
+                        webhook_url=(
+                            settings.ASSEMBLYAI_WEBHOOK_URL
+                            if TranscriptionService.webhooks_enabled()
+                            else ""
+                        ),
+                    )
 
             job.transcription_id = tx_id
             job.status = "transcribing"
+            job.started_at = from_datetime()
+            job.next_poll_at = first_poll_at(job)
             job.save()
-
-            # Use retry for polling delay
-            raise self.retry(countdown=10)
+            # From here the webhook or poll_transcriptions_task takes over
 
         else:
-            # Check status
+            # Redelivered after submission: check once, the poller does the rest
             logger.info(
                 f"Checking status for job {job_id}, tx_id {job.transcription_id}"
             )
-            result = TranscriptionService.get_transcription_result(
-                str(job.transcription_id)
-            )
-            status = result.get("status")
-
-            if status == "completed":
-                logger.info(f"Transcription completed for job {job_id}")
-
-                # Check if transcription record already exists to avoid duplicates on retry
-                if not hasattr(job, "transcription"):
-                    Transcription.objects.create(
-                        job=job,
-                        external_id=result["id"],
-                        text=result.get("text", ""),
-                        raw_response=result,
-                    )
+            result = get_result(str(job.transcription_id))
+            if not _apply_transcription_result(job, result):
+                job.next_poll_at = next_poll_at(job, from_datetime())
+                job.save(update_fields=["next_poll_at"])
 
-                # Start Generation Phase
-                job.status = "generating"
-                job.progress = 50
-                job.save()
+    except Exception as e:
+        logger.exception(f"Error processing job {job_id}")
+        # Not retried (polling is the poller's job), so fail rather than leave it stuck
+        _fail_job(job, f"Internal error: {str(e)}")
 
-                # Generate formatted text from transcript
-                transcript_text = result.get("text", "")
-
-                for material_type in job.material_types:
-                    try:
-                        logger.info(f"Generating {material_type} for job {job_id}")
-                        content = GeminiService.generate_content(
-                            transcript_text, material_type
-                        )
-
-                        GeneratedContent.objects.create(
-                            job=job, type=material_type, content=content
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Failed to generate {material_type} for job {job.id}: {e}"
-                        )
-                        # We continue generating other types even if one fails
-
-                job.status = "completed"
-                job.progress = 100
-                job.completed_at = from_datetime()
-                job.save()
 
-            elif status == "error":
-                error_msg = result.get("error")
-                logger.error(f"Transcription failed for job {job_id}: {error_msg}")
-                job.status = "failed"
-                job.error_message = str(error_msg)
-                job.save()
+@shared_task(bind=True, max_retries=5)
+def complete_transcription_task(self, job_id):
+    """
+    Fetch a finished transcript and move its job into generation.
 
-            else:
-                # queued or processing
-                job.progress = 25
-                job.save()
-                raise self.retry(countdown=10)
+    Queued by the AssemblyAI webhook and by the reconciliation sweep.
+    """
+    job = Job.objects.filter(id=job_id, status="transcribing").first()
+    if job is None or not job.transcription_id:
+        return  # Already handled, e.g. a duplicate callback
+
+    try:
+        result = get_result(job.transcription_id)
+    except ThirdPartyServiceError as e:
+        raise self.retry(exc=e, countdown=30)
 
-    except Retry:
-        raise
+    try:
+        if not _apply_transcription_result(job, result):
+            logger.info(
+                f"Transcript {job.transcription_id} for job {job_id} is still "
+                f"{result.get('status')}"
+            )
     except Exception as e:
-        logger.exception(f"Error processing job {job_id}")
-        # Only mark failed if we haven't exceeded retries handled by Celery for other exceptions
-        # But since we use bind=True and managing our own polling loop, we should probably fail here
-        # if it's not a polling retry.
-        job.status = "failed"
-        job.error_message = f"Internal error: {str(e)}"
-        job.save()
+        logger.exception(f"Error completing job {job_id}")
+        _fail_job(job, f"Internal error: {str(e)}")
+
+
+@shared_task(ignore_result=True)
+def poll_transcriptions_task():
+    """
+    Check every in-flight transcript in one concurrent sweep.
+
+    Only jobs whose scheduled check has come are polled (see poll_schedule),
+    only finished ones are dispatched onward, and jobs past their deadline
+    are failed.
+    """
+    lock = acquire_sweep_lock(ttl=max(int(settings.TRANSCRIPTION_POLL_INTERVAL) * 6, 60))
+    if lock is None:
+        logger.info("Previous transcription poll still running, skipping")
+        return
+    try:
+        result = check_transcriptions(due_jobs())
+        for job_id in result.finished:
+            complete_transcription_task.delay(job_id)
+        for job in Job.objects.filter(id__in=result.timed_out):
+            minutes = (from_datetime() - job.started_at).total_seconds() / 60
+            logger.error(f"Transcription for job {job.id} timed out after {minutes:.0f} minutes")
+            _fail_job(
+                job,
+                f"{TranscriptionTimeoutError.__name__}: transcript not ready "
+                f"{minutes:.0f} minutes after submission",
+            )
+    finally:
+        release_sweep_lock(lock)
+
+
+@shared_task(ignore_result=True)
+def flush_usage_task():
+    """Periodically write aggregated quota usage from Redis to Supabase."""
+    flushed = flush_usage()
+    if flushed:
+        logger.info(f"Flushed usage for {flushed} subscription(s)")
+
+
+@shared_task(ignore_result=True)
+def cleanup_storage_task():
+    """Periodically purge expired media, failed jobs and orphaned objects."""
+    cleanup_storage()
@@ -1,10 +1,20 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.urls import reverse
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+from apps.core.exceptions import QuotaExceededError
+from apps.ingestion import quota
+from apps.ingestion.dedup import content_key, store_media
+from apps.ingestion.media_probe import probe_duration
+from apps.ingestion.validators import get_file_duration
 from apps.ingestion.models import Job
 from django.core.files.uploadedfile import SimpleUploadedFile
+import hashlib
+import io
+import struct
 import uuid
+import wave
 
 
 class TranscriptionTriggerTest(TestCase):
@@ -19,8 +29,8 @@ class TranscriptionTriggerTest(TestCase):
     @patch("apps.ingestion.views.process_upload_task.delay")
     @patch("apps.ingestion.views.validate_file_type")
     @patch("apps.ingestion.views.validate_file_size")
-    @patch("apps.ingestion.views.check_user_quota")
-    @patch("apps.ingestion.views.upload_to_r2")
+    @patch("apps.ingestion.views.reserve_quota")
+    @patch("apps.ingestion.views.store_media")
     def test_upload_triggers_task(
         self, mock_upload, mock_quota, mock_size, mock_type, mock_task
     ):
@@ -55,3 +65,803 @@ class TranscriptionTriggerTest(TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertTrue(mock_task.called)
         self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(
+            Job.objects.get().content_hash, hashlib.sha256(b"content").hexdigest()
+        )
+
+
+class QuotaReservationTest(TestCase):
+    def setUp(self):
+        self.user_id = str(uuid.uuid4())
+        self.subscription = {
+            "id": "sub-1",
+            "monthly_upload_limit": 5,
+            "monthly_minutes_limit": 30,
+            "max_file_size_mb": 100,
+            "uploads_this_month": 4,
+            "minutes_used_this_month": 10,
+        }
+        patcher = patch(
+            "apps.ingestion.quota.get_subscription", return_value=self.subscription
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("apps.ingestion.quota.get_redis")
+    def test_redis_reservation_rejected_by_script(self, mock_get_redis):
+        redis_client = MagicMock()
+        redis_client.eval.return_value = [0, "minutes"]
+        mock_get_redis.return_value = redis_client
+
+        with self.assertRaises(QuotaExceededError):
+            quota.reserve_quota(self.user_id, 25, 10)
+
+        args = redis_client.eval.call_args[0]
+        self.assertEqual(args[4:6], (1, 25))
+
+    @patch("apps.ingestion.quota.increment_usage")
+    @patch("apps.ingestion.quota.get_redis", return_value=None)
+    def test_falls_back_to_supabase_without_redis(self, _mock_redis, mock_increment):
+        quota.reserve_quota(self.user_id, 5, 10)
+        mock_increment.assert_called_once_with(self.user_id, 5, 1)
+
+        self.subscription["uploads_this_month"] = 5
+        with self.assertRaises(QuotaExceededError):
+            quota.reserve_quota(self.user_id, 5, 10)
+
+    def _flush(self, counters, row):
+        redis_client = MagicMock()
+        redis_client.spop.side_effect = [[f"{self.user_id}:2026-10-01"], []]
+        redis_client.pipeline.return_value.execute.return_value = [counters]
+        with patch("apps.ingestion.quota.get_redis", return_value=redis_client), patch(
+            "apps.ingestion.quota.supabase_client.query", return_value=[row]
+        ), patch("apps.ingestion.quota.supabase_client.update") as mock_update, patch(
+            "apps.ingestion.quota.invalidate_subscription"
+        ):
+            flushed = quota.flush_usage(batch_size=10)
+        return flushed, mock_update, redis_client
+
+    def test_flush_writes_aggregated_totals(self):
+        row = {
+            "id": "sub-1",
+            "usage_reset_date": "2026-10-01",
+            "uploads_this_month": 4,
+            "minutes_used_this_month": 10,
+        }
+
+        flushed, mock_update, redis_client = self._flush(["7", "42.5", "sub-1", "4", "10"], row)
+
+        self.assertEqual(flushed, 1)
+        mock_update.assert_called_once_with(
+            "user_subscriptions",
+            "sub-1",
+            {"uploads_this_month": 7, "minutes_used_this_month": 42.5},
+        )
+        # Counters now track the row's totals
+        self.assertEqual(redis_client.eval.call_args.args[3:], ("7", "42.5", 7, 42.5))
+
+    def test_flush_keeps_usage_released_without_redis(self):
+        # One 5-minute upload was released straight in Supabase meanwhile
+        row = {
+            "id": "sub-1",
+            "usage_reset_date": "2026-10-01",
+            "uploads_this_month": 3,
+            "minutes_used_this_month": 5,
+        }
+
+        _, mock_update, _ = self._flush(["7", "42.5", "sub-1", "4", "10"], row)
+
+        mock_update.assert_called_once_with(
+            "user_subscriptions",
+            "sub-1",
+            {"uploads_this_month": 6, "minutes_used_this_month": 37.5},
+        )
+
+    def test_flush_drops_counters_of_ended_period(self):
+        row = {
+            "id": "sub-1",
+            "usage_reset_date": "2026-11-01",
+            "uploads_this_month": 0,
+            "minutes_used_this_month": 0,
+        }
+
+        flushed, mock_update, redis_client = self._flush(["7", "42.5", "sub-1", "4", "10"], row)
+
+        self.assertEqual(flushed, 0)
+        mock_update.assert_not_called()
+        redis_client.delete.assert_called_once_with(
+            f"{quota.USAGE_KEY_PREFIX}{self.user_id}:2026-10-01"
+        )
+
+
+def mp4_box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+class MediaProbeTest(TestCase):
+    def test_wav_duration(self):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(8000)
+            wav.writeframes(b"\x00\x00" * 8000 * 3)
+
+        self.assertAlmostEqual(probe_duration(buffer), 3.0)
+        self.assertEqual(buffer.tell(), len(buffer.getvalue()))
+
+    def test_mp4_with_moov_after_media(self):
+        mvhd = mp4_box(b"mvhd", b"\x00" * 4 + struct.pack(">IIII", 0, 0, 1000, 90500))
+        data = (
+            mp4_box(b"ftyp", b"isom" + b"\x00" * 4)
+            + mp4_box(b"mdat", b"\x00" * 50000)
+            + mp4_box(b"moov", mvhd)
+        )
+
+        self.assertAlmostEqual(probe_duration(io.BytesIO(data)), 90.5)
+
+    def test_matroska_segment_info(self):
+        info = (
+            b"\x2a\xd7\xb1\x83" + (1000000).to_bytes(3, "big")
+            + b"\x44\x89\x88" + struct.pack(">d", 4200.0)
+        )
+        segment = b"\x15\x49\xa9\x66" + bytes([0x80 | len(info)]) + info
+        data = (
+            b"\x1a\x45\xdf\xa3\x80"
+            + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff"
+            + segment
+        )
+
+        self.assertAlmostEqual(probe_duration(io.BytesIO(data)), 4.2)
+
+    def test_unknown_format_falls_back_to_size_estimate(self):
+        file = SimpleUploadedFile("lecture.mp3", b"x" * 2 * 1024 * 1024)
+
+        self.assertAlmostEqual(get_file_duration(file), 2.0)
+
+
+@patch("apps.ingestion.views.process_upload_task.delay")
+@patch("apps.ingestion.views.release_quota")
+@patch("apps.ingestion.views.reserve_quota")
+class DirectUploadTest(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIRequestFactory
+
+        self.factory = APIRequestFactory()
+        self.user_id = uuid.uuid4()
+
+    def post(self, view, data):
+        request = self.factory.post("/api/uploads", data, format="json")
+        request.user_id = self.user_id
+        return view(request)
+
+    def create_upload(self, size=3 * 1024 * 1024):
+        from apps.ingestion.views import create_upload
+
+        with patch("apps.storage.r2.R2Storage.presign_upload") as mock_presign:
+            mock_presign.return_value = {
+                "method": "put",
+                "url": "https://r2.example.com/signed",
+                "headers": {"Content-Type": "audio/mpeg"},
+                "upload_id": None,
+            }
+            response = self.post(
+                create_upload,
+                {
+                    "filename": "lecture.mp3",
+                    "file_size_bytes": size,
+                    "content_type": "audio/mpeg",
+                    "duration_seconds": 600,
+                    "material_types": ["summary"],
+                },
+            )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    @patch("apps.ingestion.views._probe_uploaded_minutes", return_value=12.0)
+    @patch("apps.storage.r2.R2Storage.head")
+    def test_create_and_finalize(self, mock_head, _mock_probe, mock_reserve, mock_release, mock_task):
+        from apps.ingestion.views import finalize_upload
+
+        upload = self.create_upload()
+        mock_reserve.assert_called_once_with(self.user_id, 10.0, 3.0)
+        mock_head.return_value = {"size": 3 * 1024 * 1024, "content_type": "audio/mpeg"}
+
+        response = self.post(finalize_upload, {"upload_token": upload["upload_token"]})
+
+        self.assertEqual(response.status_code, 201)
+        job = Job.objects.get(id=response.data["job_id"])
+        self.assertEqual(job.duration_seconds, 720)
+        # Two extra probed minutes are reserved on top of the claimed ten
+        self.assertEqual(mock_reserve.call_args.args[1], 2.0)
+        self.assertEqual(mock_reserve.call_args.kwargs, {"uploads": 0})
+        mock_task.assert_called_once_with(str(job.id))
+
+        # Finalizing again returns the same job
+        response = self.post(finalize_upload, {"upload_token": upload["upload_token"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Job.objects.count(), 1)
+
+    @patch("apps.ingestion.views._probe_uploaded_minutes", return_value=None)
+    @patch("apps.storage.r2.R2Storage.head")
+    def test_unprobed_upload_reserves_size_estimate(self, mock_head, _mock_probe, mock_reserve, mock_release, mock_task):
+        from apps.ingestion.views import finalize_upload
+
+        # Claimed 10 minutes for a file whose size suggests 40
+        upload = self.create_upload(size=40 * 1024 * 1024)
+        mock_head.return_value = {"size": 40 * 1024 * 1024, "content_type": "audio/mpeg"}
+
+        response = self.post(finalize_upload, {"upload_token": upload["upload_token"]})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mock_reserve.call_args.args[1:], (30.0, 40.0))
+        self.assertEqual(mock_reserve.call_args.kwargs, {"uploads": 0})
+        self.assertEqual(Job.objects.get().duration_seconds, 40 * 60)
+
+    @patch("apps.ingestion.quota.get_subscription", return_value={"max_file_size_mb": 2})
+    def test_size_limit_comes_from_subscription(self, _mock_subscription, mock_reserve, mock_release, mock_task):
+        from apps.ingestion.views import create_upload
+
+        response = self.post(
+            create_upload,
+            {
+                "filename": "lecture.mp3",
+                "file_size_bytes": 3 * 1024 * 1024,
+                "content_type": "audio/mpeg",
+                "material_types": ["summary"],
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        mock_reserve.assert_not_called()
+
+    @patch("apps.storage.r2.R2Storage.delete")
+    @patch("apps.storage.r2.R2Storage.head")
+    def test_size_mismatch_discards_upload(self, mock_head, mock_delete, mock_reserve, mock_release, mock_task):
+        from apps.ingestion.views import finalize_upload
+
+        upload = self.create_upload()
+        mock_head.return_value = {"size": 99, "content_type": "audio/mpeg"}
+
+        response = self.post(finalize_upload, {"upload_token": upload["upload_token"]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Job.objects.count(), 0)
+        mock_delete.assert_called_once()
+        mock_release.assert_called_once_with(self.user_id, 10.0)
+        mock_task.assert_not_called()
+
+    def test_rejects_tampered_token(self, mock_reserve, mock_release, mock_task):
+        from apps.ingestion.views import finalize_upload
+
+        upload = self.create_upload()
+        response = self.post(finalize_upload, {"upload_token": upload["upload_token"] + "x"})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch("apps.storage.r2.R2Storage.delete")
+    @patch("apps.storage.r2.R2Storage.head")
+    def test_failed_finalize_refunds_once(self, mock_head, _mock_delete, mock_reserve, mock_release, mock_task):
+        from apps.ingestion.models import UploadReservation
+        from apps.ingestion.views import finalize_upload
+
+        upload = self.create_upload()
+        self.assertTrue(UploadReservation.objects.filter(user_id=self.user_id).exists())
+        mock_head.return_value = {"size": 99, "content_type": "audio/mpeg"}
+
+        for _ in range(3):
+            response = self.post(finalize_upload, {"upload_token": upload["upload_token"]})
+            self.assertEqual(response.status_code, 400)
+
+        mock_release.assert_called_once_with(self.user_id, 10.0)
+        self.assertFalse(UploadReservation.objects.exists())
+
+
+@override_settings(R2_STREAMING_UPLOADS=True, R2_MULTIPART_CHUNKSIZE_MB=5)
+@patch("apps.ingestion.views.process_upload_task.delay")
+@patch("apps.ingestion.views.reserve_quota")
+class StreamingUploadTest(TestCase):
+    def setUp(self):
+        self.s3 = MagicMock()
+        self.s3.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        self.s3.upload_part.side_effect = lambda **kwargs: {
+            "ETag": f"etag-{kwargs['PartNumber']}"
+        }
+        not_found = Exception("Not Found")
+        not_found.response = {"Error": {"Code": "404"}}
+        self.s3.head_object.side_effect = not_found
+        patcher = patch("apps.storage.r2.get_r2_client", return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("apps.storage.r2.R2Storage.create_multipart_upload")
+    def test_failed_part_aborts_upload(self, mock_create, mock_reserve, mock_task):
+        from apps.core.exceptions import UploadError
+        from apps.ingestion.upload_handlers import StreamingUploadHandler
+
+        uploader = mock_create.return_value
+        uploader.add_part.side_effect = UploadError("part 1 failed")
+        for send in (
+            lambda handler: handler.receive_data_chunk(b"x" * handler.part_size, 0),
+            lambda handler: handler.receive_data_chunk(b"x", 0) or handler.file_complete(1),
+        ):
+            uploader.abort.reset_mock()
+            handler = StreamingUploadHandler()
+            handler.new_file("file", "talk.mp3", "audio/mpeg", None)
+
+            with self.assertRaises(UploadError):
+                send(handler)
+
+            uploader.abort.assert_called_once()
+            self.assertIsNone(handler.uploader)
+
+    @patch("apps.ingestion.views.store_media")
+    def test_body_is_streamed_to_r2(self, mock_upload, mock_reserve, mock_task):
+        from rest_framework.test import APIRequestFactory
+        from apps.ingestion.views import process_upload
+
+        content = b"x" * (11 * 1024 * 1024)
+        request = APIRequestFactory().post(
+            "/api/process",
+            {
+                "file": SimpleUploadedFile("talk.mp3", content, content_type="audio/mpeg"),
+                "material_types": '["summary"]',
+            },
+            format="multipart",
+        )
+        request.user_id = uuid.uuid4()
+
+        response = process_upload(request)
+
+        self.assertEqual(response.status_code, 201)
+        mock_upload.assert_not_called()
+        self.assertEqual(self.s3.upload_part.call_count, 3)
+        uploaded = b"".join(
+            call.kwargs["Body"]
+            for call in sorted(
+                self.s3.upload_part.call_args_list, key=lambda c: c.kwargs["PartNumber"]
+            )
+        )
+        self.assertEqual(hashlib.sha256(uploaded).digest(), hashlib.sha256(content).digest())
+
+        # Moved from the temporary key to its content-addressed key
+        job = Job.objects.get()
+        sha256 = hashlib.sha256(content).hexdigest()
+        temp_key = self.s3.create_multipart_upload.call_args.kwargs["Key"]
+        self.assertEqual(job.content_hash, sha256)
+        self.assertTrue(job.storage_url.endswith(content_key(sha256, "talk.mp3")))
+        self.assertEqual(
+            self.s3.copy_object.call_args.kwargs["CopySource"]["Key"], temp_key
+        )
+        self.s3.delete_object.assert_called_once_with(
+            Bucket=settings.R2_BUCKET, Key=temp_key
+        )
+        self.assertEqual(job.file_size_bytes, len(content))
+
+
+class DeduplicationTest(TestCase):
+    def _job(self, **kwargs):
+        defaults = {
+            "user_id": uuid.uuid4(),
+            "filename": "lecture.mp3",
+            "file_size_bytes": 1000,
+            "file_type": "audio/mpeg",
+            "storage_url": "https://r2.example.com/media/lecture.mp3",
+            "content_hash": "a" * 64,
+            "material_types": ["summary"],
+        }
+        defaults.update(kwargs)
+        return Job.objects.create(**defaults)
+
+    @override_settings(STORAGE_BACKEND="memory")
+    def test_existing_media_is_not_uploaded_again(self):
+        from apps.storage import get_storage
+
+        storage = get_storage()
+        key = f"media/aa/{'a' * 64}.mp3"
+        storage.store(key, b"content", "audio/mpeg")
+        file = SimpleUploadedFile("lecture.MP3", b"content", content_type="audio/mpeg")
+
+        with patch.object(storage, "put") as mock_put:
+            url = store_media(file, "a" * 64, "audio/mpeg")
+
+        mock_put.assert_not_called()
+        self.assertEqual(url, storage.url(key))
+
+    @patch("apps.transcription.service.TranscriptionService.submit_transcription")
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_reuses_completed_transcript(self, mock_generate, mock_submit):
+        from apps.ingestion.tasks import process_upload_task
+        from apps.transcription.models import Transcription
+
+        source = self._job(status="completed", transcription_id="tx_1")
+        Transcription.objects.create(
+            job=source, external_id="tx_1", text="Recorded lecture.", raw_response={}
+        )
+        mock_generate.return_value = {"summary": "A lecture."}
+        job = self._job()
+
+        process_upload_task(job.id)
+
+        mock_submit.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.transcription.text, "Recorded lecture.")
+        mock_generate.assert_called_once_with("Recorded lecture.", "summary")
+
+    @override_settings(STORAGE_BACKEND="memory")
+    @patch("apps.transcription.service.TranscriptionService.submit_transcription")
+    def test_direct_upload_is_hashed_before_lookup(self, mock_submit):
+        from apps.ingestion.tasks import process_upload_task
+        from apps.storage import get_storage
+
+        content = b"direct upload bytes"
+        sha256 = hashlib.sha256(content).hexdigest()
+        storage = get_storage()
+        storage.store("uploads/direct/lecture.mp3", content, "audio/mpeg")
+        self._job(status="transcribing", transcription_id="tx_1", content_hash=sha256)
+        job = self._job(
+            storage_url=storage.url("uploads/direct/lecture.mp3"), content_hash=""
+        )
+
+        process_upload_task(job.id)
+
+        mock_submit.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.content_hash, sha256)
+        self.assertEqual(job.transcription_id, "tx_1")
+
+    @patch("apps.transcription.service.TranscriptionService.submit_transcription")
+    def test_shares_in_flight_transcript(self, mock_submit):
+        from apps.ingestion.tasks import process_upload_task
+
+        self._job(status="transcribing", transcription_id="tx_1")
+        job = self._job()
+
+        process_upload_task(job.id)
+
+        mock_submit.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.transcription_id, "tx_1")
+
+
+@override_settings(
+    R2_PUBLIC_URL="https://files.example.com",
+    FAILED_JOB_RETENTION_DAYS=7,
+    MEDIA_RETENTION_DAYS=30,
+    ORPHAN_GRACE_HOURS=24,
+)
+class StorageCleanupTest(TestCase):
+    def setUp(self):
+        self.s3 = MagicMock()
+        self.s3.delete_objects.return_value = {}
+        self.s3.get_paginator.return_value.paginate.return_value = []
+        patcher = patch("apps.storage.r2.get_r2_client", return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _job(self, key, status, age_days):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        job = Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename="lecture.mp3",
+            file_size_bytes=1000,
+            file_type="audio/mpeg",
+            storage_url=f"https://files.example.com/{key}",
+            material_types=["summary"],
+            status=status,
+        )
+        created = timezone.now() - timedelta(days=age_days)
+        Job.objects.filter(pk=job.pk).update(created_at=created, completed_at=created)
+        return job
+
+    def _deleted_keys(self):
+        return sorted(
+            obj["Key"]
+            for call in self.s3.delete_objects.call_args_list
+            for obj in call.kwargs["Delete"]["Objects"]
+        )
+
+    def test_key_from_storage_url_keeps_prefix(self):
+        from apps.storage.r2 import R2Storage
+
+        self.assertEqual(
+            R2Storage().key_from_url("https://files.example.com/abc/talk.mp3"),
+            "abc/talk.mp3",
+        )
+
+    def test_failed_and_expired_jobs_are_cleaned_in_batches(self):
+        from apps.ingestion.cleanup import cleanup_storage
+
+        failed = [self._job(f"failed-{i}.mp3", "failed", 10) for i in range(3)]
+        shared_failed = self._job("shared.mp3", "failed", 10)
+        recent_failed = self._job("recent.mp3", "failed", 1)
+        expired = self._job("old.mp3", "completed", 40)
+        self._job("shared.mp3", "completed", 1)
+
+        stats = cleanup_storage(batch_size=2, sweep_orphans=False)
+
+        self.assertEqual(
+            self._deleted_keys(),
+            ["failed-0.mp3", "failed-1.mp3", "failed-2.mp3", "old.mp3"],
+        )
+        self.assertEqual(self.s3.delete_objects.call_count, 3)
+        self.assertEqual(stats.jobs_deleted, 4)
+        self.assertFalse(Job.objects.filter(pk__in=[j.pk for j in failed]).exists())
+        self.assertFalse(Job.objects.filter(pk=shared_failed.pk).exists())
+        self.assertTrue(Job.objects.filter(pk=recent_failed.pk).exists())
+        expired.refresh_from_db()
+        self.assertEqual(expired.storage_url, "")
+
+    def test_job_kept_when_its_media_fails_to_delete(self):
+        from apps.ingestion.cleanup import cleanup_storage
+
+        job = self._job("stuck.mp3", "failed", 10)
+        self.s3.delete_objects.return_value = {
+            "Errors": [{"Key": "stuck.mp3", "Message": "Internal error"}]
+        }
+
+        stats = cleanup_storage(sweep_orphans=False)
+
+        self.assertEqual(stats.jobs_deleted, 0)
+        self.assertTrue(Job.objects.filter(pk=job.pk).exists())
+
+    def test_expired_job_loses_extracted_audio_too(self):
+        from apps.ingestion.cleanup import cleanup_storage
+
+        expired = self._job("old.mp4", "completed", 40)
+        Job.objects.filter(pk=expired.pk).update(
+            audio_url="https://files.example.com/audio/old.ogg"
+        )
+
+        cleanup_storage(sweep_orphans=False)
+
+        self.assertEqual(self._deleted_keys(), ["audio/old.ogg", "old.mp4"])
+        expired.refresh_from_db()
+        self.assertEqual((expired.storage_url, expired.audio_url), ("", ""))
+
+    def test_orphan_sweep_skips_referenced_and_recent_objects(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.ingestion.cleanup import cleanup_storage
+
+        self._job("kept.mp3", "completed", 1)
+        old = timezone.now() - timedelta(days=2)
+        listing = MagicMock()
+        listing.paginate.return_value = [
+            {
+                "Contents": [
+                    {"Key": "kept.mp3", "LastModified": old},
+                    {"Key": "orphan.mp3", "LastModified": old},
+                    {"Key": "uploading.mp3", "LastModified": timezone.now()},
+                ]
+            }
+        ]
+        uploads = MagicMock()
+        uploads.paginate.return_value = [
+            {
+                "Uploads": [
+                    {"Key": "a.mp3", "UploadId": "stale", "Initiated": old},
+                    {"Key": "b.mp3", "UploadId": "live", "Initiated": timezone.now()},
+                ]
+            }
+        ]
+        self.s3.get_paginator.side_effect = lambda name: (
+            listing if name == "list_objects_v2" else uploads
+        )
+
+        stats = cleanup_storage()
+
+        self.assertEqual(self._deleted_keys(), ["orphan.mp3"])
+        self.assertEqual(stats.uploads_aborted, 1)
+        self.s3.abort_multipart_upload.assert_called_once_with(
+            Bucket=settings.R2_BUCKET, Key="a.mp3", UploadId="stale"
+        )
+
+    @patch("apps.ingestion.quota.release_quota")
+    def test_unfinalized_upload_reservations_are_released(self, mock_release):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.ingestion.cleanup import cleanup_storage
+        from apps.ingestion.models import UploadReservation
+
+        user_id = uuid.uuid4()
+        quota.record_reservation(user_id, "expired.mp3", 5.0, ttl=60)
+        UploadReservation.objects.filter(key="expired.mp3").update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        quota.record_reservation(user_id, "aborted.mp3", 7.0, ttl=3600)
+        quota.record_reservation(user_id, "pending.mp3", 9.0, ttl=3600)
+        uploads = MagicMock()
+        uploads.paginate.return_value = [
+            {
+                "Uploads": [
+                    {
+                        "Key": "aborted.mp3",
+                        "UploadId": "stale",
+                        "Initiated": timezone.now() - timedelta(days=2),
+                    }
+                ]
+            }
+        ]
+        self.s3.get_paginator.side_effect = lambda name: (
+            uploads if name == "list_multipart_uploads" else MagicMock()
+        )
+
+        stats = cleanup_storage()
+        # Nothing left to give back on a second run
+        cleanup_storage()
+
+        self.assertEqual(stats.reservations_released, 2)
+        self.assertEqual(
+            sorted(call.args for call in mock_release.call_args_list),
+            [(str(user_id), 5.0), (str(user_id), 7.0)],
+        )
+        self.assertEqual(
+            list(UploadReservation.objects.values_list("key", flat=True)), ["pending.mp3"]
+        )
+
+
+@override_settings(STORAGE_BACKEND="memory", AUDIO_EXTRACTION_ENABLED=True)
+class AudioExtractionTest(TestCase):
+    def setUp(self):
+        from apps.storage import get_storage
+
+        self.storage = get_storage()
+        self.storage.store("media/talk.mp4", b"video bytes", "video/mp4")
+
+    def _job(self, filename="talk.mp4"):
+        return Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename=filename,
+            file_size_bytes=11,
+            file_type="video/mp4",
+            storage_url=self.storage.url("media/talk.mp4"),
+            content_hash="c" * 64,
+            material_types=["summary"],
+        )
+
+    @staticmethod
+    def fake_ffmpeg(command, **kwargs):
+        with open(command[-1], "wb") as out:
+            out.write(b"audio")
+
+    @patch("apps.ingestion.tasks.TranscriptionService.submit_transcription")
+    def test_video_submitted_as_extracted_audio(self, mock_submit):
+        from apps.ingestion.tasks import process_upload_task
+
+        mock_submit.return_value = "tx_1"
+        job = self._job()
+
+        with patch("apps.ingestion.audio.subprocess.run", side_effect=self.fake_ffmpeg) as run:
+            process_upload_task(job.id)
+
+        command = run.call_args.args[0]
+        self.assertIn("-vn", command)
+        self.assertEqual(command[command.index("-ac") + 1], "1")
+        key = f"audio/cc/{'c' * 64}.ogg"
+        self.assertEqual(self.storage.head(key), {"size": 5, "content_type": "audio/ogg"})
+        mock_submit.assert_called_once()
+        self.assertEqual(mock_submit.call_args.args[0], self.storage.url(key))
+        job.refresh_from_db()
+        self.assertEqual(job.audio_url, self.storage.url(key))
+
+    @patch("apps.ingestion.tasks.TranscriptionService.submit_transcription")
+    def test_falls_back_to_original_without_ffmpeg(self, mock_submit):
+        from apps.ingestion.tasks import process_upload_task
+
+        mock_submit.return_value = "tx_1"
+        job = self._job()
+
+        with patch("apps.ingestion.audio.subprocess.run", side_effect=FileNotFoundError):
+            process_upload_task(job.id)
+
+        self.assertEqual(mock_submit.call_args.args[0], job.storage_url)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "transcribing")
+
+    def test_audio_uploads_are_not_transcoded(self):
+        from apps.ingestion.audio import needs_extraction
+
+        self.assertTrue(needs_extraction(self._job("talk.MOV")))
+        self.assertFalse(needs_extraction(self._job("talk.mp3")))
+
+
+class SilenceTrimmingTest(TestCase):
+    OFFSETS = [[0, 0], [5000, 15000], [8000, 30000]]
+
+    def test_remaps_nested_timestamps(self):
+        from apps.ingestion.silence import remap_timestamps
+
+        result = {
+            "words": [
+                {"text": "a", "start": 100, "end": 400},
+                {"text": "b", "start": 5100, "end": 5500},
+                {"text": "c", "start": 7900, "end": 8000},
+            ],
+            "chapters": [{"start": 0, "end": 9000, "headline": "All"}],
+            "audio_duration": 9,
+        }
+
+        remapped = remap_timestamps(result, self.OFFSETS)
+
+        self.assertEqual(
+            [(w["start"], w["end"]) for w in remapped["words"]],
+            [(100, 400), (15100, 15500), (17900, 18000)],
+        )
+        self.assertEqual(remapped["chapters"][0]["end"], 31000)
+        self.assertEqual(result["words"][1]["start"], 5100)
+
+    @override_settings(
+        SILENCE_THRESHOLD_DB=-40, SILENCE_MIN_SECONDS=2.0, SILENCE_PADDING_SECONDS=0.3
+    )
+    def test_cuts_only_long_silences(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        from apps.ingestion.silence import offset_map, speech_spans
+
+        # 30 ms frames: 3 s speech, 1 s pause, 3 s speech, 10 s silence, 3 s speech
+        levels = np.concatenate(
+            [np.full(n, level) for n, level in ((100, -20), (33, -60), (100, -20), (333, -60), (100, -20))]
+        )
+
+        spans, total = speech_spans(levels)
+
+        self.assertAlmostEqual(total, 19.98)
+        self.assertEqual(len(spans), 2)
+        self.assertAlmostEqual(spans[0][1], 6.99 + 0.3)
+        self.assertAlmostEqual(spans[1][0], 16.98 - 0.3)
+        self.assertEqual(offset_map(spans)[1], [7290, 16680])
+
+    def test_decode_killed_after_timeout(self):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        import os
+        import tempfile
+        import time
+        from apps.core.exceptions import MediaProcessingError
+        from apps.ingestion.silence import frame_energies
+
+        with tempfile.TemporaryDirectory() as workdir:
+            # Stands in for an ffmpeg that hangs without output
+            ffmpeg = os.path.join(workdir, "ffmpeg")
+            with open(ffmpeg, "w") as script:
+                script.write("#!/bin/sh\nexec sleep 30\n")
+            os.chmod(ffmpeg, 0o755)
+
+            started = time.monotonic()
+            with override_settings(FFMPEG_BINARY=ffmpeg, AUDIO_EXTRACTION_TIMEOUT=0.2):
+                with self.assertRaisesRegex(MediaProcessingError, "timed out"):
+                    frame_energies(os.path.join(workdir, "talk.mp3"))
+
+        self.assertLess(time.monotonic() - started, 10)
+
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_transcript_stored_on_original_timeline(self, mock_generate):
+        from apps.ingestion.tasks import _complete_transcription
+
+        mock_generate.return_value = {"summary": "x"}
+        job = Job.objects.create(
+            user_id=uuid.uuid4(),
+            filename="lecture.mp3",
+            file_size_bytes=1000,
+            file_type="audio/mpeg",
+            storage_url="https://files.example.com/lecture.mp3",
+            material_types=["summary"],
+            status="generating",
+            time_offsets=self.OFFSETS,
+        )
+
+        _complete_transcription(
+            job,
+            {"id": "tx_1", "text": "b", "words": [{"text": "b", "start": 5100, "end": 5500}]},
+        )
+
+        word = job.transcription.word_timings.word(0)
+        self.assertEqual((word["start"], word["end"]), (15100, 15500))
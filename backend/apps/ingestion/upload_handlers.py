@@ -0,0 +1,150 @@
+"""
+Upload handler that streams request bodies straight into storage.
+
+Django's default handlers spool the whole upload to memory or a temp file
+before the view runs, and the view then reads it back to send it to storage.
+StreamingUploadHandler instead forwards the body as multipart parts while
+it is still arriving, hashing it on the way, so the upload to storage
+overlaps the client upload and nothing touches local disk.
+"""
+
+import hashlib
+import logging
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from apps.core.exceptions import InvalidFileError
+from apps.storage import get_storage
+from apps.storage.base import MB
+from .validators import validate_filename
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes kept in memory so duration probing rarely needs a GET
+PROBE_PREFIX_BYTES = 256 * 1024
+
+
+class StreamedUploadedFile(UploadedFile):
+    """
+    An upload that already lives in storage.
+
+    Reading it reads the stored object (for R2, ranged GETs with the first
+    PROBE_PREFIX_BYTES served from memory).
+    """
+
+    def __init__(
+        self,
+        key: str,
+        name: str,
+        content_type: str,
+        size: int,
+        sha256: str,
+        prefix: bytes,
+        charset: Optional[str] = None,
+        content_type_extra: Optional[dict] = None,
+    ):
+        storage = get_storage()
+        super().__init__(
+            storage.open(key, size, prefix=prefix),
+            name,
+            content_type,
+            size,
+            charset,
+            content_type_extra,
+        )
+        self.key = key
+        self.storage_url = storage.url(key)
+        self.sha256 = sha256
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """Forward the uploaded file to storage as it streams in."""
+
+    def __init__(self, request=None, field_name: str = "file", max_size_mb: int = 100):
+        super().__init__(request)
+        self.target_field = field_name
+        self.max_size_bytes = max_size_mb * MB
+        self.part_size = get_storage().part_size
+        self.uploader = None
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+        if field_name != self.target_field:
+            return
+
+        # Reject unsupported files before any bytes go to storage
+        validate_filename(file_name)
+
+        self.uploader = get_storage().create_multipart_upload(
+            f"{uuid.uuid4()}/{file_name}",
+            content_type,
+            concurrency=settings.R2_STREAMING_PART_CONCURRENCY,
+        )
+        self.uploader.start()
+        self.hasher = hashlib.sha256()
+        self.buffer = bytearray()
+        self.prefix = b""
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.uploader is None:
+            return raw_data  # Not our field; let the next handler have it
+
+        self.received += len(raw_data)
+        if self.received > self.max_size_bytes:
+            self._abort()
+            raise InvalidFileError(
+                f"File too large. Max allowed: {self.max_size_bytes // MB}MB"
+            )
+
+        self.hasher.update(raw_data)
+        if len(self.prefix) < PROBE_PREFIX_BYTES:
+            self.prefix += raw_data[:PROBE_PREFIX_BYTES - len(self.prefix)]
+
+        self.buffer += raw_data
+        if len(self.buffer) >= self.part_size:
+            self._send_buffer()
+        return None
+
+    def file_complete(self, file_size):
+        if self.uploader is None:
+            return None
+
+        if self.buffer:
+            self._send_buffer()
+        uploader, self.uploader = self.uploader, None
+        stats = uploader.complete()  # Aborts the upload itself if it fails
+
+        return StreamedUploadedFile(
+            key=uploader.key,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=stats.bytes,
+            sha256=self.hasher.hexdigest(),
+            prefix=self.prefix,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if self.uploader is not None:
+            logger.warning(f"Upload of {self.file_name} interrupted")
+            self._abort()
+
+    def _send_buffer(self):
+        try:
+            self.uploader.add_part(bytes(self.buffer))
+        except Exception:
+            # Django only calls upload_interrupted() on StopUpload, so a
+            # failed part would otherwise leave the upload and its pool open
+            self._abort()
+            raise
+        self.buffer = bytearray()
+
+    def _abort(self):
+        uploader, self.uploader = self.uploader, None
+        uploader.abort()
@@ -4,4 +4,6 @@ from . import views
 
 urlpatterns = [
     path('process', views.process_upload, name='process_upload'),
+    path('uploads', views.create_upload, name='create_upload'),
+    path('uploads/finalize', views.finalize_upload, name='finalize_upload'),
 ]
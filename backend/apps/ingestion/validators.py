@@ -2,7 +2,7 @@ import logging
 from typing import Optional
 from django.core.files.uploadedfile import UploadedFile
 from apps.core.exceptions import InvalidFileError
-from mutagen import File
+from .media_probe import probe_duration
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +13,11 @@ ALLOWED_EXTENSIONS = ALLOWED_AUDIO_TYPES + ALLOWED_VIDEO_TYPES
 
 
 def validate_file_type(file: UploadedFile) -> bool:
-    ext = file.name.split(".")[-1].lower()
+    return validate_filename(file.name)
+
+
+def validate_filename(filename: str) -> bool:
+    ext = filename.split(".")[-1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise InvalidFileError(
             f"File type '{ext}' not supported. "
@@ -23,7 +27,11 @@ def validate_file_type(file: UploadedFile) -> bool:
 
 
 def validate_file_size(file: UploadedFile, max_size_mb: int) -> bool:
-    size_mb = file.size / (1024 * 1024)
+    return validate_size(file.size, max_size_mb)
+
+
+def validate_size(size_bytes: int, max_size_mb: int) -> bool:
+    size_mb = size_bytes / (1024 * 1024)
     if size_mb > max_size_mb:
         raise InvalidFileError(
             f"File too large ({size_mb:.1f}MB). Max allowed: {max_size_mb}MB"
@@ -33,17 +41,33 @@ def validate_file_size(file: UploadedFile, max_size_mb: int) -> bool:
 
 def get_file_duration(file: UploadedFile) -> float:
     """
-    Estimate audio/video duration in minutes.
+    Get audio/video duration in minutes.
 
-    For now, uses size-based estimation since mutagen requires a file path.
-    TODO: Improve with actual duration extraction after R2 upload.
+    Reads the container headers (seeking past the media payload, so only a
+    few KB of the upload are touched). Falls back to a size-based estimate
+    when the headers don't carry a duration.
 
     Returns:
-        Duration in minutes (estimated)
+        Duration in minutes
     """
+    try:
+        seconds = probe_duration(file, file.size)
+    except Exception as e:
+        logger.warning(f"Could not probe duration of {file.name}: {e}")
+        seconds = None
+
+    if seconds:
+        logger.info(f"Probed duration: {seconds / 60:.1f} minutes ({file.name})")
+        return seconds / 60
+
+    return estimate_duration_minutes(file.size)
+
+
+def estimate_duration_minutes(size_bytes: int) -> float:
+    """Guess duration in minutes from file size when headers aren't available."""
     # Quick estimate: ~1 MB = 1 minute of compressed audio/video
     # This is rough but good enough for quota checking
-    size_mb = file.size / (1024 * 1024)
+    size_mb = size_bytes / (1024 * 1024)
     estimated_minutes = size_mb
 
     logger.info(
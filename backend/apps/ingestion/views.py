@@ -1,15 +1,39 @@
 import logging
+import uuid
+from django.conf import settings
+from django.core import signing
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 
 from apps.accounts.permissions import IsAuthenticated
-from .serializers import ProcessUploadSerializer
+from apps.core.exceptions import InvalidFileError
+from apps.storage import get_storage
+from .serializers import (
+    CreateUploadSerializer,
+    FinalizeUploadSerializer,
+    ProcessUploadSerializer,
+)
+from .dedup import hash_file, promote_streamed_upload, store_media
+from .media_probe import probe_duration
 from .models import Job
-from .validators import validate_file_type, validate_file_size, get_file_duration
-from .quota import check_user_quota
-from .r2_storage import upload_to_r2
+from .validators import (
+    estimate_duration_minutes,
+    get_file_duration,
+    validate_file_size,
+    validate_file_type,
+    validate_filename,
+    validate_size,
+)
+from .quota import (
+    claim_reservation,
+    max_file_size_mb,
+    record_reservation,
+    reserve_quota,
+    release_quota,
+)
 from .tasks import process_upload_task
+from .upload_handlers import StreamedUploadedFile, StreamingUploadHandler
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +41,12 @@ logger = logging.getLogger(__name__)
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def process_upload(request):
+    if settings.R2_STREAMING_UPLOADS:
+        # Must be installed before the body is parsed
+        request._request.upload_handlers = [
+            StreamingUploadHandler(request._request)
+        ]
+
     serializer = ProcessUploadSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -27,35 +57,261 @@ def process_upload(request):
 
     # Validate file
     validate_file_type(file)
-    validate_file_size(file, 100)  # TODO: Get from user subscription
+    validate_file_size(file, max_file_size_mb(request.user_id))
 
-    # Get duration and check quota
+    # Get duration and reserve quota
     duration = get_file_duration(file)
-    check_user_quota(request.user_id, duration, file.size / (1024 * 1024))
-
-    # Upload to R2
-    storage_url = upload_to_r2(file, file.name, file.content_type)
-
-    # Create job
-    job = Job.objects.create(
-        user_id=request.user_id,
-        filename=file.name,
-        file_size_bytes=file.size,
-        file_type=file.content_type,
-        storage_url=storage_url,
-        material_types=material_types,
-        options=options,
-        status="queued",
+    try:
+        reserve_quota(request.user_id, duration, file.size / (1024 * 1024))
+    except Exception:
+        _discard_streamed_file(file)
+        raise
+
+    try:
+        if isinstance(file, StreamedUploadedFile):
+            # Already streamed to storage (and hashed) while the request body arrived
+            content_hash = file.sha256
+            storage_url = promote_streamed_upload(file)
+        else:
+            content_hash = hash_file(file)
+            storage_url = store_media(file, content_hash, file.content_type)
+
+        # Create job
+        job = Job.objects.create(
+            user_id=request.user_id,
+            filename=file.name,
+            file_size_bytes=file.size,
+            file_type=file.content_type,
+            storage_url=storage_url,
+            content_hash=content_hash,
+            duration_seconds=duration * 60,
+            material_types=material_types,
+            options=options,
+            status="queued",
+        )
+
+        # Trigger Celery task
+        process_upload_task.delay(str(job.id))
+    except Exception:
+        release_quota(request.user_id, duration)
+        _discard_streamed_file(file)
+        raise
+
+    return _job_created_response(job)
+
+
+def _discard_streamed_file(file):
+    if not isinstance(file, StreamedUploadedFile):
+        return
+    try:
+        get_storage().delete(file.key)
+    except Exception as e:
+        logger.warning(f"Failed to delete rejected upload {file.key}: {e}")
+
+
+UPLOAD_TOKEN_SALT = "noteably.ingestion.upload"
+
+
+def _upload_token_max_age() -> int:
+    # Leave room for uploads that started just before the URLs expired
+    return settings.R2_PRESIGN_EXPIRY * 2
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def create_upload(request):
+    """
+    Reserve quota and issue presigned URLs for uploading straight to R2.
+
+    The client uploads the file to the returned URL(s), then calls
+    finalize_upload with the upload token. Media bytes never pass through
+    the API.
+    """
+    serializer = CreateUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    filename = data["filename"]
+    size = data["file_size_bytes"]
+
+    validate_filename(filename)
+    validate_size(size, max_file_size_mb(request.user_id))
+
+    # The real duration is probed at finalize; reserve on the client's claim for now
+    if data.get("duration_seconds"):
+        duration = data["duration_seconds"] / 60
+    else:
+        duration = estimate_duration_minutes(size)
+    reserve_quota(request.user_id, duration, size / (1024 * 1024))
+
+    key = f"{uuid.uuid4()}/{filename}"
+    try:
+        upload = get_storage().presign_upload(key, data["content_type"], size)
+        # Released by cleanup if the upload is never finalized
+        record_reservation(request.user_id, key, duration, _upload_token_max_age())
+    except Exception:
+        release_quota(request.user_id, duration)
+        raise
+
+    upload_token = signing.dumps(
+        {
+            "user_id": str(request.user_id),
+            "key": key,
+            "upload_id": upload["upload_id"],
+            "filename": filename,
+            "size": size,
+            "content_type": data["content_type"],
+            "duration_minutes": duration,
+            "material_types": data["material_types"],
+            "options": data.get("options", {}),
+        },
+        salt=UPLOAD_TOKEN_SALT,
     )
 
-    # Trigger Celery task
-    process_upload_task.delay(str(job.id))
+    return Response(
+        {
+            "upload_token": upload_token,
+            "expires_in": settings.R2_PRESIGN_EXPIRY,
+            **upload,
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def finalize_upload(request):
+    """
+    Verify a direct upload landed in R2, then create and enqueue its job.
+
+    Checks the object's size and content type against what was declared,
+    probes the real duration from its headers with ranged reads, and tops
+    up the quota reservation if the file is longer than claimed (or, when
+    the duration can't be probed, larger than the claim allows for).
+    """
+    serializer = FinalizeUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        upload = signing.loads(
+            serializer.validated_data["upload_token"],
+            salt=UPLOAD_TOKEN_SALT,
+            max_age=_upload_token_max_age(),
+        )
+    except signing.BadSignature:
+        return Response(
+            {"error": "Invalid or expired upload token"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if upload["user_id"] != str(request.user_id):
+        return Response(
+            {"error": "Upload belongs to another user"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    storage = get_storage()
+    storage_url = storage.url(upload["key"])
 
+    # Finalizing twice must not create a second job
+    existing = Job.objects.filter(user_id=request.user_id, storage_url=storage_url).first()
+    if existing:
+        return _job_created_response(existing, status.HTTP_200_OK)
+
+    # Taken once: a failed finalize refunds the reservation, and re-posting
+    # the token can't refund it again
+    if claim_reservation(upload["key"]) is None:
+        return Response(
+            {"error": "Upload was already finalized or has expired"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    minutes = upload["duration_minutes"]
+    try:
+        if upload["upload_id"]:
+            parts = serializer.validated_data["parts"]
+            if not parts:
+                raise InvalidFileError("Multipart upload is missing its parts")
+            storage.complete_presigned_upload(upload["key"], upload["upload_id"], parts)
+
+        head = storage.head(upload["key"])
+        if head is None:
+            raise InvalidFileError("Uploaded file not found")
+        if head["size"] != upload["size"]:
+            raise InvalidFileError(
+                f"Uploaded file is {head['size']} bytes, expected {upload['size']}"
+            )
+        if head["content_type"] != upload["content_type"]:
+            raise InvalidFileError(
+                f"Uploaded file has content type {head['content_type']}, "
+                f"expected {upload['content_type']}"
+            )
+
+        # Settle the reservation on the real duration. Without one, the
+        # client's claim only counts if the file isn't bigger than it implies.
+        settled_minutes = _probe_uploaded_minutes(upload["key"], head["size"]) or max(
+            minutes, estimate_duration_minutes(head["size"])
+        )
+        if settled_minutes > minutes:
+            reserve_quota(
+                request.user_id,
+                settled_minutes - minutes,
+                head["size"] / (1024 * 1024),
+                uploads=0,
+            )
+            minutes = settled_minutes
+        elif settled_minutes < minutes:
+            release_quota(request.user_id, minutes - settled_minutes, uploads=0)
+            minutes = settled_minutes
+
+        job = Job.objects.create(
+            user_id=request.user_id,
+            filename=upload["filename"],
+            file_size_bytes=head["size"],
+            file_type=upload["content_type"],
+            storage_url=storage_url,
+            duration_seconds=minutes * 60,
+            material_types=upload["material_types"],
+            options=upload["options"],
+            status="queued",
+        )
+        process_upload_task.delay(str(job.id))
+    except Exception:
+        _discard_upload(upload)
+        release_quota(request.user_id, minutes)
+        raise
+
+    return _job_created_response(job)
+
+
+def _probe_uploaded_minutes(key: str, size: int):
+    try:
+        seconds = probe_duration(get_storage().open(key, size), size)
+    except Exception as e:
+        logger.warning(f"Could not probe duration of {key}: {e}")
+        return None
+    return seconds / 60 if seconds else None
+
+
+def _discard_upload(upload: dict):
+    """Remove a rejected direct upload from storage."""
+    storage = get_storage()
+    if upload["upload_id"]:
+        storage.abort_multipart(upload["key"], upload["upload_id"])
+    try:
+        storage.delete(upload["key"])
+    except Exception as e:
+        logger.warning(f"Failed to delete rejected upload {upload['key']}: {e}")
+
+
+def _job_created_response(job: Job, status_code: int = status.HTTP_201_CREATED):
     return Response(
         {
             "job_id": str(job.id),
             "status": job.status,
             "estimated_time": job.estimate_processing_time(),
         },
-        status=status.HTTP_201_CREATED,
+        status=status_code,
     )
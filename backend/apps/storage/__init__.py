@@ -0,0 +1,46 @@
+"""
+Pluggable object storage.
+
+STORAGE_BACKEND selects the backend: "r2", "local", "memory" or the dotted
+path of a StorageBackend subclass.
+"""
+
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+BACKEND_ALIASES = {
+    "r2": "apps.storage.r2.R2Storage",
+    "local": "apps.storage.local.LocalStorage",
+    "memory": "apps.storage.memory.InMemoryStorage",
+}
+
+_storage = None
+_storage_name = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Get the configured storage backend, creating it on first use.
+
+    The instance is shared process-wide (the in-memory backend relies on
+    this) and rebuilt if STORAGE_BACKEND changes, e.g. under override_settings.
+    """
+    global _storage, _storage_name
+
+    name = settings.STORAGE_BACKEND
+    if _storage is None or _storage_name != name:
+        with _storage_lock:
+            if _storage is None or _storage_name != name:
+                _storage = import_string(BACKEND_ALIASES.get(name, name))()
+                _storage_name = name
+    return _storage
+
+
+def reset_storage():
+    """Drop the shared backend instance (used by tests)."""
+    global _storage, _storage_name
+    _storage = None
+    _storage_name = None
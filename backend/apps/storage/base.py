@@ -0,0 +1,378 @@
+"""
+Storage backend interface.
+
+Ingestion talks to object storage only through StorageBackend, so the same
+pipeline runs against Cloudflare R2, a local directory or process memory
+(see get_storage and the STORAGE_BACKEND setting).
+"""
+
+import io
+import time
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+
+from apps.core.exceptions import StorageError, UploadError
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+MIN_PART_SIZE = 5 * MB  # S3 API minimum for every part but the last
+DELETE_BATCH_SIZE = 1000  # S3 DeleteObjects accepts at most this many keys
+
+
+@dataclass
+class TransferStats:
+    """Throughput metrics for one upload."""
+
+    key: str
+    bytes: int = 0
+    parts: int = 0
+    part_retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput_mbps(self) -> float:
+        """Average throughput in megabits per second."""
+        if not self.seconds:
+            return 0.0
+        return self.bytes * 8 / MB / self.seconds
+
+
+class MultipartUpload(ABC):
+    """
+    Incremental upload of one object, fed a part at a time.
+
+    Call start(), then add_part() for each part in order, then complete();
+    abort() discards everything uploaded so far.
+    """
+
+    def __init__(self, key: str, content_type: Optional[str] = None):
+        self.key = key
+        self.content_type = content_type or "application/octet-stream"
+        self.stats = TransferStats(key=key)
+        self.upload_id = None
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._start()
+
+    def add_part(self, data: bytes):
+        """Queue the next part. Every part but the last must be at least 5 MB."""
+        self.stats.bytes += len(data)
+        self.stats.parts += 1
+        self._add_part(self.stats.parts, data)
+
+    def complete(self) -> TransferStats:
+        """
+        Assemble the object from its parts.
+
+        Raises:
+            UploadError: If the upload fails (it is aborted)
+        """
+        try:
+            self._complete()
+        except Exception as e:
+            self.abort()
+            if isinstance(e, UploadError):
+                raise
+            raise UploadError(f"Multipart upload of {self.key} failed: {e}")
+
+        self.stats.seconds = time.monotonic() - self._started
+        logger.info(
+            f"Uploaded {self.key}: {self.stats.bytes / MB:.1f}MB in {self.stats.parts} parts, "
+            f"{self.stats.seconds:.2f}s ({self.stats.throughput_mbps:.1f} Mbit/s, "
+            f"{self.stats.part_retries} part retries)",
+            extra={
+                "key": self.key,
+                "bytes": self.stats.bytes,
+                "parts": self.stats.parts,
+                "seconds": self.stats.seconds,
+                "part_retries": self.stats.part_retries,
+            },
+        )
+        return self.stats
+
+    @abstractmethod
+    def abort(self):
+        """Cancel the upload and discard uploaded parts."""
+
+    @abstractmethod
+    def _start(self):
+        ...
+
+    @abstractmethod
+    def _add_part(self, part_number: int, data: bytes):
+        ...
+
+    @abstractmethod
+    def _complete(self):
+        ...
+
+
+class StorageBackend(ABC):
+    """Object storage operations used by ingestion and cleanup."""
+
+    # Uploads at or above this size go through multipart_upload
+    multipart_threshold = 16 * MB
+    # Bytes per part for multipart uploads
+    part_size = 8 * MB
+
+    @abstractmethod
+    def put(self, fileobj, key: str, content_type: Optional[str] = None):
+        """
+        Store a whole stream as one object.
+
+        Raises:
+            UploadError: If the upload fails
+        """
+
+    @abstractmethod
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> MultipartUpload:
+        """Return a (not yet started) incremental upload for key."""
+
+    @abstractmethod
+    def head(self, key: str) -> Optional[dict]:
+        """
+        Get an object's size and content type.
+
+        Returns:
+            {"size": int, "content_type": str}, or None if the object doesn't exist
+        """
+
+    @abstractmethod
+    def open(self, key: str, size: int, prefix: bytes = b"") -> io.RawIOBase:
+        """
+        Open an object for seekable reading.
+
+        Args:
+            key: Object key
+            size: Object size in bytes
+            prefix: Already known leading bytes of the object
+        """
+
+    def iter_chunks(self, key: str, size: int, chunk_size: int = MB) -> Iterator[bytes]:
+        """
+        Read a whole object front to back.
+
+        Raises:
+            DownloadError: If the object can't be read
+        """
+        with self.open(key, size) as reader:
+            while True:
+                chunk = reader.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    @abstractmethod
+    def copy(self, source_key: str, dest_key: str):
+        """Copy an object within the store, keeping its content type."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete one object (missing objects are ignored)."""
+
+    @abstractmethod
+    def delete_many(self, keys: List[str]) -> List[str]:
+        """
+        Delete objects in batches.
+
+        Returns:
+            Keys that could not be deleted
+        """
+
+    @abstractmethod
+    def iter_object_pages(self, prefix: str = "") -> Iterator[list]:
+        """Yield pages of objects ({"Key", "LastModified", "Size"}) under a prefix."""
+
+    @abstractmethod
+    def iter_multipart_uploads(self, prefix: str = "") -> Iterator[dict]:
+        """Yield unfinished multipart uploads ({"Key", "UploadId", "Initiated"})."""
+
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str):
+        """Abort an unfinished multipart upload by ID (errors are logged)."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """URL stored on jobs and handed to the transcription provider."""
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> str:
+        """Inverse of url()."""
+
+    @property
+    def addressable(self) -> bool:
+        """Whether url() is configured, so stored URLs can be mapped back to keys."""
+        return True
+
+    def presign_upload(self, key: str, content_type: str, size: int) -> dict:
+        """
+        Prepare a direct client upload (see R2Storage.presign_upload).
+
+        Raises:
+            StorageError: If the backend can't accept direct uploads
+        """
+        raise StorageError(f"{type(self).__name__} does not support direct uploads")
+
+    def complete_presigned_upload(self, key: str, upload_id: str, parts: list):
+        """Complete a client-side multipart upload."""
+        raise StorageError(f"{type(self).__name__} does not support direct uploads")
+
+    def save(
+        self,
+        fileobj,
+        key: str,
+        content_type: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> str:
+        """
+        Upload a file, using multipart for large files.
+
+        Args:
+            fileobj: Readable binary file object
+            key: Object key
+            content_type: MIME type
+            size: File size if known (defaults to fileobj.size)
+
+        Returns:
+            URL of the stored object
+        """
+        if size is None:
+            size = getattr(fileobj, "size", None)
+
+        if size is not None and size >= self.multipart_threshold:
+            self.multipart_upload(fileobj, key, content_type)
+        else:
+            self.put(fileobj, key, content_type)
+        return self.url(key)
+
+    def multipart_upload(
+        self,
+        fileobj,
+        key: str,
+        content_type: Optional[str] = None,
+        part_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> TransferStats:
+        """
+        Upload a file as multipart parts read sequentially from fileobj.
+
+        Args:
+            fileobj: Readable binary file object (read from its current position)
+            key: Object key
+            content_type: MIME type
+            part_size: Bytes per part (defaults to part_size, min 5 MB)
+            concurrency: Parts in flight, for backends that upload in parallel
+
+        Returns:
+            Transfer statistics
+
+        Raises:
+            UploadError: If the upload fails
+        """
+        part_size = max(part_size or self.part_size, MIN_PART_SIZE)
+        upload = self.create_multipart_upload(key, content_type, concurrency)
+        upload.start()
+
+        try:
+            while True:
+                data = fileobj.read(part_size)
+                if not data:
+                    break
+                upload.add_part(data)
+        except Exception as e:
+            upload.abort()
+            if isinstance(e, UploadError):
+                raise
+            raise UploadError(f"Multipart upload of {key} failed: {e}")
+
+        return upload.complete()
+
+
+class BlockReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over ranged reads of a remote object.
+
+    Reads are served from fixed-size blocks so header parsers that hop
+    between small structures cost one request per block, not per read.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        key: str,
+        size: int,
+        read_range: Callable[[int, int], bytes],
+        prefix: bytes = b"",
+    ):
+        """
+        Args:
+            key: Object key
+            size: Object size in bytes
+            read_range: Fetches bytes [start, end] (inclusive) of the object
+            prefix: Already known leading bytes of the object (saves reads)
+        """
+        super().__init__()
+        self.key = key
+        self.size = size
+        self.position = 0
+        self._read_range = read_range
+        self._blocks = {}
+
+        for index in range(len(prefix) // self.BLOCK_SIZE):
+            self._blocks[index] = prefix[index * self.BLOCK_SIZE:(index + 1) * self.BLOCK_SIZE]
+        if prefix and len(prefix) >= size:
+            self._blocks[len(prefix) // self.BLOCK_SIZE] = prefix[
+                (len(prefix) // self.BLOCK_SIZE) * self.BLOCK_SIZE:size
+            ]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.position
+        end = min(self.position + size, self.size)
+
+        chunks = []
+        while self.position < end:
+            block_index = self.position // self.BLOCK_SIZE
+            block = self._get_block(block_index)
+            start_in_block = self.position - block_index * self.BLOCK_SIZE
+            chunk = block[start_in_block:start_in_block + end - self.position]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self.position += len(chunk)
+        return b"".join(chunks)
+
+    def _get_block(self, index: int) -> bytes:
+        if index not in self._blocks:
+            start = index * self.BLOCK_SIZE
+            end = min(start + self.BLOCK_SIZE, self.size) - 1
+            self._blocks[index] = self._read_range(start, end)
+        return self._blocks[index]
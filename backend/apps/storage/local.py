@@ -0,0 +1,206 @@
+"""Local filesystem storage backend, for single-box runs and benchmarks."""
+
+import json
+import os
+import shutil
+import uuid
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+
+from apps.core.exceptions import DownloadError, UploadError
+from .base import MultipartUpload, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping directories under the storage root, hidden from listings
+META_DIR = ".meta"
+MULTIPART_DIR = ".multipart"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class LocalMultipartUpload(MultipartUpload):
+    """Parts are appended to a staging file that is moved into place on complete."""
+
+    def __init__(self, storage: "LocalStorage", key: str, content_type: Optional[str] = None):
+        super().__init__(key, content_type)
+        self._storage = storage
+        self._file = None
+
+    def _start(self):
+        self.upload_id = uuid.uuid4().hex
+        staging = self._storage.multipart_path(self.upload_id)
+        staging.parent.mkdir(parents=True, exist_ok=True)
+        # Remember the target key so stale uploads can be listed and aborted
+        staging.with_suffix(".json").write_text(json.dumps({"key": self.key}))
+        self._file = open(staging, "wb")
+
+    def _add_part(self, part_number: int, data: bytes):
+        self._file.write(data)
+
+    def _complete(self):
+        self._file.close()
+        staging = self._storage.multipart_path(self.upload_id)
+        self._storage.commit(staging, self.key, self.content_type)
+        staging.with_suffix(".json").unlink(missing_ok=True)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+        self._storage.abort_multipart(self.key, self.upload_id)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects as files under STORAGE_LOCAL_ROOT.
+
+    Content types are kept in JSON sidecars under .meta/, and URLs are
+    file:// URIs of the stored files.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.STORAGE_LOCAL_ROOT).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise UploadError(f"Invalid storage key: {key}")
+        return path
+
+    def multipart_path(self, upload_id: str) -> Path:
+        return self.root / MULTIPART_DIR / upload_id
+
+    def commit(self, source: Path, key: str, content_type: Optional[str]):
+        """Atomically move a finished file into place as key."""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+        meta = self._meta_path(key)
+        meta.parent.mkdir(parents=True, exist_ok=True)
+        meta.write_text(
+            json.dumps({"content_type": content_type or "application/octet-stream"})
+        )
+
+    def put(self, fileobj, key: str, content_type: Optional[str] = None):
+        fileobj.seek(0)
+        staging = self.multipart_path(uuid.uuid4().hex)
+        staging.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(staging, "wb") as out:
+                shutil.copyfileobj(fileobj, out, COPY_CHUNK_SIZE)
+            self.commit(staging, key, content_type)
+        except OSError as e:
+            staging.unlink(missing_ok=True)
+            raise UploadError(f"Failed to store {key}: {e}")
+
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> LocalMultipartUpload:
+        return LocalMultipartUpload(self, key, content_type)
+
+    def head(self, key: str) -> Optional[dict]:
+        path = self.path(key)
+        if not path.is_file():
+            return None
+        try:
+            meta = json.loads(self._meta_path(key).read_text())
+        except (OSError, ValueError):
+            meta = {}
+        return {
+            "size": path.stat().st_size,
+            "content_type": meta.get("content_type", ""),
+        }
+
+    def open(self, key: str, size: int, prefix: bytes = b""):
+        try:
+            return open(self.path(key), "rb")
+        except OSError as e:
+            raise DownloadError(f"Failed to read {key}: {e}")
+
+    def copy(self, source_key: str, dest_key: str):
+        head = self.head(source_key)
+        if head is None:
+            raise UploadError(f"Failed to copy {source_key}: not found")
+        staging = self.multipart_path(uuid.uuid4().hex)
+        staging.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.path(source_key), staging)
+        self.commit(staging, dest_key, head["content_type"])
+
+    def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
+        self._meta_path(key).unlink(missing_ok=True)
+
+    def delete_many(self, keys: List[str]) -> List[str]:
+        failed = []
+        for key in keys:
+            try:
+                self.delete(key)
+            except OSError as e:
+                logger.warning(f"Failed to delete {key}: {e}")
+                failed.append(key)
+        return failed
+
+    def iter_object_pages(self, prefix: str = "", page_size: int = 1000):
+        page = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if Path(dirpath) == self.root:
+                dirnames[:] = [d for d in dirnames if d not in (META_DIR, MULTIPART_DIR)]
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                key = path.relative_to(self.root).as_posix()
+                if not key.startswith(prefix):
+                    continue
+                stat = path.stat()
+                page.append(
+                    {
+                        "Key": key,
+                        "Size": stat.st_size,
+                        "LastModified": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                    }
+                )
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+    def iter_multipart_uploads(self, prefix: str = ""):
+        staging_dir = self.root / MULTIPART_DIR
+        if not staging_dir.is_dir():
+            return
+        for manifest in staging_dir.glob("*.json"):
+            try:
+                key = json.loads(manifest.read_text())["key"]
+            except (OSError, ValueError, KeyError):
+                continue
+            if key.startswith(prefix):
+                yield {
+                    "Key": key,
+                    "UploadId": manifest.stem,
+                    "Initiated": datetime.fromtimestamp(
+                        manifest.stat().st_mtime, timezone.utc
+                    ),
+                }
+
+    def abort_multipart(self, key: str, upload_id: str):
+        staging = self.multipart_path(upload_id)
+        staging.unlink(missing_ok=True)
+        staging.with_suffix(".json").unlink(missing_ok=True)
+
+    def url(self, key: str) -> str:
+        return (self.root / key).as_uri()
+
+    def key_from_url(self, url: str) -> str:
+        path = Path(unquote(urlparse(url).path))
+        return path.relative_to(self.root).as_posix()
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / META_DIR / f"{key}.json"
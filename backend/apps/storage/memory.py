@@ -0,0 +1,128 @@
+"""In-memory storage backend for tests and benchmarks."""
+
+import io
+import uuid
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from apps.core.exceptions import UploadError
+from .base import MultipartUpload, StorageBackend
+
+URL_SCHEME = "memory://"
+
+
+class InMemoryMultipartUpload(MultipartUpload):
+    def __init__(self, storage: "InMemoryStorage", key: str, content_type: Optional[str] = None):
+        super().__init__(key, content_type)
+        self._storage = storage
+
+    def _start(self):
+        self.upload_id = uuid.uuid4().hex
+        with self._storage.lock:
+            self._storage.uploads[self.upload_id] = {
+                "Key": self.key,
+                "Initiated": datetime.now(timezone.utc),
+                "parts": [],
+            }
+
+    def _add_part(self, part_number: int, data: bytes):
+        self._storage.uploads[self.upload_id]["parts"].append(bytes(data))
+
+    def _complete(self):
+        with self._storage.lock:
+            upload = self._storage.uploads.pop(self.upload_id)
+        self._storage.store(self.key, b"".join(upload["parts"]), self.content_type)
+
+    def abort(self):
+        self._storage.abort_multipart(self.key, self.upload_id)
+
+
+class InMemoryStorage(StorageBackend):
+    """
+    Objects in a dict, private to one process.
+
+    Everything is lost on restart; use LocalStorage to keep files around.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    def store(self, key: str, data: bytes, content_type: Optional[str] = None):
+        with self.lock:
+            self.objects[key] = {
+                "data": data,
+                "content_type": content_type or "application/octet-stream",
+                "last_modified": datetime.now(timezone.utc),
+            }
+
+    def put(self, fileobj, key: str, content_type: Optional[str] = None):
+        fileobj.seek(0)
+        self.store(key, fileobj.read(), content_type)
+
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> InMemoryMultipartUpload:
+        return InMemoryMultipartUpload(self, key, content_type)
+
+    def head(self, key: str) -> Optional[dict]:
+        obj = self.objects.get(key)
+        if obj is None:
+            return None
+        return {"size": len(obj["data"]), "content_type": obj["content_type"]}
+
+    def open(self, key: str, size: int, prefix: bytes = b""):
+        return io.BytesIO(self.objects[key]["data"])
+
+    def copy(self, source_key: str, dest_key: str):
+        obj = self.objects.get(source_key)
+        if obj is None:
+            raise UploadError(f"Failed to copy {source_key}: not found")
+        self.store(dest_key, obj["data"], obj["content_type"])
+
+    def delete(self, key: str):
+        with self.lock:
+            self.objects.pop(key, None)
+
+    def delete_many(self, keys: List[str]) -> List[str]:
+        for key in keys:
+            self.delete(key)
+        return []
+
+    def iter_object_pages(self, prefix: str = "", page_size: int = 1000):
+        with self.lock:
+            listing = [
+                {
+                    "Key": key,
+                    "Size": len(obj["data"]),
+                    "LastModified": obj["last_modified"],
+                }
+                for key, obj in sorted(self.objects.items())
+                if key.startswith(prefix)
+            ]
+        for start in range(0, len(listing), page_size):
+            yield listing[start:start + page_size]
+
+    def iter_multipart_uploads(self, prefix: str = ""):
+        with self.lock:
+            uploads = [
+                {"Key": upload["Key"], "UploadId": upload_id, "Initiated": upload["Initiated"]}
+                for upload_id, upload in self.uploads.items()
+                if upload["Key"].startswith(prefix)
+            ]
+        yield from uploads
+
+    def abort_multipart(self, key: str, upload_id: str):
+        with self.lock:
+            self.uploads.pop(upload_id, None)
+
+    def url(self, key: str) -> str:
+        return f"{URL_SCHEME}{key}"
+
+    def key_from_url(self, url: str) -> str:
+        return url[len(URL_SCHEME):] if url.startswith(URL_SCHEME) else url
@@ -0,0 +1,415 @@
+"""Cloudflare R2 storage backend (S3 API via boto3)."""
+
+import math
+import os
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional
+from urllib.parse import urlparse
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+
+from apps.core.error_handler import retry_with_backoff
+from apps.core.exceptions import DownloadError, UploadError
+from .base import (
+    DELETE_BATCH_SIZE,
+    MB,
+    MIN_PART_SIZE,
+    BlockReader,
+    MultipartUpload,
+    StorageBackend,
+)
+
+logger = logging.getLogger(__name__)
+
+PART_MAX_ATTEMPTS = 4
+
+# Process-wide client: boto3 clients are thread-safe, and reusing one keeps
+# credentials, endpoint resolution and pooled TLS connections warm.
+_client = None
+_client_pid = None
+_transfer_config = None
+_client_lock = threading.Lock()
+
+
+def get_r2_client():
+    """
+    Get the shared R2 (S3 API) client, creating it on first use.
+
+    The client is rebuilt in forked children (e.g. Celery prefork workers)
+    so processes never share a connection pool.
+    """
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                session = boto3.session.Session()
+                _client = session.client(
+                    "s3",
+                    endpoint_url=settings.R2_ENDPOINT,
+                    aws_access_key_id=settings.R2_ACCESS_KEY,
+                    aws_secret_access_key=settings.R2_SECRET_KEY,
+                    region_name=settings.R2_REGION,
+                    config=Config(
+                        max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        connect_timeout=settings.R2_CONNECT_TIMEOUT,
+                        read_timeout=settings.R2_READ_TIMEOUT,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                    ),
+                )
+                _client_pid = os.getpid()
+                logger.info("R2 client initialized")
+
+    return _client
+
+
+def get_transfer_config() -> TransferConfig:
+    """Shared transfer settings for managed uploads."""
+    global _transfer_config
+
+    if _transfer_config is None:
+        _transfer_config = TransferConfig(
+            multipart_threshold=settings.R2_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=settings.R2_MULTIPART_CHUNKSIZE_MB * MB,
+            # Stay within the connection pool so threads never wait on a socket
+            max_concurrency=min(
+                settings.R2_TRANSFER_MAX_CONCURRENCY, settings.R2_MAX_POOL_CONNECTIONS
+            ),
+            use_threads=True,
+        )
+    return _transfer_config
+
+
+def reset_r2_client():
+    """Drop the shared client (called in forked children and by tests)."""
+    global _client, _client_pid, _transfer_config
+    _client = None
+    _client_pid = None
+    _transfer_config = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_r2_client)
+
+
+class R2MultipartUpload(MultipartUpload):
+    """
+    Multipart upload to R2 with parts sent by a bounded thread pool.
+
+    add_part() returns as soon as the part is queued and blocks once
+    ``concurrency`` parts are in flight, which caps memory use. A failed
+    part is retried on its own.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        content_type: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ):
+        super().__init__(key, content_type)
+        self.concurrency = max(
+            1,
+            min(
+                concurrency or settings.R2_TRANSFER_MAX_CONCURRENCY,
+                settings.R2_MAX_POOL_CONNECTIONS,
+            ),
+        )
+        self._s3 = get_r2_client()
+        self._pool = None
+        self._in_flight = set()
+        self._parts = []
+
+    def _start(self):
+        try:
+            self.upload_id = self._s3.create_multipart_upload(
+                Bucket=settings.R2_BUCKET, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        except Exception as e:
+            raise UploadError(f"Failed to start multipart upload for {self.key}: {e}")
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency)
+
+    def _add_part(self, part_number: int, data: bytes):
+        self._in_flight.add(self._pool.submit(self._upload_part, part_number, data))
+
+        if len(self._in_flight) >= self.concurrency:
+            done, self._in_flight = wait(self._in_flight, return_when=FIRST_COMPLETED)
+            self._parts.extend(future.result() for future in done)
+
+    def _complete(self):
+        try:
+            if not self.stats.parts:
+                self.add_part(b"")  # Empty object: S3 still needs one part
+            self._parts.extend(future.result() for future in self._in_flight)
+            self._in_flight = set()
+
+            self._parts.sort(key=lambda part: part["PartNumber"])
+            self._s3.complete_multipart_upload(
+                Bucket=settings.R2_BUCKET,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def abort(self):
+        logger.error(f"Aborting multipart upload of {self.key}")
+        for future in self._in_flight:
+            future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        R2Storage().abort_multipart(self.key, self.upload_id)
+
+    def _count_retry(self, attempt, delay, error):
+        self.stats.part_retries += 1
+
+    def _upload_part(self, part_number: int, data: bytes) -> dict:
+        @retry_with_backoff(
+            max_attempts=PART_MAX_ATTEMPTS, base_delay=0.5, on_retry=self._count_retry
+        )
+        def upload():
+            try:
+                response = self._s3.upload_part(
+                    Bucket=settings.R2_BUCKET,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    PartNumber=part_number,
+                    Body=data,
+                )
+            except Exception as e:
+                raise UploadError(f"Failed to upload part {part_number} of {self.key}: {e}")
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+        return upload()
+
+
+class R2Storage(StorageBackend):
+    """Objects in the R2_BUCKET bucket, served from R2_PUBLIC_URL."""
+
+    @property
+    def multipart_threshold(self) -> int:
+        return settings.R2_MULTIPART_THRESHOLD_MB * MB
+
+    @property
+    def part_size(self) -> int:
+        return max(settings.R2_MULTIPART_CHUNKSIZE_MB * MB, MIN_PART_SIZE)
+
+    @property
+    def addressable(self) -> bool:
+        return bool(settings.R2_PUBLIC_URL)
+
+    @retry_with_backoff(max_attempts=3)
+    def put(self, fileobj, key: str, content_type: Optional[str] = None):
+        # Small files are cheap to resend, so retry the whole object
+        fileobj.seek(0)
+        try:
+            get_r2_client().upload_fileobj(
+                fileobj,
+                settings.R2_BUCKET,
+                key,
+                ExtraArgs={"ContentType": content_type or "application/octet-stream"},
+                Config=get_transfer_config(),
+            )
+        except Exception as e:
+            raise UploadError(f"Failed to upload {key}: {e}")
+
+    def create_multipart_upload(
+        self,
+        key: str,
+        content_type: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> R2MultipartUpload:
+        return R2MultipartUpload(key, content_type, concurrency)
+
+    def head(self, key: str) -> Optional[dict]:
+        try:
+            response = get_r2_client().head_object(Bucket=settings.R2_BUCKET, Key=key)
+        except Exception as e:
+            error_code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if error_code in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise DownloadError(f"Failed to inspect {key}: {e}")
+
+        return {
+            "size": response["ContentLength"],
+            "content_type": response.get("ContentType", ""),
+        }
+
+    def open(self, key: str, size: int, prefix: bytes = b"") -> BlockReader:
+        def read_range(start: int, end: int) -> bytes:
+            try:
+                response = get_r2_client().get_object(
+                    Bucket=settings.R2_BUCKET, Key=key, Range=f"bytes={start}-{end}"
+                )
+                return response["Body"].read()
+            except Exception as e:
+                raise DownloadError(f"Failed to read {key}: {e}")
+
+        return BlockReader(key, size, read_range, prefix=prefix)
+
+    def iter_chunks(self, key: str, size: int, chunk_size: int = MB) -> Iterator[bytes]:
+        # One streamed GET instead of a ranged read per block
+        try:
+            body = get_r2_client().get_object(Bucket=settings.R2_BUCKET, Key=key)["Body"]
+            yield from body.iter_chunks(chunk_size)
+        except Exception as e:
+            raise DownloadError(f"Failed to read {key}: {e}")
+
+    def copy(self, source_key: str, dest_key: str):
+        try:
+            get_r2_client().copy_object(
+                Bucket=settings.R2_BUCKET,
+                Key=dest_key,
+                CopySource={"Bucket": settings.R2_BUCKET, "Key": source_key},
+            )
+        except Exception as e:
+            raise UploadError(f"Failed to copy {source_key} to {dest_key}: {e}")
+
+    def delete(self, key: str):
+        get_r2_client().delete_object(Bucket=settings.R2_BUCKET, Key=key)
+
+    def delete_many(self, keys: List[str]) -> List[str]:
+        failed = []
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = get_r2_client().delete_objects(
+                    Bucket=settings.R2_BUCKET,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except Exception as e:
+                logger.error(f"Failed to delete batch of {len(batch)} objects: {e}")
+                failed.extend(batch)
+                continue
+
+            # Quiet mode only reports failures
+            for error in response.get("Errors", []):
+                logger.warning(f"Failed to delete {error['Key']}: {error.get('Message')}")
+                failed.append(error["Key"])
+        return failed
+
+    def iter_object_pages(self, prefix: str = ""):
+        paginator = get_r2_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.R2_BUCKET, Prefix=prefix):
+            yield page.get("Contents", [])
+
+    def iter_multipart_uploads(self, prefix: str = ""):
+        paginator = get_r2_client().get_paginator("list_multipart_uploads")
+        for page in paginator.paginate(Bucket=settings.R2_BUCKET, Prefix=prefix):
+            yield from page.get("Uploads", [])
+
+    def abort_multipart(self, key: str, upload_id: str):
+        try:
+            get_r2_client().abort_multipart_upload(
+                Bucket=settings.R2_BUCKET, Key=key, UploadId=upload_id
+            )
+        except Exception as e:
+            logger.warning(f"Failed to abort multipart upload {upload_id}: {e}")
+
+    def url(self, key: str) -> str:
+        return f"{settings.R2_PUBLIC_URL}/{key}"
+
+    def key_from_url(self, url: str) -> str:
+        prefix = f"{settings.R2_PUBLIC_URL}/"
+        if settings.R2_PUBLIC_URL and url.startswith(prefix):
+            return url[len(prefix):]
+        # Not under R2_PUBLIC_URL (e.g. a bucket-path URL): the key is the whole path
+        return urlparse(url).path.lstrip("/")
+
+    def presign_upload(self, key: str, content_type: str, size: int) -> dict:
+        """
+        Prepare a direct client-to-R2 upload.
+
+        Small files get a single presigned PUT. Files at or above the multipart
+        threshold get a multipart upload with one presigned URL per part, which
+        the client uploads in parallel and then hands back (part numbers and
+        ETags) to complete_presigned_upload.
+
+        Args:
+            key: Object key
+            content_type: MIME type the client must send
+            size: Declared file size in bytes
+
+        Returns:
+            Upload instructions for the client
+        """
+        s3 = get_r2_client()
+        expires_in = settings.R2_PRESIGN_EXPIRY
+
+        try:
+            if size < self.multipart_threshold:
+                url = s3.generate_presigned_url(
+                    "put_object",
+                    Params={"Bucket": settings.R2_BUCKET, "Key": key, "ContentType": content_type},
+                    ExpiresIn=expires_in,
+                )
+                return {
+                    "method": "put",
+                    "url": url,
+                    "headers": {"Content-Type": content_type},
+                    "upload_id": None,
+                }
+
+            part_size = self.part_size
+            upload_id = s3.create_multipart_upload(
+                Bucket=settings.R2_BUCKET, Key=key, ContentType=content_type
+            )["UploadId"]
+            parts = [
+                {
+                    "part_number": part_number,
+                    "url": s3.generate_presigned_url(
+                        "upload_part",
+                        Params={
+                            "Bucket": settings.R2_BUCKET,
+                            "Key": key,
+                            "UploadId": upload_id,
+                            "PartNumber": part_number,
+                        },
+                        ExpiresIn=expires_in,
+                    ),
+                }
+                for part_number in range(1, math.ceil(size / part_size) + 1)
+            ]
+        except Exception as e:
+            raise UploadError(f"Failed to prepare upload for {key}: {e}")
+
+        return {
+            "method": "multipart",
+            "upload_id": upload_id,
+            "part_size": part_size,
+            "parts": parts,
+        }
+
+    def complete_presigned_upload(self, key: str, upload_id: str, parts: list):
+        """
+        Complete a client-side multipart upload.
+
+        Args:
+            key: Object key
+            upload_id: Multipart upload ID from presign_upload
+            parts: [{"part_number": int, "etag": str}, ...]
+
+        Raises:
+            UploadError: If R2 rejects the part list
+        """
+        try:
+            get_r2_client().complete_multipart_upload(
+                Bucket=settings.R2_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": sorted(
+                        ({"PartNumber": p["part_number"], "ETag": p["etag"]} for p in parts),
+                        key=lambda part: part["PartNumber"],
+                    )
+                },
+            )
+        except Exception as e:
+            raise UploadError(f"Failed to complete upload for {key}: {e}")
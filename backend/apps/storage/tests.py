@@ -0,0 +1,195 @@
+from django.test import TestCase, override_settings
+from unittest.mock import MagicMock, patch
+
+from apps.core.exceptions import StorageError, UploadError
+from apps.storage import get_storage
+from apps.storage.local import LocalStorage
+from apps.storage.memory import InMemoryStorage
+from apps.storage.r2 import R2Storage, get_r2_client, reset_r2_client
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import tempfile
+import uuid
+
+
+@override_settings(
+    R2_ENDPOINT="https://account.r2.cloudflarestorage.com",
+    R2_ACCESS_KEY="key",
+    R2_SECRET_KEY="secret",
+)
+class R2ClientTest(TestCase):
+    def setUp(self):
+        reset_r2_client()
+        self.addCleanup(reset_r2_client)
+
+    def test_client_is_reused(self):
+        client = get_r2_client()
+
+        self.assertIs(get_r2_client(), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 32)
+
+    def test_client_is_rebuilt_in_forked_process(self):
+        client = get_r2_client()
+
+        with patch("apps.storage.r2.os.getpid", return_value=-1):
+            self.assertIsNot(get_r2_client(), client)
+
+
+@patch("apps.core.error_handler.time.sleep")
+class MultipartUploadTest(TestCase):
+    def setUp(self):
+        self.s3 = MagicMock()
+        self.s3.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+        self.s3.upload_part.side_effect = lambda **kwargs: {
+            "ETag": f"etag-{kwargs['PartNumber']}"
+        }
+        patcher = patch("apps.storage.r2.get_r2_client", return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_uploads_parts_and_retries_failed_part_alone(self, _mock_sleep):
+        calls = []
+
+        def flaky_upload_part(**kwargs):
+            calls.append(kwargs["PartNumber"])
+            if kwargs["PartNumber"] == 2 and calls.count(2) == 1:
+                raise ConnectionError("reset by peer")
+            return {"ETag": f"etag-{kwargs['PartNumber']}"}
+
+        self.s3.upload_part.side_effect = flaky_upload_part
+        data = io.BytesIO(b"x" * (12 * 1024 * 1024))
+
+        stats = R2Storage().multipart_upload(data, "key", part_size=5 * 1024 * 1024, concurrency=2)
+
+        self.assertEqual(stats.parts, 3)
+        self.assertEqual(stats.part_retries, 1)
+        self.assertEqual(stats.bytes, 12 * 1024 * 1024)
+        self.assertEqual(sorted(calls), [1, 2, 2, 3])
+        parts = self.s3.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+        self.assertEqual([part["PartNumber"] for part in parts], [1, 2, 3])
+
+    def test_aborts_when_part_keeps_failing(self, _mock_sleep):
+        self.s3.upload_part.side_effect = ConnectionError("down")
+
+        with self.assertRaises(UploadError):
+            R2Storage().multipart_upload(io.BytesIO(b"x" * 100), "key")
+
+        self.s3.abort_multipart_upload.assert_called_once_with(
+            Bucket="noteably-files", Key="key", UploadId="upload-1"
+        )
+        self.s3.complete_multipart_upload.assert_not_called()
+
+
+class BackendContractMixin:
+    """Behaviour every StorageBackend must share."""
+
+    def make_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = self.make_storage()
+
+    def test_put_head_open(self):
+        self.storage.put(io.BytesIO(b"hello world"), "a/b.mp3", "audio/mpeg")
+
+        self.assertEqual(
+            self.storage.head("a/b.mp3"), {"size": 11, "content_type": "audio/mpeg"}
+        )
+        reader = self.storage.open("a/b.mp3", 11)
+        reader.seek(6)
+        self.assertEqual(reader.read(), b"world")
+        self.assertIsNone(self.storage.head("missing.mp3"))
+
+    def test_multipart_upload_round_trips(self):
+        data = bytes(range(256)) * (24 * 1024)  # 6 MB: two parts
+
+        stats = self.storage.multipart_upload(io.BytesIO(data), "big.bin", part_size=5 * 1024 * 1024)
+
+        self.assertEqual(stats.parts, 2)
+        self.assertEqual(self.storage.open("big.bin", len(data)).read(), data)
+        self.assertEqual(list(self.storage.iter_multipart_uploads()), [])
+
+    def test_aborted_upload_leaves_nothing_behind(self):
+        upload = self.storage.create_multipart_upload("gone.bin")
+        upload.start()
+        upload.add_part(b"x" * 10)
+        self.assertEqual(len(list(self.storage.iter_multipart_uploads())), 1)
+
+        upload.abort()
+
+        self.assertEqual(list(self.storage.iter_multipart_uploads()), [])
+        self.assertIsNone(self.storage.head("gone.bin"))
+
+    def test_copy_delete_and_list(self):
+        self.storage.put(io.BytesIO(b"data"), "one.mp3", "audio/mpeg")
+        self.storage.copy("one.mp3", "media/two.mp3")
+        self.storage.put(io.BytesIO(b"data"), "three.mp3")
+
+        self.assertEqual(self.storage.head("media/two.mp3")["content_type"], "audio/mpeg")
+        self.assertEqual(self.storage.delete_many(["one.mp3", "three.mp3"]), [])
+        keys = [obj["Key"] for page in self.storage.iter_object_pages() for obj in page]
+        self.assertEqual(keys, ["media/two.mp3"])
+
+    def test_url_round_trips(self):
+        url = self.storage.url("media/ab/file.mp3")
+
+        self.assertEqual(self.storage.key_from_url(url), "media/ab/file.mp3")
+
+    def test_direct_uploads_are_not_supported(self):
+        with self.assertRaises(StorageError):
+            self.storage.presign_upload("key", "audio/mpeg", 10)
+
+
+class InMemoryStorageTest(BackendContractMixin, TestCase):
+    def make_storage(self):
+        return InMemoryStorage()
+
+
+class LocalStorageTest(BackendContractMixin, TestCase):
+    def make_storage(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        return LocalStorage(root.name)
+
+    def test_rejects_keys_outside_root(self):
+        with self.assertRaises(UploadError):
+            self.storage.put(io.BytesIO(b"x"), "../escape.mp3")
+
+
+class GetStorageTest(TestCase):
+    def test_backend_follows_setting(self):
+        with override_settings(STORAGE_BACKEND="memory"):
+            storage = get_storage()
+            self.assertIsInstance(storage, InMemoryStorage)
+            self.assertIs(get_storage(), storage)
+
+        self.assertIsInstance(get_storage(), R2Storage)
+
+    @override_settings(STORAGE_BACKEND="memory", R2_STREAMING_UPLOADS=True)
+    @patch("apps.ingestion.views.process_upload_task.delay")
+    @patch("apps.ingestion.views.reserve_quota")
+    def test_upload_pipeline_runs_without_cloud(self, _mock_reserve, mock_task):
+        from rest_framework.test import APIRequestFactory
+        from apps.ingestion.models import Job
+        from apps.ingestion.views import process_upload
+
+        content = b"ID3" + b"\x00" * 4096
+        request = APIRequestFactory().post(
+            "/api/process",
+            {
+                "file": SimpleUploadedFile("talk.mp3", content, content_type="audio/mpeg"),
+                "material_types": '["summary"]',
+            },
+            format="multipart",
+        )
+        request.user_id = uuid.uuid4()
+
+        response = process_upload(request)
+
+        self.assertEqual(response.status_code, 201)
+        job = Job.objects.get()
+        storage = get_storage()
+        key = storage.key_from_url(job.storage_url)
+        self.assertTrue(key.startswith("media/"))
+        self.assertEqual(storage.open(key, len(content)).read(), content)
+        mock_task.assert_called_once_with(str(job.id))
@@ -0,0 +1,340 @@
+"""
+Chunked parallel transcription of long recordings.
+
+AssemblyAI's turnaround grows with the length of the audio, so with
+TRANSCRIPTION_CHUNKING_ENABLED recordings longer than
+TRANSCRIPTION_CHUNK_THRESHOLD are cut into pieces of about
+TRANSCRIPTION_CHUNK_SECONDS, each boundary moved to the quietest moment
+nearby, and the pieces are transcribed concurrently. Neighbouring chunks
+overlap by TRANSCRIPTION_CHUNK_OVERLAP seconds so no word is lost at a cut.
+
+The job's transcription_id becomes "chunked:<job id>". get_result()
+resolves such IDs to the combined state of the chunks, and once all are
+done it stitches them into one AssemblyAI-shaped result. Each chunk is
+shifted to its offset, and words in the overlaps are kept from one side
+only. The poller, webhook and completion task are otherwise unchanged.
+
+Speaker labels are assigned per chunk by AssemblyAI, so "A" in one chunk
+is not necessarily "A" in the next.
+"""
+
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from apps.ingestion.audio import AUDIO_CODECS, transcode_audio
+from apps.ingestion.media_probe import probe_duration
+from apps.ingestion.models import Job
+from apps.ingestion.silence import FRAME_MS, Span, frame_energies
+from apps.storage import get_storage
+from .models import TranscriptionChunk
+from .service import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+CHUNKED_PREFIX = "chunked:"
+# Results with timestamps of their own, besides words
+TIMED_SECTIONS = ("utterances", "chapters", "entities")
+# A word repeated this close to the seam is the same word seen by both chunks
+SEAM_DUPLICATE_MS = 500
+
+
+def is_chunked(transcript_id: Optional[str]) -> bool:
+    return bool(transcript_id) and transcript_id.startswith(CHUNKED_PREFIX)
+
+
+def should_chunk(job: Job) -> bool:
+    """Whether a job's recording is long enough to be transcribed in chunks."""
+    return (
+        settings.TRANSCRIPTION_CHUNKING_ENABLED
+        and (job.duration_seconds or 0) >= settings.TRANSCRIPTION_CHUNK_THRESHOLD
+    )
+
+
+def plan_chunks(duration: float, levels=None) -> List[Span]:
+    """
+    Split a recording into overlapping chunks.
+
+    Args:
+        duration: Length in seconds
+        levels: Per-frame levels (see silence.frame_energies) used to cut in
+            the quietest moment within TRANSCRIPTION_CHUNK_SEARCH seconds of
+            each evenly spaced boundary; evenly spaced cuts without them
+
+    Returns:
+        (start, end) seconds of every chunk, overlap included
+    """
+    count = max(1, math.ceil(duration / settings.TRANSCRIPTION_CHUNK_SECONDS))
+    boundaries = [duration * i / count for i in range(count + 1)]
+
+    if levels is not None and len(levels):
+        frame_seconds = FRAME_MS / 1000
+        search = int(settings.TRANSCRIPTION_CHUNK_SEARCH / frame_seconds)
+        for i in range(1, count):
+            center = int(boundaries[i] / frame_seconds)
+            lo, hi = max(center - search, 0), min(center + search, len(levels))
+            if lo < hi:
+                boundaries[i] = (lo + int(levels[lo:hi].argmin())) * frame_seconds
+
+    overlap = settings.TRANSCRIPTION_CHUNK_OVERLAP
+    return [
+        (boundaries[i], min(boundaries[i + 1] + overlap, duration)) for i in range(count)
+    ]
+
+
+def submit_chunked(job: Job) -> Optional[str]:
+    """
+    Cut a job's audio into chunks and submit them all to AssemblyAI.
+
+    Chunks are cut from the prepared audio (job.audio_url) when there is one,
+    so timestamps follow the same timeline as an unchunked transcript.
+
+    Returns:
+        The job's chunked transcript ID, or None if the audio couldn't be
+        chunked (submit it whole instead)
+    """
+    storage = get_storage()
+    source_url = job.audio_url or job.storage_url
+    codec = settings.AUDIO_EXTRACTION_CODEC
+    _, ext, content_type = AUDIO_CODECS[codec]
+    webhook_url = (
+        settings.ASSEMBLYAI_WEBHOOK_URL if TranscriptionService.webhooks_enabled() else ""
+    )
+
+    # What has been sent so far, undone if a later chunk fails
+    uploaded_keys: List[str] = []
+    submitted: List[TranscriptionChunk] = []
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="noteably-chunks-") as workdir:
+            key = storage.key_from_url(source_url)
+            head = storage.head(key) or {"size": job.file_size_bytes}
+            source_path = os.path.join(workdir, "source" + os.path.splitext(key)[1])
+            with open(source_path, "wb") as out:
+                shutil.copyfileobj(storage.open(key, head["size"]), out, length=1024 * 1024)
+
+            levels, duration = None, None
+            try:
+                levels = frame_energies(source_path)
+                duration = len(levels) * FRAME_MS / 1000
+            except ImportError:
+                with open(source_path, "rb") as source:
+                    duration = probe_duration(source)
+            if not duration and not job.time_offsets:
+                duration = job.duration_seconds
+            if not duration:
+                logger.warning(f"Unknown duration for job {job.id}, not chunking")
+                return None
+
+            spans = plan_chunks(duration, levels)
+
+            failed = threading.Event()
+
+            def submit(index: int, span: Span) -> Optional[TranscriptionChunk]:
+                # Chunks not started when another fails are never sent
+                if failed.is_set():
+                    return None
+                try:
+                    return send(index, span)
+                except Exception:
+                    failed.set()
+                    raise
+
+            def send(index: int, span: Span) -> TranscriptionChunk:
+                chunk_path = os.path.join(workdir, f"chunk-{index}{ext}")
+                transcode_audio(source_path, chunk_path, codec, clip=span)
+                chunk_key = f"chunks/{job.id}/{index}{ext}"
+                with open(chunk_path, "rb") as audio:
+                    url = storage.save(
+                        audio, chunk_key, content_type, os.path.getsize(chunk_path)
+                    )
+                uploaded_keys.append(chunk_key)
+                chunk = TranscriptionChunk(
+                    job=job,
+                    index=index,
+                    start_ms=round(span[0] * 1000),
+                    end_ms=round(span[1] * 1000),
+                    audio_url=url,
+                    transcript_id=TranscriptionService.submit_transcription(
+                        url, webhook_url=webhook_url
+                    ),
+                )
+                submitted.append(chunk)
+                return chunk
+
+            with ThreadPoolExecutor(max_workers=settings.AUDIO_EXTRACTION_WORKERS) as pool:
+                chunks = list(pool.map(submit, range(len(spans)), spans))
+    except Exception as e:
+        logger.warning(f"Chunked submission failed for job {job.id}, submitting whole: {e}")
+        _discard_submitted(job, submitted, uploaded_keys)
+        return None
+
+    TranscriptionChunk.objects.filter(job=job).delete()  # From an earlier attempt
+    TranscriptionChunk.objects.bulk_create(chunks)
+    logger.info(
+        f"Submitted job {job.id} as {len(chunks)} chunk(s) of ~{duration / len(chunks) / 60:.0f} min"
+    )
+    return f"{CHUNKED_PREFIX}{job.id}"
+
+
+def get_result(transcript_id: str, stitch: bool = True) -> Dict:
+    """
+    Get a transcript result, whole or chunked.
+
+    Args:
+        transcript_id: AssemblyAI transcript ID or a chunked transcript ID
+        stitch: For chunked transcripts, build the combined result once all
+            chunks are done (otherwise only the status is returned)
+
+    Returns:
+        AssemblyAI-shaped result ({"status": ..., ...})
+
+    Raises:
+        ThirdPartyServiceError: If AssemblyAI can't be reached
+    """
+    if not is_chunked(transcript_id):
+        return TranscriptionService.get_transcription_result(transcript_id)
+
+    chunks = list(
+        TranscriptionChunk.objects.filter(job_id=transcript_id[len(CHUNKED_PREFIX):])
+    )
+    if not chunks:
+        return {"id": transcript_id, "status": "error", "error": "Transcript chunks are missing"}
+
+    # Only chunks still running need checking until the whole set is done
+    pending = [chunk for chunk in chunks if chunk.status == "processing"]
+    results = _fetch([chunk.transcript_id for chunk in pending])
+    for chunk in pending:
+        status = results[chunk.transcript_id].get("status")
+        if status in ("completed", "error"):
+            chunk.status = status
+            chunk.error_message = str(results[chunk.transcript_id].get("error") or "")
+            chunk.save(update_fields=["status", "error_message"])
+
+    failed = next((chunk for chunk in chunks if chunk.status == "error"), None)
+    if failed is not None:
+        return {
+            "id": transcript_id,
+            "status": "error",
+            "error": f"Chunk {failed.index + 1} of {len(chunks)}: {failed.error_message}",
+        }
+    if any(chunk.status != "completed" for chunk in chunks):
+        return {"id": transcript_id, "status": "processing"}
+    if not stitch:
+        return {"id": transcript_id, "status": "completed"}
+
+    missing = [c.transcript_id for c in chunks if c.transcript_id not in results]
+    results.update(_fetch(missing))
+    stitched = stitch_chunks(chunks, [results[chunk.transcript_id] for chunk in chunks])
+    stitched["id"] = transcript_id
+    return stitched
+
+
+def _fetch(transcript_ids: List[str]) -> Dict[str, Dict]:
+    if not transcript_ids:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=min(settings.TRANSCRIPTION_POLL_CONCURRENCY, len(transcript_ids))
+    ) as pool:
+        return dict(
+            zip(transcript_ids, pool.map(TranscriptionService.get_transcription_result, transcript_ids))
+        )
+
+
+def stitch_chunks(chunks: List[TranscriptionChunk], results: List[Dict]) -> Dict:
+    """
+    Combine chunk transcripts into one result on the submitted audio's timeline.
+
+    Each overlap is split at its middle: the earlier chunk supplies what
+    starts before that point and the later chunk the rest. A word both
+    chunks placed right at the seam is kept once.
+    """
+    words, sections = [], {name: [] for name in TIMED_SECTIONS}
+    for i, (chunk, result) in enumerate(zip(chunks, results)):
+        keep_from = (chunk.start_ms + chunks[i - 1].end_ms) // 2 if i else 0
+        keep_until = (
+            (chunks[i + 1].start_ms + chunk.end_ms) // 2 if i + 1 < len(chunks) else math.inf
+        )
+
+        seam = len(words)
+        for word in result.get("words") or []:
+            word = _shift(word, chunk.start_ms)
+            if not keep_from <= word["start"] < keep_until:
+                continue
+            if i and _seen_at_seam(word, words[max(seam - 3, 0):seam]):
+                continue
+            words.append(word)
+
+        for name in TIMED_SECTIONS:
+            for item in result.get(name) or []:
+                item = _shift(item, chunk.start_ms)
+                if keep_from <= item.get("start", 0) < keep_until:
+                    sections[name].append(item)
+
+    if words:
+        text = " ".join(word["text"] for word in words)
+    else:
+        text = " ".join(filter(None, (result.get("text") for result in results)))
+
+    stitched = {
+        "status": "completed",
+        "text": text,
+        "words": words,
+        "audio_duration": sum(result.get("audio_duration") or 0 for result in results),
+        "chunks": len(chunks),
+    }
+    stitched.update({name: items for name, items in sections.items() if items})
+    return stitched
+
+
+def _shift(item: Dict, offset_ms: int) -> Dict:
+    shifted = dict(item)
+    for key in ("start", "end"):
+        if isinstance(item.get(key), int):
+            shifted[key] = item[key] + offset_ms
+    if isinstance(item.get("words"), list):
+        shifted["words"] = [_shift(word, offset_ms) for word in item["words"]]
+    return shifted
+
+
+def _seen_at_seam(word: Dict, tail: List[Dict]) -> bool:
+    return any(
+        kept["text"].lower() == word["text"].lower()
+        and abs(kept["start"] - word["start"]) <= SEAM_DUPLICATE_MS
+        for kept in tail
+    )
+
+
+def _discard_submitted(job: Job, chunks: List[TranscriptionChunk], keys: List[str]):
+    """Stop the chunks of a failed chunked submission and delete their audio."""
+    for chunk in chunks:
+        try:
+            TranscriptionService.delete_transcription(chunk.transcript_id)
+        except Exception as e:
+            logger.warning(
+                f"Could not delete transcript {chunk.transcript_id} of job {job.id}: {e}"
+            )
+    if keys:
+        try:
+            get_storage().delete_many(keys)
+        except Exception as e:
+            # The orphan sweep removes them later
+            logger.warning(f"Could not delete chunk audio of job {job.id}: {e}")
+
+
+def discard_chunk_audio(job: Job):
+    """Delete a chunked job's chunk audio once its transcript is stored."""
+    storage = get_storage()
+    keys = [
+        storage.key_from_url(url)
+        for url in TranscriptionChunk.objects.filter(job=job).values_list("audio_url", flat=True)
+    ]
+    if keys:
+        storage.delete_many(keys)
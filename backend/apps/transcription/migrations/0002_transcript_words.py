@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def pack_existing_words(apps, schema_editor):
+    from apps.transcription.word_timings import pack_words, split_response
+
+    Transcription = apps.get_model('transcription', 'Transcription')
+    TranscriptWords = apps.get_model('transcription', 'TranscriptWords')
+    for transcription in Transcription.objects.filter(raw_response__has_key='words').iterator(chunk_size=100):
+        metadata, words = split_response(transcription.raw_response)
+        if words:
+            TranscriptWords.objects.create(
+                transcription=transcription, word_count=len(words), data=pack_words(words)
+            )
+        transcription.raw_response = metadata
+        transcription.save(update_fields=['raw_response'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcription', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptWords',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('format_version', models.PositiveSmallIntegerField(default=1)),
+                ('data', models.BinaryField()),
+                ('transcription', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='packed_words', to='transcription.transcription')),
+            ],
+            options={
+                'db_table': 'transcript_words',
+            },
+        ),
+        migrations.RunPython(pack_existing_words, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0007_job_time_offsets'),
+        ('transcription', '0002_transcript_words'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start_ms', models.PositiveIntegerField()),
+                ('end_ms', models.PositiveIntegerField()),
+                ('audio_url', models.TextField()),
+                ('transcript_id', models.CharField(db_index=True, max_length=100)),
+                ('status', models.CharField(choices=[('processing', 'Processing'), ('completed', 'Completed'), ('error', 'Error')], default='processing', max_length=20)),
+                ('error_message', models.TextField(blank=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transcription_chunks', to='ingestion.job')),
+            ],
+            options={
+                'db_table': 'transcription_chunks',
+                'ordering': ['job', 'index'],
+                'unique_together': {('job', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcription', '0003_transcription_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcription',
+            name='context_cache_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transcription',
+            name='context_cache_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.functional import cached_property
 from apps.ingestion.models import Job
 
 
@@ -8,9 +9,84 @@ class Transcription(models.Model):
     )
     external_id = models.CharField(max_length=100, db_index=True)
     text = models.TextField()
+    # AssemblyAI response without word-level results (see TranscriptWords)
     raw_response = models.JSONField(default=dict)
+    # Provider-side cached copy of the text for generation (see generation.context_cache)
+    context_cache_name = models.CharField(max_length=200, blank=True, default="")
+    context_cache_expires_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "transcriptions"
+
+    @cached_property
+    def word_timings(self):
+        """
+        Decoded word-level results, loaded on first access.
+
+        Returns:
+            WordTimings, or None if the transcript has no words stored
+        """
+        from .word_timings import unpack_words
+
+        data = (
+            TranscriptWords.objects.filter(transcription=self)
+            .values_list("data", flat=True)
+            .first()
+        )
+        return unpack_words(bytes(data)) if data is not None else None
+
+    def full_response(self) -> dict:
+        """The AssemblyAI response as received, words included (expensive)."""
+        response = dict(self.raw_response)
+        timings = self.word_timings
+        if timings is None:
+            return response
+
+        response["words"] = list(timings.words())
+        if response.get("utterances"):
+            response["utterances"] = [
+                {**utterance, "words": list(timings.words(utterance["start"], utterance["end"]))}
+                for utterance in response["utterances"]
+            ]
+        return response
+
+
+class TranscriptWords(models.Model):
+    """Word-level timings of a transcript, packed by word_timings.pack_words()."""
+
+    transcription = models.OneToOneField(
+        Transcription, on_delete=models.CASCADE, related_name="packed_words"
+    )
+    word_count = models.PositiveIntegerField(default=0)
+    format_version = models.PositiveSmallIntegerField(default=1)
+    data = models.BinaryField()
+
+    class Meta:
+        db_table = "transcript_words"
+
+
+class TranscriptionChunk(models.Model):
+    """One piece of a long recording transcribed on its own (see chunking)."""
+
+    STATUS_CHOICES = [
+        ("processing", "Processing"),
+        ("completed", "Completed"),
+        ("error", "Error"),
+    ]
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="transcription_chunks")
+    index = models.PositiveIntegerField()
+    # Position within the submitted audio, overlap included
+    start_ms = models.PositiveIntegerField()
+    end_ms = models.PositiveIntegerField()
+    audio_url = models.TextField()
+    transcript_id = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="processing")
+    error_message = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "transcription_chunks"
+        ordering = ["job", "index"]
+        unique_together = [("job", "index")]
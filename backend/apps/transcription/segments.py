@@ -0,0 +1,112 @@
+"""
+Paragraph segmentation and time lookups over word timings.
+
+A transcript's words are grouped into paragraphs (a new one on a speaker
+change, a long pause, or at a sentence end once a paragraph is long
+enough). The paragraph start/end times form a sorted index, so finding
+the paragraphs covering a time range or containing an instant is a binary
+search rather than a scan over every word. Indexes are built once per
+transcript and kept in a process-wide cache.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Optional, Tuple
+
+from apps.core.cache import TTLCache
+from .word_timings import NO_SPEAKER, WordTimings
+
+PARAGRAPH_PAUSE_MS = 1500  # silence that always starts a new paragraph
+PARAGRAPH_MIN_WORDS = 60  # then break at the next sentence end
+PARAGRAPH_MAX_WORDS = 150  # hard limit when no sentence end comes
+SENTENCE_ENDINGS = (".", "?", "!")
+
+# Transcripts don't change once stored, so entries only expire to free memory
+_index_cache = TTLCache(maxsize=64, ttl=3600)
+
+
+class TranscriptIndex:
+    """Paragraph boundaries of one transcript with binary-searchable times."""
+
+    def __init__(self, timings: WordTimings):
+        self.timings = timings
+        self.word_starts = array("I")  # first word index of each paragraph
+        self.starts = array("I")  # ms, sorted
+        self.ends = array("I")  # ms, sorted (paragraphs don't overlap)
+
+        if len(timings):
+            self._split()
+
+    def _split(self):
+        timings = self.timings
+        first = 0
+        for i in range(1, len(timings)):
+            length = i - first
+            previous_text = timings.tokens[timings.token_ids[i - 1]]
+            if (
+                timings.speaker_ids[i] != timings.speaker_ids[i - 1]
+                or timings.starts[i] - timings.ends[i - 1] >= PARAGRAPH_PAUSE_MS
+                or length >= PARAGRAPH_MAX_WORDS
+                or (length >= PARAGRAPH_MIN_WORDS and previous_text.endswith(SENTENCE_ENDINGS))
+            ):
+                self._add(first, i)
+                first = i
+        self._add(first, len(timings))
+
+    def _add(self, first: int, stop: int):
+        self.word_starts.append(first)
+        self.starts.append(self.timings.starts[first])
+        self.ends.append(max(self.timings.ends[first:stop]))
+
+    def __len__(self) -> int:
+        return len(self.word_starts)
+
+    @property
+    def duration_ms(self) -> int:
+        return self.ends[-1] if len(self) else 0
+
+    def paragraphs_between(self, start_ms: int, end_ms: int) -> Tuple[int, int]:
+        """Paragraph indexes [lo, hi) overlapping [start_ms, end_ms)."""
+        return bisect_right(self.ends, start_ms), bisect_left(self.starts, end_ms)
+
+    def paragraph_at(self, ms: int) -> int:
+        """Index of the paragraph being spoken at ms (or the next one in a pause)."""
+        containing = bisect_right(self.starts, ms) - 1
+        if containing >= 0 and self.ends[containing] > ms:
+            return containing
+        return min(containing + 1, max(len(self) - 1, 0))
+
+    def segment(self, i: int, include_words: bool = False) -> Dict:
+        """Paragraph i as returned by the segments API."""
+        timings = self.timings
+        first = self.word_starts[i]
+        stop = self.word_starts[i + 1] if i + 1 < len(self) else len(timings)
+        speaker_id = timings.speaker_ids[first]
+
+        segment = {
+            "index": i,
+            "start": self.starts[i],
+            "end": self.ends[i],
+            "speaker": timings.speakers[speaker_id] if speaker_id != NO_SPEAKER else None,
+            "text": " ".join(timings.tokens[timings.token_ids[w]] for w in range(first, stop)),
+        }
+        if include_words:
+            segment["words"] = [timings.word(w) for w in range(first, stop)]
+        return segment
+
+
+def get_transcript_index(transcription) -> Optional[TranscriptIndex]:
+    """
+    Cached paragraph index of a transcript.
+
+    Returns:
+        TranscriptIndex, or None if the transcript has no word timings
+    """
+    index = _index_cache.get(transcription.pk)
+    if index is None:
+        timings = transcription.word_timings
+        if timings is None:
+            return None
+        index = TranscriptIndex(timings)
+        _index_cache.set(transcription.pk, index)
+    return index
@@ -1,10 +1,22 @@
-import requests
+import httpx
 from django.conf import settings
 from apps.core.exceptions import ThirdPartyServiceError
+from apps.core.http_client import get_http_client
 
 
 class TranscriptionService:
     BASE_URL = "https://api.assemblyai.com/v2"
+    # Header AssemblyAI echoes back on webhook calls, carrying our shared secret
+    WEBHOOK_AUTH_HEADER = "X-Noteably-Webhook-Secret"
+
+    @classmethod
+    def webhooks_enabled(cls) -> bool:
+        """Whether AssemblyAI reports completion by webhook rather than being polled."""
+        return bool(settings.ASSEMBLYAI_WEBHOOK_URL and settings.ASSEMBLYAI_WEBHOOK_SECRET)
+
+    @classmethod
+    def _client(cls):
+        return get_http_client("assemblyai", read_timeout=settings.ASSEMBLYAI_TIMEOUT)
 
     @classmethod
     def _get_headers(cls):
@@ -16,10 +28,13 @@ class TranscriptionService:
         }
 
     @classmethod
-    def submit_transcription(cls, audio_url: str) -> str:
+    def submit_transcription(cls, audio_url: str, webhook_url: str = "") -> str:
         """
         Submits audio URL to AssemblyAI for transcription.
         Returns the transcription ID.
+
+        If webhook_url is given, AssemblyAI POSTs there when the transcript
+        completes or fails, authenticated with ASSEMBLYAI_WEBHOOK_SECRET.
         """
         endpoint = f"{cls.BASE_URL}/transcript"
         json_data = {
@@ -29,15 +44,19 @@ class TranscriptionService:
             "entity_detection": True,
             "sentiment_analysis": False,
         }
+        if webhook_url:
+            json_data["webhook_url"] = webhook_url
+            json_data["webhook_auth_header_name"] = cls.WEBHOOK_AUTH_HEADER
+            json_data["webhook_auth_header_value"] = settings.ASSEMBLYAI_WEBHOOK_SECRET
 
         try:
-            response = requests.post(
+            response = cls._client().post(
                 endpoint, json=json_data, headers=cls._get_headers()
             )
             response.raise_for_status()
             data = response.json()
             return data["id"]
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise ThirdPartyServiceError(f"Failed to submit transcription: {str(e)}")
 
     @classmethod
@@ -48,10 +67,23 @@ class TranscriptionService:
         endpoint = f"{cls.BASE_URL}/transcript/{transcript_id}"
 
         try:
-            response = requests.get(endpoint, headers=cls._get_headers())
+            response = cls._client().get(endpoint, headers=cls._get_headers())
             response.raise_for_status()
             return response.json()
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise ThirdPartyServiceError(
                 f"Failed to get transcription result: {str(e)}"
             )
+
+    @classmethod
+    def delete_transcription(cls, transcript_id: str):
+        """
+        Deletes a transcription, and the audio it was made from, at AssemblyAI.
+        """
+        endpoint = f"{cls.BASE_URL}/transcript/{transcript_id}"
+
+        try:
+            response = cls._client().request("DELETE", endpoint, headers=cls._get_headers())
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise ThirdPartyServiceError(f"Failed to delete transcription: {str(e)}")
@@ -0,0 +1,698 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import MagicMock, patch
+import httpx
+from rest_framework.test import APIRequestFactory
+
+from apps.core.exceptions import ThirdPartyServiceError
+from apps.core.http_client import ProviderClient, http_metrics, reset_http_metrics
+
+from apps.ingestion import poll_schedule
+from apps.ingestion.models import Job
+from apps.ingestion.poll_schedule import first_poll_at, next_poll_at
+from apps.ingestion.tasks import (
+    complete_transcription_task,
+    poll_transcriptions_task,
+    process_upload_task,
+)
+from apps.transcription.models import Transcription
+from apps.transcription.service import TranscriptionService
+from apps.transcription.word_timings import (
+    copy_transcript,
+    pack_words,
+    store_transcript,
+    unpack_words,
+)
+from apps.transcription import segments as transcript_segments
+from apps.transcription.views import assemblyai_webhook, get_transcript_segments
+import uuid
+
+WEBHOOK_SETTINGS = {
+    "ASSEMBLYAI_WEBHOOK_URL": "https://api.example.com/api/webhooks/assemblyai",
+    "ASSEMBLYAI_WEBHOOK_SECRET": "s3cret",
+}
+
+
+def make_job(**kwargs):
+    defaults = {
+        "user_id": uuid.uuid4(),
+        "filename": "lecture.mp3",
+        "file_size_bytes": 1000,
+        "file_type": "audio/mpeg",
+        "storage_url": "https://files.example.com/lecture.mp3",
+        "material_types": ["summary"],
+    }
+    defaults.update(kwargs)
+    return Job.objects.create(**defaults)
+
+
+@override_settings(**WEBHOOK_SETTINGS)
+class AssemblyAIWebhookTest(TestCase):
+    def post(self, data, secret="s3cret"):
+        request = APIRequestFactory().post(
+            "/api/webhooks/assemblyai",
+            data,
+            format="json",
+            headers={"X-Noteably-Webhook-Secret": secret},
+        )
+        return assemblyai_webhook(request)
+
+    @patch("apps.transcription.views.complete_transcription_task.delay")
+    def test_rejects_wrong_secret(self, mock_delay):
+        response = self.post({"transcript_id": "tx_1", "status": "completed"}, secret="nope")
+
+        self.assertEqual(response.status_code, 401)
+        mock_delay.assert_not_called()
+
+    @patch("apps.transcription.views.complete_transcription_task.delay")
+    def test_queues_every_job_sharing_the_transcript(self, mock_delay):
+        first = make_job(status="transcribing", transcription_id="tx_1")
+        second = make_job(status="transcribing", transcription_id="tx_1")
+        make_job(status="completed", transcription_id="tx_1")
+
+        response = self.post({"transcript_id": "tx_1", "status": "completed"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_delay.call_args_list),
+            sorted([str(first.id), str(second.id)]),
+        )
+
+    @patch("apps.transcription.service.TranscriptionService.submit_transcription")
+    def test_submission_registers_webhook(self, mock_submit):
+        mock_submit.return_value = "tx_1"
+        job = make_job()
+
+        process_upload_task(job.id)
+
+        mock_submit.assert_called_once_with(
+            job.storage_url, webhook_url=WEBHOOK_SETTINGS["ASSEMBLYAI_WEBHOOK_URL"]
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, "transcribing")
+        self.assertIsNotNone(job.started_at)
+
+    @patch("apps.transcription.service.TranscriptionService.get_transcription_result")
+    @patch("apps.generation.service.GeminiService.generate_content")
+    def test_completion_runs_generation_once(self, mock_generate, mock_result):
+        mock_result.return_value = {"id": "tx_1", "status": "completed", "text": "Lecture."}
+        mock_generate.return_value = {"summary": "Short."}
+        job = make_job(status="transcribing", transcription_id="tx_1")
+
+        complete_transcription_task(job.id)
+        complete_transcription_task(job.id)  # Duplicate callback
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.transcription.text, "Lecture.")
+        mock_generate.assert_called_once_with("Lecture.", "summary")
+
+    @patch("apps.ingestion.tasks.release_quota")
+    def test_error_releases_quota_once(self, mock_release):
+        from apps.ingestion.tasks import _apply_transcription_result
+
+        job = make_job(status="transcribing", transcription_id="tx_1", duration_seconds=600)
+        # Webhook and poller each hold their own copy of the job
+        for copy in (Job.objects.get(id=job.id), Job.objects.get(id=job.id)):
+            _apply_transcription_result(copy, {"status": "error", "error": "bad audio"})
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_message), ("failed", "bad audio"))
+        mock_release.assert_called_once_with(str(job.user_id), 10.0)
+
+    @override_settings(TRANSCRIPTION_RECONCILE_AFTER=600)
+    @patch("apps.ingestion.poller.get_redis", return_value=None)
+    @patch("apps.transcription.service.TranscriptionService.get_transcription_result")
+    @patch("apps.ingestion.tasks.complete_transcription_task.delay")
+    def test_sweep_rechecks_only_overdue_jobs(self, mock_delay, mock_result, _mock_redis):
+        mock_result.return_value = {"status": "completed"}
+        now = timezone.now()
+        overdue = make_job(status="transcribing", transcription_id="tx_1")
+        overdue.started_at = now - timedelta(minutes=20)
+        overdue.next_poll_at = first_poll_at(overdue)
+        overdue.save()
+        recent = make_job(status="transcribing", transcription_id="tx_2", started_at=now)
+        recent.next_poll_at = first_poll_at(recent)
+        recent.save()
+
+        # The first check waits for the reconcile delay while callbacks are expected
+        self.assertGreaterEqual(recent.next_poll_at, now + timedelta(seconds=480))
+
+        poll_transcriptions_task()
+
+        mock_result.assert_called_once_with("tx_1")
+        mock_delay.assert_called_once_with(str(overdue.id))
+
+
+@patch("apps.ingestion.poller.get_redis", return_value=None)
+@patch("apps.ingestion.tasks.complete_transcription_task.delay")
+@patch("apps.transcription.service.TranscriptionService.get_transcription_result")
+class TranscriptionPollerTest(TestCase):
+    def setUp(self):
+        poll_schedule._ratio_cache.clear()
+
+    def test_dispatches_only_finished_jobs(self, mock_result, mock_delay, _mock_redis):
+        statuses = {"tx_done": "completed", "tx_err": "error", "tx_busy": "processing"}
+        mock_result.side_effect = lambda tx_id: {"id": tx_id, "status": statuses[tx_id]}
+        done = make_job(status="transcribing", transcription_id="tx_done")
+        shared = make_job(status="transcribing", transcription_id="tx_done")
+        failed = make_job(status="transcribing", transcription_id="tx_err")
+        busy = make_job(status="transcribing", transcription_id="tx_busy")
+
+        poll_transcriptions_task()
+
+        # One request per transcript, however many jobs share it
+        self.assertEqual(mock_result.call_count, 3)
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_delay.call_args_list),
+            sorted(str(job.id) for job in (done, shared, failed)),
+        )
+        busy.refresh_from_db()
+        self.assertEqual(busy.progress, 25)
+
+    def test_failed_check_leaves_job_pending(self, mock_result, mock_delay, _mock_redis):
+        mock_result.side_effect = ConnectionError("timeout")
+        make_job(status="transcribing", transcription_id="tx_1")
+
+        poll_transcriptions_task()
+
+        mock_delay.assert_not_called()
+
+    def test_skips_while_previous_sweep_runs(self, mock_result, mock_delay, mock_redis):
+        mock_redis.return_value = MagicMock()
+        mock_redis.return_value.set.return_value = None
+        make_job(status="transcribing", transcription_id="tx_1")
+
+        poll_transcriptions_task()
+
+        mock_result.assert_not_called()
+
+    def test_polls_only_due_jobs(self, mock_result, mock_delay, _mock_redis):
+        mock_result.return_value = {"status": "completed"}
+        now = timezone.now()
+        due = make_job(status="transcribing", transcription_id="tx_1", next_poll_at=now)
+        make_job(
+            status="transcribing",
+            transcription_id="tx_2",
+            next_poll_at=now + timedelta(minutes=5),
+        )
+
+        poll_transcriptions_task()
+
+        mock_result.assert_called_once_with("tx_1")
+        mock_delay.assert_called_once_with(str(due.id))
+
+    def test_finished_job_not_dispatched_every_sweep(self, mock_result, mock_delay, _mock_redis):
+        mock_result.return_value = {"status": "completed"}
+        job = make_job(status="transcribing", transcription_id="tx_1")
+
+        poll_transcriptions_task()
+        # Its completion task hasn't claimed it yet
+        poll_transcriptions_task()
+
+        mock_delay.assert_called_once_with(str(job.id))
+        job.refresh_from_db()
+        self.assertGreater(job.next_poll_at, timezone.now())
+
+    def test_releases_only_its_own_lock(self, mock_result, mock_delay, mock_redis):
+        from apps.ingestion.poller import SWEEP_LOCK_KEY
+
+        client = mock_redis.return_value = MagicMock()
+        client.set.return_value = True
+
+        poll_transcriptions_task()
+
+        token = client.set.call_args.args[1]
+        client.delete.assert_not_called()
+        self.assertEqual(client.eval.call_args.args[1:], (1, SWEEP_LOCK_KEY, token))
+
+    def test_pending_job_is_rescheduled(self, mock_result, mock_delay, _mock_redis):
+        mock_result.return_value = {"status": "processing"}
+        job = make_job(
+            status="transcribing",
+            transcription_id="tx_1",
+            started_at=timezone.now() - timedelta(minutes=2),
+            duration_seconds=60,
+        )
+
+        poll_transcriptions_task()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "transcribing")
+        self.assertGreater(job.next_poll_at, timezone.now())
+
+    def test_job_past_deadline_fails(self, mock_result, mock_delay, _mock_redis):
+        mock_result.return_value = {"status": "processing"}
+        job = make_job(
+            status="transcribing",
+            transcription_id="tx_1",
+            started_at=timezone.now() - timedelta(hours=3),
+            duration_seconds=60,
+        )
+
+        poll_transcriptions_task()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("TranscriptionTimeoutError", job.error_message)
+        mock_delay.assert_not_called()
+
+
+@override_settings(TRANSCRIPTION_TURNAROUND_RATIO=0.3, TRANSCRIPTION_MAX_POLL_INTERVAL=120)
+class PollScheduleTest(TestCase):
+    def setUp(self):
+        poll_schedule._ratio_cache.clear()
+
+    def test_first_poll_scales_with_duration(self):
+        now = timezone.now()
+        clip = make_job(duration_seconds=60, started_at=now)
+        lecture = make_job(duration_seconds=2 * 3600, started_at=now)
+
+        self.assertLess(first_poll_at(clip), now + timedelta(seconds=30))
+        self.assertGreater(first_poll_at(lecture), now + timedelta(minutes=25))
+
+    def test_backoff_grows_and_is_capped(self):
+        started = timezone.now()
+        job = make_job(duration_seconds=60, started_at=started)
+
+        def delay(elapsed):
+            now = started + timedelta(seconds=elapsed)
+            return (next_poll_at(job, now) - now).total_seconds()
+
+        self.assertLess(delay(20), delay(300))
+        self.assertLessEqual(delay(3600), 120 * (1 + poll_schedule.JITTER))
+
+    def test_ratios_learned_from_history(self):
+        for _ in range(10):
+            job = make_job(duration_seconds=100, started_at=timezone.now() - timedelta(seconds=50))
+            Transcription.objects.create(job=job, text="x")
+
+        median, _ = poll_schedule.turnaround_ratios()
+        self.assertAlmostEqual(median, 0.5, places=1)
+
+
+@override_settings(ASSEMBLYAI_API_KEY="key")
+class TranscriptionServiceHTTPTest(TestCase):
+    def setUp(self):
+        reset_http_metrics()
+        self.client = ProviderClient("assemblyai")
+        patcher = patch(
+            "apps.transcription.service.get_http_client", return_value=self.client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_transport(self, handler):
+        self.client._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    def test_calls_share_pooled_client_and_record_metrics(self):
+        self.use_transport(
+            lambda request: httpx.Response(200, json={"id": "tx_1", "status": "queued"})
+        )
+
+        self.assertEqual(TranscriptionService.submit_transcription("https://a/b.mp3"), "tx_1")
+        TranscriptionService.get_transcription_result("tx_1")
+
+        stats = http_metrics()["assemblyai"]
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.statuses[200], 2)
+        self.assertGreater(stats.bytes_sent, 0)
+        self.assertGreater(stats.bytes_received, 0)
+
+    def test_timeout_raises_service_error(self):
+        def hang(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        self.use_transport(hang)
+
+        with self.assertRaises(ThirdPartyServiceError):
+            TranscriptionService.get_transcription_result("tx_1")
+        self.assertEqual(http_metrics()["assemblyai"].errors, 1)
+
+    def test_error_status_raises_service_error(self):
+        self.use_transport(lambda request: httpx.Response(500))
+
+        with self.assertRaises(ThirdPartyServiceError):
+            TranscriptionService.get_transcription_result("tx_1")
+        self.assertEqual(http_metrics()["assemblyai"].statuses[500], 1)
+
+
+def make_words(count):
+    return [
+        {
+            "text": ["the", "cell", "divides", "again"][i % 4],
+            "start": i * 400,
+            "end": i * 400 + 350,
+            "confidence": 0.9876,
+            "speaker": "AB"[i // 50 % 2],
+        }
+        for i in range(count)
+    ]
+
+
+class WordTimingsTest(TestCase):
+    def test_pack_roundtrip(self):
+        words = make_words(200)
+        words[3]["speaker"] = None
+
+        timings = unpack_words(pack_words(words))
+
+        self.assertEqual(len(timings), 200)
+        self.assertEqual(timings.tokens, ["the", "cell", "divides", "again"])
+        self.assertEqual(timings.word(3), {**words[3], "confidence": 0.9876})
+        self.assertEqual(list(timings.words())[150], words[150])
+
+    def test_words_in_range(self):
+        timings = unpack_words(pack_words(make_words(100)))
+
+        words = list(timings.words(1000, 2000))
+
+        self.assertEqual([w["start"] for w in words], [1200, 1600])
+
+    def test_store_keeps_words_off_the_row(self):
+        words = make_words(100)
+        result = {
+            "id": "tx_1",
+            "text": "the cell divides again",
+            "words": words,
+            "utterances": [
+                {"speaker": "A", "start": 0, "end": 19950, "text": "...", "words": words[:50]},
+                {"speaker": "B", "start": 20000, "end": 39950, "text": "...", "words": words[50:]},
+            ],
+        }
+        job = make_job(status="transcribing", transcription_id="tx_1")
+
+        store_transcript(job, result)
+
+        transcription = Transcription.objects.get(job=job)
+        self.assertNotIn("words", transcription.raw_response)
+        self.assertNotIn("words", transcription.raw_response["utterances"][0])
+        self.assertEqual(transcription.packed_words.word_count, 100)
+        self.assertEqual(transcription.full_response(), result)
+
+    def test_copy_shares_packed_words(self):
+        source_job = make_job(status="completed", transcription_id="tx_1")
+        source = store_transcript(source_job, {"id": "tx_1", "text": "x", "words": make_words(10)})
+
+        copy = copy_transcript(source, make_job())
+
+        self.assertEqual(copy.external_id, "tx_1")
+        self.assertEqual(len(copy.word_timings), 10)
+
+
+class TranscriptSegmentsTest(TestCase):
+    def setUp(self):
+        transcript_segments._index_cache.clear()
+        self.user_id = uuid.uuid4()
+        self.job = make_job(user_id=self.user_id, status="completed", transcription_id="tx_1")
+        # 100 words per speaker turn -> paragraphs of 60 words broken at "again."
+        words = make_words(400)
+        for word in words[59::60]:
+            word["text"] = "again."
+        store_transcript(self.job, {"id": "tx_1", "text": "...", "words": words})
+
+    def get(self, headers=None, **params):
+        request = APIRequestFactory().get(
+            f"/api/transcripts/{self.job.id}/segments", params, **(headers or {})
+        )
+        request.user_id = self.user_id
+        return get_transcript_segments(request, job_id=self.job.id)
+
+    def test_pages_through_paragraphs(self):
+        response = self.get(limit=2)
+
+        self.assertEqual(response.status_code, 200)
+        first, second = response.data["segments"]
+        self.assertEqual((first["start"], first["speaker"]), (0, "A"))
+        self.assertEqual(second["start"], first["end"] + 50)
+        self.assertEqual(response.data["next_offset"], 2)
+
+        last = self.get(offset=response.data["total_segments"] - 1)
+        self.assertIsNone(last.data["next_offset"])
+
+    def test_time_range_uses_overlapping_paragraphs(self):
+        response = self.get(start=30000, end=45000, words="true")
+
+        segments = response.data["segments"]
+        self.assertLessEqual(segments[0]["start"], 30000)
+        self.assertGreater(segments[0]["end"], 30000)
+        self.assertLess(segments[-1]["start"], 45000)
+        self.assertIsNone(response.data["next_offset"])
+        self.assertEqual(segments[0]["words"][0]["start"], segments[0]["start"])
+
+    def test_jump_to_time(self):
+        response = self.get(at=50000, limit=1)
+
+        segment = response.data["segments"][0]
+        self.assertLessEqual(segment["start"], 50000)
+        self.assertGreater(segment["end"], 50000)
+
+    def test_conditional_request(self):
+        etag = self.get()["ETag"]
+
+        response = self.get(headers={"HTTP_IF_NONE_MATCH": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("max-age", response["Cache-Control"])
+
+    def test_other_users_transcript_not_found(self):
+        self.user_id = uuid.uuid4()
+
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_rejects_bad_params(self):
+        self.assertEqual(self.get(start="soon").status_code, 400)
+
+
+@override_settings(
+    TRANSCRIPTION_CHUNKING_ENABLED=True,
+    TRANSCRIPTION_CHUNK_THRESHOLD=3600,
+    TRANSCRIPTION_CHUNK_SECONDS=900,
+    TRANSCRIPTION_CHUNK_OVERLAP=10,
+    TRANSCRIPTION_CHUNK_SEARCH=30,
+)
+class TranscriptionChunkingTest(TestCase):
+    def _chunked_job(self, results):
+        from apps.transcription.models import TranscriptionChunk
+
+        job = make_job(duration_seconds=1800, status="transcribing")
+        job.transcription_id = f"chunked:{job.id}"
+        job.save()
+        for index, (start, end) in enumerate([(0, 910000), (900000, 1800000)]):
+            TranscriptionChunk.objects.create(
+                job=job,
+                index=index,
+                start_ms=start,
+                end_ms=end,
+                audio_url=f"https://files.example.com/chunks/{index}.ogg",
+                transcript_id=f"tx_{index}",
+            )
+        return job
+
+    def test_plans_overlapping_chunks_cut_in_silence(self):
+        from apps.transcription.chunking import plan_chunks
+
+        self.assertEqual(plan_chunks(1800), [(0.0, 910.0), (900.0, 1800)])
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("NumPy not installed")
+
+        levels = np.full(60000, -20.0)  # 30 ms frames, 30 min
+        levels[30500] = -70.0  # 915 s
+        spans = plan_chunks(1800, levels)
+
+        self.assertAlmostEqual(spans[0][1], 915 + 10)
+        self.assertAlmostEqual(spans[1][0], 915)
+
+    def test_short_recordings_not_chunked(self):
+        from apps.transcription.chunking import should_chunk
+
+        self.assertFalse(should_chunk(make_job(duration_seconds=1200)))
+        self.assertTrue(should_chunk(make_job(duration_seconds=7200)))
+
+    def test_stitches_overlap_once_on_one_timeline(self):
+        from apps.transcription.chunking import stitch_chunks
+        from apps.transcription.models import TranscriptionChunk
+
+        chunks = [
+            TranscriptionChunk(index=0, start_ms=0, end_ms=10000),
+            TranscriptionChunk(index=1, start_ms=8000, end_ms=20000),
+        ]
+        results = [
+            {
+                "words": [
+                    {"text": "one", "start": 1000, "end": 1500},
+                    {"text": "two", "start": 8500, "end": 8980},
+                    {"text": "three", "start": 9500, "end": 9900},
+                ],
+                "chapters": [{"start": 0, "end": 9900, "headline": "Intro"}],
+                "audio_duration": 10,
+            },
+            {
+                "words": [
+                    {"text": "two", "start": 520, "end": 1000},  # same word, seen twice
+                    {"text": "three", "start": 1500, "end": 1900},
+                    {"text": "four", "start": 5000, "end": 5500},
+                ],
+                "chapters": [{"start": 1500, "end": 12000, "headline": "Main"}],
+                "audio_duration": 12,
+            },
+        ]
+
+        stitched = stitch_chunks(chunks, results)
+
+        self.assertEqual(stitched["text"], "one two three four")
+        self.assertEqual(
+            [w["start"] for w in stitched["words"]], [1000, 8500, 9500, 13000]
+        )
+        self.assertEqual(
+            [c["headline"] for c in stitched["chapters"]], ["Intro", "Main"]
+        )
+        self.assertEqual(stitched["chapters"][1]["start"], 9500)
+        self.assertEqual(results[1]["words"][2]["start"], 5000)
+
+    @patch("apps.transcription.service.TranscriptionService.get_transcription_result")
+    def test_result_waits_for_every_chunk(self, mock_result):
+        from apps.transcription.chunking import get_result
+
+        job = self._chunked_job([])
+        results = {
+            "tx_0": {"status": "completed", "words": [{"text": "a", "start": 0, "end": 10}]},
+            "tx_1": {"status": "processing"},
+        }
+        mock_result.side_effect = lambda tx_id: results[tx_id]
+
+        self.assertEqual(get_result(job.transcription_id)["status"], "processing")
+
+        results["tx_1"] = {"status": "completed", "words": [{"text": "b", "start": 6000, "end": 6300}]}
+        mock_result.reset_mock()
+        self.assertEqual(get_result(job.transcription_id, stitch=False)["status"], "completed")
+        self.assertEqual(mock_result.call_count, 1)  # tx_0 already known done
+
+        result = get_result(job.transcription_id)
+        self.assertEqual(result["id"], job.transcription_id)
+        self.assertEqual([w["start"] for w in result["words"]], [0, 906000])
+
+    @patch("apps.transcription.service.TranscriptionService.get_transcription_result")
+    def test_failed_chunk_fails_transcript(self, mock_result):
+        from apps.transcription.chunking import get_result
+
+        job = self._chunked_job([])
+        mock_result.side_effect = lambda tx_id: (
+            {"status": "error", "error": "bad audio"} if tx_id == "tx_1" else {"status": "processing"}
+        )
+
+        result = get_result(job.transcription_id)
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Chunk 2 of 2: bad audio", result["error"])
+
+    @override_settings(**WEBHOOK_SETTINGS)
+    @patch("apps.transcription.views.complete_transcription_task.delay")
+    def test_chunk_webhook_queues_its_job(self, mock_delay):
+        job = self._chunked_job([])
+        request = APIRequestFactory().post(
+            "/api/webhooks/assemblyai",
+            {"transcript_id": "tx_1", "status": "completed"},
+            format="json",
+            headers={"X-Noteably-Webhook-Secret": "s3cret"},
+        )
+
+        assemblyai_webhook(request)
+
+        mock_delay.assert_called_once_with(str(job.id))
+
+    @override_settings(
+        STORAGE_BACKEND="memory", AUDIO_EXTRACTION_ENABLED=False, SILENCE_TRIMMING_ENABLED=False
+    )
+    @patch("apps.transcription.service.TranscriptionService.submit_transcription")
+    def test_long_upload_submitted_in_chunks(self, mock_submit):
+        from apps.storage import get_storage
+
+        storage = get_storage()
+        storage.store("media/long.mp3", b"long audio", "audio/mpeg")
+        job = make_job(
+            duration_seconds=3700,
+            file_size_bytes=10,
+            storage_url=storage.url("media/long.mp3"),
+        )
+        mock_submit.side_effect = lambda url, webhook_url="": f"tx_{url.rsplit('/', 1)[1]}"
+
+        def fake_transcode(source_path, dest_path, codec=None, spans=None, clip=None):
+            with open(dest_path, "wb") as out:
+                out.write(b"chunk")
+
+        with patch(
+            "apps.transcription.chunking.frame_energies", side_effect=ImportError
+        ), patch(
+            "apps.transcription.chunking.probe_duration", return_value=3700.0
+        ), patch(
+            "apps.transcription.chunking.transcode_audio", side_effect=fake_transcode
+        ):
+            process_upload_task(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.transcription_id, f"chunked:{job.id}")
+        self.assertEqual(job.status, "transcribing")
+        chunks = list(job.transcription_chunks.all())
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual((chunks[1].start_ms, chunks[1].end_ms), (740000, 1490000))
+        self.assertEqual(chunks[4].transcript_id, "tx_4.ogg")
+        self.assertEqual(storage.head(f"chunks/{job.id}/4.ogg")["size"], 5)
+        # Polled on a chunk's turnaround, not the whole recording's
+        self.assertLess(job.next_poll_at, job.started_at + timedelta(minutes=10))
+
+    @override_settings(
+        STORAGE_BACKEND="memory",
+        AUDIO_EXTRACTION_ENABLED=False,
+        SILENCE_TRIMMING_ENABLED=False,
+        AUDIO_EXTRACTION_WORKERS=1,
+    )
+    @patch("apps.transcription.service.TranscriptionService.delete_transcription")
+    @patch("apps.transcription.service.TranscriptionService.submit_transcription")
+    def test_failed_chunk_submit_undoes_sent_chunks(self, mock_submit, mock_delete):
+        from apps.core.exceptions import ThirdPartyServiceError
+        from apps.storage import get_storage
+
+        storage = get_storage()
+        storage.store("media/long.mp3", b"long audio", "audio/mpeg")
+        job = make_job(
+            duration_seconds=3700,
+            file_size_bytes=10,
+            storage_url=storage.url("media/long.mp3"),
+        )
+
+        def submit(url, webhook_url=""):
+            name = url.rsplit("/", 1)[1]
+            if name == "2.ogg":
+                raise ThirdPartyServiceError("Failed to submit transcription: 503")
+            return f"tx_{name}" if "chunks/" in url else "tx_whole"
+
+        mock_submit.side_effect = submit
+
+        def fake_transcode(source_path, dest_path, codec=None, spans=None, clip=None):
+            with open(dest_path, "wb") as out:
+                out.write(b"chunk")
+
+        with patch(
+            "apps.transcription.chunking.frame_energies", side_effect=ImportError
+        ), patch(
+            "apps.transcription.chunking.probe_duration", return_value=3700.0
+        ), patch(
+            "apps.transcription.chunking.transcode_audio", side_effect=fake_transcode
+        ):
+            process_upload_task(job.id)
+
+        job.refresh_from_db()
+        # Submitted whole instead
+        self.assertEqual(job.transcription_id, "tx_whole")
+        self.assertFalse(job.transcription_chunks.exists())
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_delete.call_args_list), ["tx_0.ogg", "tx_1.ogg"]
+        )
+        # Chunks after the failed one were never sent
+        self.assertEqual(mock_submit.call_count, 4)
+        for index in range(5):
+            self.assertIsNone(storage.head(f"chunks/{job.id}/{index}.ogg"))
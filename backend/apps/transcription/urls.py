@@ -0,0 +1,13 @@
+"""URL configuration for transcription app."""
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("webhooks/assemblyai", views.assemblyai_webhook, name="assemblyai_webhook"),
+    path(
+        "transcripts/<uuid:job_id>/segments",
+        views.get_transcript_segments,
+        name="get_transcript_segments",
+    ),
+]
@@ -0,0 +1,142 @@
+"""AssemblyAI webhook receiver and transcript segment API."""
+
+import hmac
+import logging
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from apps.accounts.permissions import IsAuthenticated
+from apps.ingestion.models import Job
+from apps.ingestion.tasks import complete_transcription_task
+from .chunking import CHUNKED_PREFIX
+from .models import Transcription, TranscriptionChunk
+from .segments import get_transcript_index
+from .service import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def assemblyai_webhook(request):
+    """
+    Receive AssemblyAI's completion callback and queue the job's next step.
+
+    AssemblyAI sends {"transcript_id": ..., "status": "completed" | "error"}
+    with our shared secret in the webhook auth header. The transcript itself
+    is fetched by complete_transcription_task, so the response is immediate.
+    """
+    secret = settings.ASSEMBLYAI_WEBHOOK_SECRET
+    provided = request.headers.get(TranscriptionService.WEBHOOK_AUTH_HEADER, "")
+    if not secret or not hmac.compare_digest(provided.encode(), secret.encode()):
+        logger.warning("Rejected AssemblyAI webhook with invalid secret")
+        return Response({"error": "Invalid webhook secret"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    transcript_id = request.data.get("transcript_id")
+    if not transcript_id:
+        return Response({"error": "transcript_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Several jobs can share one transcript (see ingestion.dedup), and a
+    # chunk's transcript belongs to its job's chunked one (see chunking)
+    transcript_ids = [transcript_id] + [
+        f"{CHUNKED_PREFIX}{job_id}"
+        for job_id in TranscriptionChunk.objects.filter(
+            transcript_id=transcript_id
+        ).values_list("job_id", flat=True)
+    ]
+    job_ids = Job.objects.filter(
+        transcription_id__in=transcript_ids, status="transcribing"
+    ).values_list("id", flat=True)
+    for job_id in job_ids:
+        complete_transcription_task.delay(str(job_id))
+
+    logger.info(
+        f"AssemblyAI webhook for {transcript_id} ({request.data.get('status')}): "
+        f"queued {len(job_ids)} job(s)"
+    )
+    return Response({"received": True})
+
+
+SEGMENT_PAGE_SIZE = 20
+MAX_SEGMENT_PAGE_SIZE = 100
+
+
+def _int_param(request, name, default=None):
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return default
+    number = int(value)  # ValueError handled by the caller
+    if number < 0:
+        raise ValueError(name)
+    return number
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_transcript_segments(request, job_id):
+    """
+    Page through a transcript by paragraph, optionally within a time range.
+
+    Query params (times in ms):
+        start, end: Only paragraphs overlapping this range
+        at: Start the page at the paragraph spoken at this time
+        offset: Start the page at this paragraph index
+        limit: Paragraphs per page (default 20, max 100)
+        words: "true" to include word timings
+
+    Transcripts never change once stored, so responses carry an ETag and
+    may be cached by the client.
+    """
+    try:
+        job = Job.objects.only("id").get(id=job_id, user_id=request.user_id)
+        transcription = Transcription.objects.only("id", "created_at").get(job=job)
+    except (Job.DoesNotExist, Transcription.DoesNotExist):
+        return Response({"error": "Transcript not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    etag = f'"{transcription.pk}-{int(transcription.created_at.timestamp())}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        try:
+            start = _int_param(request, "start", 0)
+            end = _int_param(request, "end")
+            at = _int_param(request, "at")
+            offset = _int_param(request, "offset")
+            limit = min(_int_param(request, "limit", SEGMENT_PAGE_SIZE), MAX_SEGMENT_PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {"error": "start, end, at, offset and limit must be non-negative integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        index = get_transcript_index(transcription)
+        if index is None:
+            return Response(
+                {"error": "Transcript has no word timings"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        lo, hi = index.paragraphs_between(start, index.duration_ms + 1 if end is None else end)
+        if offset is None:
+            offset = index.paragraph_at(at) if at is not None else lo
+        offset = max(offset, lo)
+        stop = min(offset + max(limit, 1), hi)
+        include_words = request.query_params.get("words") == "true"
+
+        response = Response(
+            {
+                "job_id": str(job.id),
+                "duration_ms": index.duration_ms,
+                "total_segments": len(index),
+                "offset": offset,
+                "next_offset": stop if stop < hi else None,
+                "segments": [index.segment(i, include_words) for i in range(offset, stop)],
+            }
+        )
+
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
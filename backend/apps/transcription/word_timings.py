@@ -0,0 +1,229 @@
+"""
+Compact storage of AssemblyAI word-level results.
+
+A transcript's ``words`` array (text, start, end, confidence and speaker for
+every word, repeated again under each utterance) dwarfs everything else in
+the response: tens of megabytes for a long lecture. It is split off the
+``transcriptions`` row into packed columns, compressed with zlib and stored
+in ``TranscriptWords``:
+
+- start times, delta-encoded (ms), and durations (ms) as uint32
+- confidence scaled to 0..10000 as uint16
+- speaker and token ids as indexes into small string tables
+
+The row keeps the rest of the response as slim metadata, so loading a
+Transcription never deserializes the word list.
+"""
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+CONFIDENCE_SCALE = 10000
+NO_SPEAKER = 0xFFFF
+COMPRESSION_LEVEL = 6
+
+_HEADER = struct.Struct("<II")  # word count, string table length
+
+
+def _column(typecode: str, values=()) -> array:
+    column = array(typecode, values)
+    expected = {"H": 2, "I": 4}[typecode]
+    if column.itemsize != expected:
+        # Only platforms with unusual C type sizes end up here
+        raise RuntimeError(f"array('{typecode}') is {column.itemsize} bytes, need {expected}")
+    return column
+
+
+@dataclass
+class WordTimings:
+    """Decoded word columns; word i is (texts[i], starts[i], ends[i], ...)."""
+
+    starts: array  # ms
+    ends: array  # ms
+    confidences: array  # scaled by CONFIDENCE_SCALE
+    speaker_ids: array  # index into speakers, NO_SPEAKER if unlabelled
+    token_ids: array  # index into tokens
+    tokens: List[str]
+    speakers: List[str]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def word(self, i: int) -> Dict:
+        """Word i in AssemblyAI's shape."""
+        speaker_id = self.speaker_ids[i]
+        return {
+            "text": self.tokens[self.token_ids[i]],
+            "start": self.starts[i],
+            "end": self.ends[i],
+            "confidence": self.confidences[i] / CONFIDENCE_SCALE,
+            "speaker": self.speakers[speaker_id] if speaker_id != NO_SPEAKER else None,
+        }
+
+    def index_range(self, start_ms: int, end_ms: int) -> Tuple[int, int]:
+        """Indexes [lo, hi) of the words starting within [start_ms, end_ms)."""
+        return bisect_left(self.starts, start_ms), bisect_left(self.starts, end_ms)
+
+    def words(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Dict]:
+        """Words starting within [start_ms, end_ms) (all words by default)."""
+        lo, hi = self.index_range(
+            0 if start_ms is None else start_ms,
+            sys.maxsize if end_ms is None else end_ms,
+        )
+        return (self.word(i) for i in range(lo, hi))
+
+
+def pack_words(words: List[Dict]) -> bytes:
+    """
+    Pack an AssemblyAI ``words`` array into a compressed columnar blob.
+
+    Words are expected in time order, as AssemblyAI returns them.
+    """
+    token_index: Dict[str, int] = {}
+    speaker_index: Dict[str, int] = {}
+    start_deltas, durations = _column("I"), _column("I")
+    confidences, speaker_ids, token_ids = _column("H"), _column("H"), _column("I")
+
+    previous_start = 0
+    for word in words:
+        start = max(int(word.get("start") or 0), previous_start)
+        end = max(int(word.get("end") or 0), start)
+        start_deltas.append(start - previous_start)
+        durations.append(end - start)
+        previous_start = start
+
+        confidence = word.get("confidence")
+        confidences.append(round(min(max(confidence or 0.0, 0.0), 1.0) * CONFIDENCE_SCALE))
+
+        speaker = word.get("speaker")
+        speaker_ids.append(
+            NO_SPEAKER if speaker is None else speaker_index.setdefault(speaker, len(speaker_index))
+        )
+        token_ids.append(token_index.setdefault(word.get("text", ""), len(token_index)))
+
+    tables = json.dumps(
+        {"tokens": list(token_index), "speakers": list(speaker_index)},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+
+    columns = (start_deltas, durations, confidences, speaker_ids, token_ids)
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+
+    payload = b"".join(
+        [_HEADER.pack(len(words), len(tables)), tables] + [column.tobytes() for column in columns]
+    )
+    return zlib.compress(payload, COMPRESSION_LEVEL)
+
+
+def unpack_words(blob: bytes) -> WordTimings:
+    """Decode a blob written by pack_words()."""
+    payload = zlib.decompress(blob)
+    count, tables_length = _HEADER.unpack_from(payload)
+    offset = _HEADER.size
+    tables = json.loads(payload[offset:offset + tables_length])
+    offset += tables_length
+
+    columns = []
+    for typecode in ("I", "I", "H", "H", "I"):
+        column = _column(typecode)
+        size = count * column.itemsize
+        column.frombytes(payload[offset:offset + size])
+        offset += size
+        if sys.byteorder != "little":
+            column.byteswap()
+        columns.append(column)
+    start_deltas, durations, confidences, speaker_ids, token_ids = columns
+
+    starts, ends = _column("I"), _column("I")
+    start = 0
+    for delta, duration in zip(start_deltas, durations):
+        start += delta
+        starts.append(start)
+        ends.append(start + duration)
+
+    return WordTimings(
+        starts=starts,
+        ends=ends,
+        confidences=confidences,
+        speaker_ids=speaker_ids,
+        token_ids=token_ids,
+        tokens=tables["tokens"],
+        speakers=tables["speakers"],
+    )
+
+
+def split_response(result: Dict) -> Tuple[Dict, List[Dict]]:
+    """
+    Split an AssemblyAI transcript into slim metadata and its word list.
+
+    Utterances keep their text and timing but lose their ``words`` copies,
+    which are rebuilt from the packed words on demand.
+    """
+    metadata = {key: value for key, value in result.items() if key != "words"}
+    if metadata.get("utterances"):
+        metadata["utterances"] = [
+            {key: value for key, value in utterance.items() if key != "words"}
+            for utterance in metadata["utterances"]
+        ]
+    return metadata, result.get("words") or []
+
+
+def store_transcript(job, result: Dict):
+    """
+    Create the Transcription for a finished AssemblyAI result.
+
+    Returns:
+        Transcription
+    """
+    from .models import Transcription, TranscriptWords
+
+    metadata, words = split_response(result)
+    transcription = Transcription.objects.create(
+        job=job,
+        external_id=result["id"],
+        text=result.get("text", ""),
+        raw_response=metadata,
+    )
+    if words:
+        TranscriptWords.objects.create(
+            transcription=transcription,
+            word_count=len(words),
+            data=pack_words(words),
+        )
+    return transcription
+
+
+def copy_transcript(source, job):
+    """
+    Give a job its own copy of another job's transcript, without unpacking words.
+
+    Returns:
+        Transcription
+    """
+    from .models import Transcription, TranscriptWords
+
+    transcription = Transcription.objects.create(
+        job=job,
+        external_id=source.external_id,
+        text=source.text,
+        raw_response=source.raw_response,
+    )
+    packed = TranscriptWords.objects.filter(transcription=source).first()
+    if packed is not None:
+        TranscriptWords.objects.create(
+            transcription=transcription,
+            word_count=packed.word_count,
+            format_version=packed.format_version,
+            data=packed.data,
+        )
+    return transcription
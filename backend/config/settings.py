@@ -158,6 +158,20 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+CELERY_BEAT_SCHEDULE = {
+    "flush-quota-usage": {
+        "task": "apps.ingestion.tasks.flush_usage_task",
+        "schedule": float(os.getenv("QUOTA_FLUSH_INTERVAL", "60")),
+    },
+    "poll-transcriptions": {
+        "task": "apps.ingestion.tasks.poll_transcriptions_task",
+        "schedule": float(os.getenv("TRANSCRIPTION_POLL_INTERVAL", "5")),
+    },
+    "cleanup-storage": {
+        "task": "apps.ingestion.tasks.cleanup_storage_task",
+        "schedule": float(os.getenv("STORAGE_CLEANUP_INTERVAL", "86400")),
+    },
+}
 
 # Logging
 LOGGING = {
@@ -190,6 +204,12 @@ LOGGING = {
             "level": "DEBUG" if DEBUG else "INFO",
             "propagate": False,
         },
+        # apps.core.http_client logs every provider call itself
+        "httpx": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
     },
 }
 
@@ -198,18 +218,147 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
+# Access token verification: "local" checks signatures against the cached
+# JWKS (falling back to Supabase Auth for unknown keys), "remote" always
+# calls Supabase Auth
+SUPABASE_AUTH_VERIFICATION = os.getenv("SUPABASE_AUTH_VERIFICATION", "local")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")  # Legacy HS256 projects
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWT_LEEWAY = int(os.getenv("SUPABASE_JWT_LEEWAY", "0"))
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+    if SUPABASE_URL
+    else "",
+)
+SUPABASE_JWKS_REFRESH_SECONDS = int(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", "600"))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+# Object storage backend: r2, local (files under STORAGE_LOCAL_ROOT) or
+# memory (per-process, for tests and benchmarks)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "r2")
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", str(BASE_DIR / "storage"))
+
 # Cloudflare R2 Settings
 R2_ENDPOINT = os.getenv("R2_ENDPOINT")
 R2_BUCKET = os.getenv("R2_BUCKET", "noteably-files")
 R2_ACCESS_KEY = os.getenv("R2_ACCESS_KEY")
 R2_SECRET_KEY = os.getenv("R2_SECRET_KEY")
 R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL")
+R2_REGION = os.getenv("R2_REGION", "auto")
+
+# Pooled HTTP clients for third-party APIs (apps.core.http_client)
+HTTP_CLIENT_CONNECT_TIMEOUT = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "5"))
+HTTP_CLIENT_READ_TIMEOUT = float(os.getenv("HTTP_CLIENT_READ_TIMEOUT", "30"))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "20"))
+HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "False") == "True"
+
+# R2 connection pool and transfer tuning
+R2_MAX_POOL_CONNECTIONS = int(os.getenv("R2_MAX_POOL_CONNECTIONS", "32"))
+R2_CONNECT_TIMEOUT = float(os.getenv("R2_CONNECT_TIMEOUT", "5"))
+R2_READ_TIMEOUT = float(os.getenv("R2_READ_TIMEOUT", "60"))
+R2_MULTIPART_THRESHOLD_MB = int(os.getenv("R2_MULTIPART_THRESHOLD_MB", "16"))
+R2_MULTIPART_CHUNKSIZE_MB = int(os.getenv("R2_MULTIPART_CHUNKSIZE_MB", "8"))
+R2_TRANSFER_MAX_CONCURRENCY = int(os.getenv("R2_TRANSFER_MAX_CONCURRENCY", "8"))
+# Stream /api/process request bodies straight into R2 multipart parts
+# instead of spooling them to a temp file first
+R2_STREAMING_UPLOADS = os.getenv("R2_STREAMING_UPLOADS", "False") == "True"
+R2_STREAMING_PART_CONCURRENCY = int(os.getenv("R2_STREAMING_PART_CONCURRENCY", "4"))
+# Lifetime of presigned direct-upload URLs and their upload tokens
+R2_PRESIGN_EXPIRY = int(os.getenv("R2_PRESIGN_EXPIRY", "3600"))
+
+# Storage retention (0 disables a pass)
+# Failed jobs are deleted with their media; completed jobs keep their
+# materials but lose the source file.
+FAILED_JOB_RETENTION_DAYS = int(os.getenv("FAILED_JOB_RETENTION_DAYS", "7"))
+MEDIA_RETENTION_DAYS = int(os.getenv("MEDIA_RETENTION_DAYS", "30"))
+# Unreferenced objects younger than this may belong to uploads still in progress
+ORPHAN_GRACE_HOURS = int(os.getenv("ORPHAN_GRACE_HOURS", "24"))
+
+# Audio extraction: video uploads are transcoded to small mono audio with
+# ffmpeg before transcription (the original is submitted if that fails)
+AUDIO_EXTRACTION_ENABLED = os.getenv("AUDIO_EXTRACTION_ENABLED", "True") == "True"
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_EXTRACTION_CODEC = os.getenv("AUDIO_EXTRACTION_CODEC", "opus")  # opus or mp3
+AUDIO_EXTRACTION_BITRATE = os.getenv("AUDIO_EXTRACTION_BITRATE", "32k")
+# Concurrent ffmpeg processes per worker process
+AUDIO_EXTRACTION_WORKERS = int(os.getenv("AUDIO_EXTRACTION_WORKERS", "2"))
+AUDIO_EXTRACTION_TIMEOUT = int(os.getenv("AUDIO_EXTRACTION_TIMEOUT", "600"))
+# Silence trimming (needs NumPy): cut silences quieter than the threshold
+# and longer than the minimum, keeping some padding, if it saves enough
+SILENCE_TRIMMING_ENABLED = os.getenv("SILENCE_TRIMMING_ENABLED", "False") == "True"
+SILENCE_THRESHOLD_DB = float(os.getenv("SILENCE_THRESHOLD_DB", "-40"))
+SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", "2.0"))
+SILENCE_PADDING_SECONDS = float(os.getenv("SILENCE_PADDING_SECONDS", "0.3"))
+SILENCE_MIN_SAVING = float(os.getenv("SILENCE_MIN_SAVING", "0.05"))
 
 # AssemblyAI Settings
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+ASSEMBLYAI_TIMEOUT = float(os.getenv("ASSEMBLYAI_TIMEOUT", "30"))
+# Public URL of the transcription webhook (https://<api host>/api/webhooks/assemblyai).
+# When unset, jobs poll AssemblyAI for results instead.
+ASSEMBLYAI_WEBHOOK_URL = os.getenv("ASSEMBLYAI_WEBHOOK_URL", "")
+# Shared secret AssemblyAI sends back in the webhook auth header
+ASSEMBLYAI_WEBHOOK_SECRET = os.getenv("ASSEMBLYAI_WEBHOOK_SECRET", "")
+# With webhooks on, jobs are first polled this long after submission at the
+# earliest, in case their callback was lost
+TRANSCRIPTION_RECONCILE_AFTER = int(os.getenv("TRANSCRIPTION_RECONCILE_AFTER", "900"))
+# A sweep runs every interval and checks the jobs whose next poll is due,
+# this many at once
+TRANSCRIPTION_POLL_INTERVAL = float(os.getenv("TRANSCRIPTION_POLL_INTERVAL", "5"))
+TRANSCRIPTION_POLL_CONCURRENCY = int(os.getenv("TRANSCRIPTION_POLL_CONCURRENCY", "16"))
+# Poll schedule: transcription time / media duration assumed until enough
+# jobs have been measured, the longest gap between polls, and the deadline
+# (seconds, or slow-case ratio x duration x factor if longer)
+TRANSCRIPTION_TURNAROUND_RATIO = float(os.getenv("TRANSCRIPTION_TURNAROUND_RATIO", "0.3"))
+TRANSCRIPTION_MAX_POLL_INTERVAL = float(os.getenv("TRANSCRIPTION_MAX_POLL_INTERVAL", "120"))
+TRANSCRIPTION_MIN_DEADLINE = int(os.getenv("TRANSCRIPTION_MIN_DEADLINE", "1800"))
+TRANSCRIPTION_DEADLINE_FACTOR = float(os.getenv("TRANSCRIPTION_DEADLINE_FACTOR", "4"))
+# Chunked transcription: recordings of at least the threshold (seconds) are
+# cut into chunks of about this length, at the quietest point within the
+# search window, overlapping by the overlap, and transcribed in parallel
+TRANSCRIPTION_CHUNKING_ENABLED = os.getenv("TRANSCRIPTION_CHUNKING_ENABLED", "False") == "True"
+TRANSCRIPTION_CHUNK_THRESHOLD = float(os.getenv("TRANSCRIPTION_CHUNK_THRESHOLD", "3600"))
+TRANSCRIPTION_CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "900"))
+TRANSCRIPTION_CHUNK_OVERLAP = float(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP", "10"))
+TRANSCRIPTION_CHUNK_SEARCH = float(os.getenv("TRANSCRIPTION_CHUNK_SEARCH", "30"))
 
 # Google Gemini Settings
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Material types of a job generated at once
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "4"))
+# "combined" asks for every material type in one request (the transcript is
+# sent once), "per_type" sends one request per type; "auto" combines when
+# the transcript has at least GENERATION_COMBINED_MIN_TOKENS and all types
+# fit in GENERATION_MAX_OUTPUT_TOKENS
+GENERATION_MODE = os.getenv("GENERATION_MODE", "auto")
+GENERATION_COMBINED_MIN_TOKENS = int(os.getenv("GENERATION_COMBINED_MIN_TOKENS", "4000"))
+GENERATION_MAX_OUTPUT_TOKENS = int(os.getenv("GENERATION_MAX_OUTPUT_TOKENS", "8192"))
+# Longer transcripts are generated in parts of GENERATION_CHUNK_TOKENS
+# (split on chapters where possible) and the parts merged
+GENERATION_MAX_INPUT_TOKENS = int(os.getenv("GENERATION_MAX_INPUT_TOKENS", "120000"))
+GENERATION_CHUNK_TOKENS = int(os.getenv("GENERATION_CHUNK_TOKENS", "30000"))
+# Context caching: "gemini", "local" (in-process fake) or empty to disable.
+# Transcripts of at least GENERATION_CACHE_MIN_TOKENS (Gemini's minimum) are
+# cached for GENERATION_CACHE_TTL seconds while generating, then kept
+# GENERATION_CACHE_RETAIN seconds for regenerations (0 deletes them)
+GENERATION_CONTEXT_CACHE = os.getenv("GENERATION_CONTEXT_CACHE", "")
+GEMINI_CACHE_MODEL = os.getenv("GEMINI_CACHE_MODEL", "models/gemini-1.5-flash-001")
+GENERATION_CACHE_MIN_TOKENS = int(os.getenv("GENERATION_CACHE_MIN_TOKENS", "32768"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", "900"))
+GENERATION_CACHE_RETAIN = int(os.getenv("GENERATION_CACHE_RETAIN", "3600"))
 
 # Redis Settings
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+# Subscription cache (per-process LRU in front of Redis)
+SUBSCRIPTION_CACHE_TTL = int(os.getenv("SUBSCRIPTION_CACHE_TTL", "300"))
+SUBSCRIPTION_LOCAL_CACHE_TTL = int(os.getenv("SUBSCRIPTION_LOCAL_CACHE_TTL", "30"))
+SUBSCRIPTION_CACHE_SIZE = int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "10000"))
+
+# Quota counters live in Redis and are flushed to Supabase every
+# QUOTA_FLUSH_INTERVAL seconds; idle counters expire after QUOTA_COUNTER_TTL
+QUOTA_COUNTER_TTL = int(os.getenv("QUOTA_COUNTER_TTL", str(6 * 60 * 60)))